@@ -0,0 +1,148 @@
+"""
+Micro-benchmark del extractor HTML sobre páginas guardadas.
+
+Compara la limpieza anterior (BeautifulSoup + cuatro find_all + ocho select + find_all final)
+con el recorrido único de html_extract.py en cada backend disponible, y comprueba que el
+texto extraído coincide.
+
+Uso:
+    python bench_html_extract.py [CARPETA] [--repeat N]
+    python bench_html_extract.py ./paginas --save-urls   # descarga antes las URLS de process_site.py
+"""
+
+import argparse
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from html_extract import available_backends, extract_html_text, normalize_title
+
+DEFAULT_PAGES_DIR = "./deseguridad_site"
+
+
+def legacy_extract(content: str) -> tuple:
+    """
+    Implementación anterior de extract_html_content, como referencia.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+
+    for selector in ["header", "footer", "nav", "aside"]:
+        for tag in soup.find_all(selector):
+            tag.decompose()
+
+    for css_selector in [
+        ".site-header",
+        ".site-footer",
+        "#site-header",
+        "#site-footer",
+        ".main-navigation",
+        ".menu-principal",
+        ".elementor-location-header",
+        ".elementor-location-footer"
+    ]:
+        for tag in soup.select(css_selector):
+            tag.decompose()
+
+    raw_title = soup.find("title").get_text().strip() if soup.find("title") else ""
+    title = normalize_title(raw_title)
+
+    main_container = soup.find("main") or soup.find("article") or soup.body
+    if not main_container:
+        return title, ""
+
+    text_parts = []
+    for tag in main_container.find_all(["h1", "h2", "h3", "h4", "p", "li"]):
+        txt = tag.get_text(strip=True)
+        if txt:
+            text_parts.append(txt)
+
+    return title, " ".join(text_parts)
+
+
+def load_pages(pages_dir: str) -> list:
+    pages = []
+    for dirpath, _, filenames in os.walk(pages_dir):
+        for filename in sorted(filenames):
+            if filename.lower().endswith((".html", ".htm")):
+                with open(os.path.join(dirpath, filename), "r", encoding="utf-8", errors="replace") as f:
+                    pages.append((filename, f.read()))
+    return pages
+
+
+def save_site_pages(pages_dir: str) -> None:
+    """
+    Descarga las URLS de process_site.py en `pages_dir` (una página por archivo).
+    """
+    from urllib.parse import urlparse
+
+    import process_site
+    from http_fetch import Fetcher
+
+    os.makedirs(pages_dir, exist_ok=True)
+    fetcher = Fetcher(cache_path=None)
+    for result in fetcher.fetch_many(process_site.URLS):
+        if result.error:
+            print(f"  ⚠️  {result.url}: {result.error}")
+            continue
+        slug = urlparse(result.url).path.strip("/").replace("/", "_") or "inicio"
+        with open(os.path.join(pages_dir, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(result.text)
+    fetcher.close()
+
+
+def time_extractor(extract_fn, pages: list, repeat: int) -> tuple:
+    """
+    Devuelve (mejor tiempo total en segundos, resultados de la última pasada).
+    """
+    best = None
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [extract_fn(content) for _, content in pages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del extractor HTML (legacy vs recorrido único).")
+    parser.add_argument("pages_dir", nargs="?", default=DEFAULT_PAGES_DIR, help="Carpeta con páginas .html guardadas")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por extractor (se toma la mejor)")
+    parser.add_argument("--save-urls", action="store_true", help="Descargar antes las URLS de process_site.py")
+    args = parser.parse_args()
+
+    if args.save_urls:
+        print(f"⬇️  Guardando páginas en {args.pages_dir}...")
+        save_site_pages(args.pages_dir)
+
+    pages = load_pages(args.pages_dir) if os.path.isdir(args.pages_dir) else []
+    if not pages:
+        print(f"No hay páginas .html en {args.pages_dir}. Usa --save-urls para descargarlas.")
+        return
+
+    total_kb = sum(len(content) for _, content in pages) / 1024
+    print(f"Páginas: {len(pages)} ({total_kb:.0f} KB) | repeticiones: {args.repeat}\n")
+
+    legacy_time, legacy_results = time_extractor(legacy_extract, pages, args.repeat)
+
+    rows = [("legacy (bs4, 13 pasadas)", legacy_time, 0)]
+    for backend in available_backends():
+        elapsed, results = time_extractor(lambda html: extract_html_text(html, backend), pages, args.repeat)
+        mismatches = sum(1 for a, b in zip(legacy_results, results) if a != b)
+        rows.append((f"{backend} (1 pasada)", elapsed, mismatches))
+
+    print(f"{'Extractor':<26} {'ms/página':>10} {'páginas/s':>10} {'speedup':>8} {'difieren':>9}")
+    for name, elapsed, mismatches in rows:
+        per_page_ms = elapsed / len(pages) * 1000
+        print(
+            f"{name:<26} {per_page_ms:>10.2f} {len(pages) / elapsed:>10.1f} "
+            f"{legacy_time / elapsed:>7.1f}x {mismatches:>9}"
+        )
+
+    print("\n'difieren' = páginas cuyo (título, texto) no coincide con la implementación anterior.")
+    print("Con lxml puede haber diferencias en HTML mal anidado (lxml lo repara como un navegador).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""
+Benchmark de extremo a extremo de process_docs.py y process_site.py sin red ni coste,
+contra el LLM simulado de mock_llm_server.py.
+
+1. Genera fixtures sintéticas (páginas HTML con header/nav/footer y PDF de varias páginas
+   escritos con un generador PDF mínimo) a partir de las respuestas de la KB, o usa una
+   carpeta con HTML/PDF guardados (--fixtures).
+2. process_docs.py recorre la carpeta; process_site.py descarga las páginas HTML desde un
+   servidor HTTP local (sin intervalo mínimo entre peticiones: es localhost).
+3. Cada combinación (generador x --workers x modo single/batch) se ejecuta con --no-cache y
+   --full, y se mide páginas por minuto, llamadas al LLM por segundo, latencia de las
+   llamadas, errores / 429 y el reparto del tiempo por etapa (pipeline_profiler.py).
+
+Cada ejecución se añade a bench_pipeline.jsonl y se compara con la anterior.
+
+Uso:
+    python bench_pipeline.py [--targets docs,site] [--workers 1,4,8] [--modes single,batch] \
+        [--pages 10] [--pdfs 3] [--latency lognormal:150,0.5] [--error-rate 0.02] [--fixtures DIR]
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from kb_io import load_kb_files, load_kb_rows
+from mock_llm_server import MockLLMServer
+from pipeline_profiler import PipelineProfiler
+
+DEFAULT_KB_FILES = [
+    "./deseguridad_knowledge_base_servicios.csv",
+    "./deseguridad_knowledge_base_otros.csv",
+    "./deseguridad_knowledge_base.json",
+]
+DEFAULT_OUTPUT = "./bench_pipeline.jsonl"
+DEFAULT_TARGETS = ["docs", "site"]
+DEFAULT_WORKERS = [1, 4, 8]
+DEFAULT_MODES = ["single"]
+DEFAULT_PAGES = 10
+DEFAULT_PDFS = 3
+DEFAULT_LATENCY = "lognormal:150,0.5"
+# Ritmo inicial del cliente: alto para medir el pipeline, no el limitador
+DEFAULT_LLM_RATE = 100.0
+
+RANDOM_SEED = 7
+PARAGRAPHS_PER_PAGE = 8
+PDF_PAGES = 4
+PDF_LINE_CHARS = 90
+PDF_LINES_PER_PAGE = 48
+
+TARGET_MODULES = {"docs": "process_docs", "site": "process_site"}
+
+
+# ==========================
+# FIXTURES
+# ==========================
+
+def _pdf_escape(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _wrap(text: str, width: int) -> list:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def write_minimal_pdf(path: str, paragraphs: list, lines_per_page: int = PDF_LINES_PER_PAGE) -> None:
+    """
+    PDF 1.4 con texto Helvetica (WinAnsi), sin dependencias: suficiente para pdfplumber.
+    """
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(_wrap(paragraph, PDF_LINE_CHARS))
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # /Pages, cuando se conozcan los hijos
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for page_lines in pages:
+        stream = b"BT /F1 10 Tf 50 790 Td 15 TL\n" + b"".join(
+            b"(" + _pdf_escape(line) + b") Tj T*\n" for line in page_lines
+        ) + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def render_html(title: str, paragraphs: list) -> str:
+    """
+    Página con la estructura típica del theme: header, nav, contenido en <main> y footer.
+    """
+    body = "\n".join(f"      <p>{p}</p>" for p in paragraphs[:-2])
+    items = "\n".join(f"        <li>{p}</li>" for p in paragraphs[-2:])
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="utf-8"><title>{title} - DESEGURIDAD.NET</title></head>
+<body>
+  <header class="site-header"><div class="logo">DESEGURIDAD.NET</div>
+    <nav><ul><li><a href="/">Inicio</a></li><li><a href="/servicios/">Servicios</a></li><li><a href="/contacto/">Contacto</a></li></ul></nav>
+  </header>
+  <main>
+    <article>
+      <h1>{title}</h1>
+{body}
+      <h2>Qué incluye</h2>
+      <ul>
+{items}
+      </ul>
+    </article>
+  </main>
+  <aside class="sidebar"><p>Solicite una cotización sin compromiso.</p></aside>
+  <footer class="site-footer"><p>© DESEGURIDAD.NET — Todos los derechos reservados. Política de tratamiento de datos.</p></footer>
+</body>
+</html>
+"""
+
+
+def write_fixtures(root: str, kb_rows: list, pages: int, pdfs: int, seed: int = RANDOM_SEED) -> dict:
+    """
+    Crea root/servicios/*.html y root/documentos/*.pdf. Devuelve {"html": [...], "pdf": [...]}.
+    """
+    rng = random.Random(seed)
+    answers = [row["answer"] for row in kb_rows if len(row["answer"]) > 80] or ["Contenido de ejemplo."]
+    titles = sorted({row["category"] for row in kb_rows if row["category"]}) or ["Servicio"]
+
+    created = {"html": [], "pdf": []}
+    os.makedirs(os.path.join(root, "servicios"), exist_ok=True)
+    os.makedirs(os.path.join(root, "documentos"), exist_ok=True)
+
+    for i in range(pages):
+        title = f"{titles[i % len(titles)]} {i + 1}"
+        path = os.path.join(root, "servicios", f"servicio-{i + 1}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_html(title, rng.sample(answers, min(PARAGRAPHS_PER_PAGE, len(answers)))))
+        created["html"].append(path)
+
+    for i in range(pdfs):
+        path = os.path.join(root, "documentos", f"guia-{i + 1}.pdf")
+        paragraphs = [rng.choice(answers) for _ in range(PDF_PAGES * 6)]
+        write_minimal_pdf(path, paragraphs)
+        created["pdf"].append(path)
+
+    return created
+
+
+def find_fixtures(root: str) -> dict:
+    found = {"html": [], "pdf": []}
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            ext = os.path.splitext(name)[1].lower().lstrip(".")
+            if ext in found:
+                found[ext].append(os.path.join(dirpath, name))
+    return found
+
+
+class FixtureSite:
+    """
+    Servidor HTTP local con las páginas HTML: /servicios/servicio-1.html -> /servicios/servicio-1/
+    """
+
+    def __init__(self, root: str, html_files: list):
+        self.routes = {}
+        for path in html_files:
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            self.routes["/" + os.path.splitext(relative)[0] + "/"] = relative
+        routes = self.routes
+
+        class Handler(SimpleHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def translate_path(self, path):
+                return super().translate_path(routes.get(path.split("?")[0], path))
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=root))
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="fixture-site", daemon=True).start()
+
+    @property
+    def urls(self) -> list:
+        host, port = self.httpd.server_address[:2]
+        return [f"http://{host}:{port}{route}" for route in sorted(self.routes)]
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ==========================
+# EJECUCIÓN
+# ==========================
+
+def run_generator(target: str, workers: int, mode: str, fixtures_root: str, site_urls: list,
+                  work_dir: str, mock: MockLLMServer, llm_rate: float, extract_workers: int) -> dict:
+    """
+    Ejecuta main() del generador en este proceso, con el estado global reiniciado.
+    """
+    module = importlib.import_module(TARGET_MODULES[target])
+    module.llm_client = None
+    module.llm_cache = None
+    module.profiler = PipelineProfiler()
+    module.OUTPUT_CSV = os.path.join(work_dir, f"{target}_{mode}_w{workers}.csv")
+
+    argv = [
+        module.__file__, "--no-cache", "--full",
+        "--workers", str(workers),
+        "--llm-rate", str(llm_rate),
+        "--batch" if mode == "batch" else "--no-batch",
+    ]
+    # Rutas y URLs por argumento: tienen prioridad sobre kb_config.json y RAGKB_DOCS_* / RAGKB_SITE_*
+    argv += ["--output", module.OUTPUT_CSV]
+    if target == "docs":
+        module.ROOT_DIR = fixtures_root
+        argv += ["--root-dir", fixtures_root, "--extract-workers", str(extract_workers)]
+        documents = len(module.discover_files(fixtures_root))
+    else:
+        module.fetcher = None
+        module.URLS = list(site_urls)
+        module.HTTP_MIN_DELAY = 0
+        argv += ["--no-http-cache"]
+        for url in site_urls:
+            argv += ["--url", url]
+        documents = len(site_urls)
+
+    mock.reset_stats()
+    saved_argv = sys.argv
+    sys.argv = argv
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            module.main()
+    finally:
+        sys.argv = saved_argv
+    wall = time.perf_counter() - start
+
+    telemetry = module.llm_client.telemetry.summary()
+    profile = module.profiler.report()
+    rows = list(load_kb_rows(module.OUTPUT_CSV)) if os.path.exists(module.OUTPUT_CSV) else []
+
+    return {
+        "target": target,
+        "mode": mode,
+        "workers": workers,
+        "documents": documents,
+        "rows": len(rows),
+        "wall_s": round(wall, 3),
+        "pages_per_min": round(documents / wall * 60, 1) if wall else None,
+        "llm_calls": mock.stats["requests"],
+        "calls_per_s": round(mock.stats["requests"] / wall, 2) if wall else None,
+        "llm_ok": mock.stats["ok"],
+        "llm_errors": mock.stats["errors"],
+        "llm_throttled": mock.stats["throttled"],
+        "llm_p50_ms": telemetry["latency_ms"]["p50"],
+        "llm_p95_ms": telemetry["latency_ms"]["p95"],
+        "prompt_tokens": telemetry["tokens"]["prompt"],
+        "completion_tokens": telemetry["tokens"]["completion"],
+        "stages_s": {name: data["wall_s"] for name, data in profile["stages"].items()},
+    }
+
+
+# ==========================
+# RESULTADOS
+# ==========================
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def load_previous_run(path: str):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                last = json.loads(line)
+    return last
+
+
+def _key(result: dict) -> tuple:
+    return result["target"], result["mode"], result["workers"]
+
+
+def print_report(run: dict, previous: dict) -> None:
+    print(f"\n{'Generador':<6} {'modo':<7} {'workers':>7} {'docs':>5} {'filas':>6} {'s':>7} {'pág/min':>8} "
+          f"{'llam/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'5xx':>4} {'429':>4} {'LLM s':>7} {'extr. s':>7}")
+    for r in run["results"]:
+        # "llm" es el tiempo de pared por documento; las etapas por llamada suman hilos
+        extract = sum(seconds for name, seconds in r["stages_s"].items() if name.startswith("extract_") or name == "fetch")
+        print(
+            f"{r['target']:<6} {r['mode']:<7} {r['workers']:>7} {r['documents']:>5} {r['rows']:>6} "
+            f"{r['wall_s']:>7.1f} {r['pages_per_min']:>8.1f} {r['calls_per_s']:>7.1f} "
+            f"{(r['llm_p50_ms'] or 0):>7.0f} {(r['llm_p95_ms'] or 0):>7.0f} {r['llm_errors']:>4} {r['llm_throttled']:>4} "
+            f"{r['stages_s'].get('llm', 0):>7.1f} {extract:>7.1f}"
+        )
+
+    previous_results = {_key(r): r for r in previous["results"]} if previous else {}
+    if previous_results:
+        print(f"\nComparación con la ejecución anterior ({previous.get('timestamp')}, {previous.get('git') or 'sin git'}):")
+        for r in run["results"]:
+            prev = previous_results.get(_key(r))
+            if prev:
+                print(
+                    f"  {r['target']:<6} {r['mode']:<7} w{r['workers']:<3} pág/min {prev['pages_per_min']:.1f} -> "
+                    f"{r['pages_per_min']:.1f} | llam/s {prev['calls_per_s']:.1f} -> {r['calls_per_s']:.1f}"
+                )
+
+
+def _int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _str_list(value: str) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo de los generadores contra un LLM simulado.")
+    parser.add_argument("--targets", type=_str_list, default=DEFAULT_TARGETS, help="docs, site o ambos (por defecto docs,site)")
+    parser.add_argument("--workers", type=_int_list, default=DEFAULT_WORKERS, help="Valores de --workers a comparar (por defecto 1,4,8)")
+    parser.add_argument("--modes", type=_str_list, default=DEFAULT_MODES, help="single, batch o ambos")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="Páginas HTML sintéticas")
+    parser.add_argument("--pdfs", type=int, default=DEFAULT_PDFS, help="PDF sintéticos (solo docs)")
+    parser.add_argument("--fixtures", help="Carpeta con HTML/PDF guardados en lugar de las fixtures sintéticas")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help=f"Latencia del LLM simulado (por defecto {DEFAULT_LATENCY})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de 503 del LLM simulado")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probabilidad de 429 del LLM simulado")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Límite de peticiones/s del LLM simulado (429 al superarlo)")
+    parser.add_argument("--llm-rate", type=float, default=DEFAULT_LLM_RATE, help=f"Ritmo inicial del cliente (por defecto {DEFAULT_LLM_RATE})")
+    parser.add_argument("--extract-workers", type=int, default=1, help="Procesos de extracción de process_docs (por defecto 1)")
+    parser.add_argument("--kb", nargs="*", default=DEFAULT_KB_FILES, help="KB de la que salen los textos sintéticos")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSONL de resultados (por defecto {DEFAULT_OUTPUT})")
+    parser.add_argument("--no-save", action="store_true", help="No guardar esta ejecución")
+    parser.add_argument("--keep", action="store_true", help="Conservar la carpeta temporal con fixtures y CSV")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    if args.fixtures:
+        fixtures_root = os.path.abspath(args.fixtures)
+        fixtures = find_fixtures(fixtures_root)
+    else:
+        fixtures_root = os.path.join(work_dir, "fixtures")
+        kb_rows = load_kb_files([path for path in args.kb if os.path.exists(path)])
+        fixtures = write_fixtures(fixtures_root, kb_rows, args.pages, args.pdfs)
+    print(f"Fixtures: {len(fixtures['html'])} HTML, {len(fixtures['pdf'])} PDF en {fixtures_root}")
+
+    # Endpoint y key del LLM simulado (tienen prioridad sobre kb_config.json)
+    mock = MockLLMServer(
+        latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate, max_rps=args.max_rps,
+    ).start()
+    os.environ["RAGKB_LLM_API_URL"] = mock.url
+    os.environ["RAGKB_LLM_API_KEY"] = "mock"
+    print(f"LLM simulado: {mock.url} (latencia {args.latency})")
+
+    site = FixtureSite(fixtures_root, fixtures["html"]) if "site" in args.targets else None
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "fixtures": args.fixtures or "sintéticas",
+        "html": len(fixtures["html"]),
+        "pdf": len(fixtures["pdf"]),
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "results": [],
+    }
+    try:
+        for target in args.targets:
+            for mode in args.modes:
+                for workers in args.workers:
+                    print(f"  → {target} | {mode} | --workers {workers}...")
+                    run["results"].append(run_generator(
+                        target, workers, mode, fixtures_root, site.urls if site else [],
+                        work_dir, mock, args.llm_rate, args.extract_workers,
+                    ))
+    finally:
+        mock.stop()
+        if site:
+            site.stop()
+        if args.keep:
+            print(f"📁 Archivos del benchmark: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    previous = load_previous_run(args.output)
+    print_report(run, previous)
+
+    if not args.no_save:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+        print(f"\n💾 Resultados añadidos a {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Benchmark de recuperación sobre la base de conocimientos: latencia y calidad.
+
+Backends:
+- like: réplica de la búsqueda actual del plugin (kb_baseline.py).
+- bm25: índice invertido BM25F (kb_index.py).
+- vectors: n-gramas de caracteres + TF-IDF con NumPy (kb_vectors.py), consulta a consulta.
+- vectors-batch: el mismo índice resolviendo todas las consultas en bloque (solo QPS).
+
+Consultas: cada pregunta generada, más variantes con ruido (sin tildes ni signos, erratas,
+palabras omitidas) y paráfrasis de las plantillas ("cuánto se demora" -> "en cuántos días
+está listo"). Una respuesta es correcta si la fila devuelta tiene la misma pregunta
+(normalizada) que la fila de la que salió la consulta.
+
+Métricas por backend: latencia p50/p95/p99, consultas por segundo, memoria (pico de
+tracemalloc al construir y memoria retenida por el índice), recall@5 y MRR.
+Cada ejecución se añade a un JSONL y se compara con la anterior.
+
+Uso:
+    python bench_retrieval.py [KB ...] [--backends like,bm25,vectors] [--output bench_retrieval.jsonl]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import time
+import tracemalloc
+
+from kb_baseline import LikeSearch
+from kb_index import KBIndex
+from kb_io import load_kb_files
+from kb_text import STOPWORDS, normalize_text
+
+try:
+    from kb_vectors import KBVectorIndex
+except ImportError:
+    KBVectorIndex = None
+    print("ADVERTENCIA: numpy no está instalado. Se omite el backend vectorial.")
+
+DEFAULT_KB_FILES = [
+    "./deseguridad_knowledge_base_servicios.csv",
+    "./deseguridad_knowledge_base_otros.csv",
+    "./deseguridad_knowledge_base.json",
+]
+DEFAULT_OUTPUT = "./bench_retrieval.jsonl"
+DEFAULT_BACKENDS = ["like", "bm25", "vectors", "vectors-batch"]
+
+TOP_K = 5
+RANDOM_SEED = 42
+
+# Sufijos del título que el usuario nunca escribe
+TITLE_SUFFIXES = [
+    " - De Seguridad y Prevención laboral",
+    " - DESEGURIDAD.NET",
+    " - Deseguridad.net",
+    " en Colombia",
+]
+
+# Paráfrasis de fragmentos de las plantillas de preguntas (process_site.py / process_docs.py)
+PARAPHRASES = [
+    ("¿Cuánto tiempo suele tardar o cuánto se demora el servicio de", "en cuántos días está listo"),
+    ("¿Cuáles son los precios o rangos de inversión del servicio de", "cuánto cuesta"),
+    ("¿Qué hace exactamente paso a paso el servicio de", "cómo es el procedimiento de"),
+    ("¿Para qué sirve exactamente el servicio de", "cuál es la utilidad de"),
+    ("¿Quién lo hace o quién presta el servicio de", "qué profesional realiza"),
+    ("¿Para quién es recomendable el servicio de", "a qué empresas les conviene"),
+    ("¿Dónde se presta o aplica el servicio de", "en qué ciudades hacen"),
+    ("¿Qué incluye el servicio de", "qué trae"),
+    ("¿Tiene licencia el servicio de", "están certificados en"),
+    ("¿Cómo puedo contratar o solicitar más información sobre", "quiero cotizar"),
+    ("¿Qué información hay sobre", "háblame de"),
+    ("¿De qué trata", "resumen de"),
+    ("¿Qué ofrece exactamente", "servicios de"),
+]
+
+
+# ==========================
+# CONSULTAS
+# ==========================
+
+def strip_title_suffixes(text: str) -> str:
+    for suffix in TITLE_SUFFIXES:
+        text = text.replace(suffix, "")
+    return text
+
+
+def noisy_variant(question: str, rng: random.Random) -> str:
+    """
+    Sin tildes ni signos, en minúsculas, con una errata y alguna palabra vacía omitida.
+    """
+    words = re.findall(r"[^\W_]+", normalize_text(strip_title_suffixes(question)))
+    words = [w for w in words if w not in STOPWORDS or rng.random() < 0.5]
+
+    long_words = [i for i, w in enumerate(words) if len(w) >= 5]
+    if long_words:
+        i = rng.choice(long_words)
+        w = words[i]
+        pos = rng.randrange(1, len(w) - 2)
+        words[i] = w[:pos] + w[pos + 1] + w[pos] + w[pos + 2:]
+
+    return " ".join(words)
+
+
+def paraphrase_variant(question: str):
+    """
+    Reescribe el inicio de plantilla conocido; None si la pregunta no usa ninguna.
+    """
+    for original, replacement in PARAPHRASES:
+        if question.startswith(original):
+            rest = strip_title_suffixes(question[len(original):]).strip(" ?")
+            return f"{replacement} {rest}".strip()
+    return None
+
+
+def build_queries(rows: list, seed: int = RANDOM_SEED) -> list:
+    """
+    Devuelve [(tipo, consulta, ids relevantes)].
+    """
+    rng = random.Random(seed)
+
+    ids_by_question = {}
+    for doc_id, row in enumerate(rows):
+        ids_by_question.setdefault(normalize_text(row["question"]).strip(), set()).add(doc_id)
+
+    queries = []
+    seen = set()
+    for row in rows:
+        question = row["question"]
+        relevant = ids_by_question[normalize_text(question).strip()]
+        variants = [
+            ("exacta", question),
+            ("ruido", noisy_variant(question, rng)),
+            ("parafrasis", paraphrase_variant(question)),
+        ]
+        for kind, text in variants:
+            if text and (kind, text) not in seen:
+                seen.add((kind, text))
+                queries.append((kind, text, relevant))
+
+    return queries
+
+
+# ==========================
+# BACKENDS
+# ==========================
+
+def build_backend(name: str, rows: list):
+    """
+    Devuelve (índice, función consulta -> [doc_id]).
+    """
+    if name == "like":
+        index = LikeSearch(rows)
+        return index, lambda query: [doc_id for doc_id, _ in index.search(query, TOP_K)]
+    if name == "bm25":
+        index = KBIndex.build(rows)
+        return index, lambda query: [doc_id for doc_id, _ in index.search(query, TOP_K)]
+    if name in ("vectors", "vectors-batch"):
+        index = KBVectorIndex.build(rows)
+        return index, lambda query: [doc_id for doc_id, _ in index.search(query, TOP_K)]
+    raise ValueError(f"Backend desconocido: {name}")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Percentil por rango más cercano.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _round(value, digits: int = 4):
+    return None if value is None else round(value, digits)
+
+
+def quality(results: list, queries: list) -> dict:
+    """
+    recall@5 y MRR, en total y por tipo de consulta.
+    """
+    by_kind = {}
+    for (kind, _, relevant), doc_ids in zip(queries, results):
+        reciprocal = 0.0
+        for rank, doc_id in enumerate(doc_ids[:TOP_K], 1):
+            if doc_id in relevant:
+                reciprocal = 1.0 / rank
+                break
+        for key in ("total", kind):
+            stats = by_kind.setdefault(key, {"queries": 0, "hits": 0, "rr": 0.0})
+            stats["queries"] += 1
+            stats["hits"] += 1 if reciprocal else 0
+            stats["rr"] += reciprocal
+
+    return {
+        key: {
+            "queries": stats["queries"],
+            "recall_at_5": round(stats["hits"] / stats["queries"], 4),
+            "mrr": round(stats["rr"] / stats["queries"], 4),
+        }
+        for key, stats in by_kind.items()
+    }
+
+
+def run_backend(name: str, rows: list, queries: list) -> dict:
+    tracemalloc.start()
+    build_start = time.perf_counter()
+    index, search_fn = build_backend(name, rows)
+    build_ms = (time.perf_counter() - build_start) * 1000
+    retained, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    texts = [text for _, text, _ in queries]
+
+    if name == "vectors-batch":
+        start = time.perf_counter()
+        results = [[doc_id for doc_id, _ in hits] for hits in index.search_many(texts, TOP_K)]
+        total = time.perf_counter() - start
+        latencies = []
+    else:
+        # Calentamiento (cachés de Python, primeras asignaciones)
+        for text in texts[:20]:
+            search_fn(text)
+
+        results = []
+        latencies = []
+        start = time.perf_counter()
+        for text in texts:
+            t0 = time.perf_counter()
+            results.append(search_fn(text))
+            latencies.append((time.perf_counter() - t0) * 1000)
+        total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "backend": name,
+        "build_ms": round(build_ms, 2),
+        "p50_ms": _round(percentile(latencies, 50)),
+        "p95_ms": _round(percentile(latencies, 95)),
+        "p99_ms": _round(percentile(latencies, 99)),
+        "qps": round(len(texts) / total, 1) if total else 0.0,
+        "build_peak_kb": round(build_peak / 1024, 1),
+        "index_kb": round(retained / 1024, 1),
+        "quality": quality(results, queries),
+    }
+
+
+# ==========================
+# RESULTADOS
+# ==========================
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def load_previous_run(path: str):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                last = json.loads(line)
+    return last
+
+
+def _ms(value) -> str:
+    """
+    Latencia para las tablas; "-" en el modo por bloques (no hay latencia por consulta).
+    """
+    return "-" if value is None else f"{value:.3f}"
+
+
+def print_report(run: dict, previous: dict) -> None:
+    previous_by_backend = {b["backend"]: b for b in previous["backends"]} if previous else {}
+
+    print(f"\n{'Backend':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'QPS':>9} {'índice KB':>10} {'recall@5':>9} {'MRR':>7}")
+    for b in run["backends"]:
+        total = b["quality"]["total"]
+        print(
+            f"{b['backend']:<14} {_ms(b['p50_ms']):>8} {_ms(b['p95_ms']):>8} {_ms(b['p99_ms']):>8} "
+            f"{b['qps']:>9.1f} {b['index_kb']:>10.1f} {total['recall_at_5']:>9.3f} {total['mrr']:>7.3f}"
+        )
+
+    print(f"\n{'Backend':<14} {'tipo':<11} {'consultas':>9} {'recall@5':>9} {'MRR':>7}")
+    for b in run["backends"]:
+        for kind, stats in sorted(b["quality"].items()):
+            if kind != "total":
+                print(f"{b['backend']:<14} {kind:<11} {stats['queries']:>9} {stats['recall_at_5']:>9.3f} {stats['mrr']:>7.3f}")
+
+    if previous_by_backend:
+        print(f"\nComparación con la ejecución anterior ({previous.get('timestamp')}, {previous.get('git') or 'sin git'}):")
+        for b in run["backends"]:
+            prev = previous_by_backend.get(b["backend"])
+            if not prev:
+                continue
+            print(
+                f"  {b['backend']:<14} p95 {_ms(prev['p95_ms'])} -> {_ms(b['p95_ms'])} ms | "
+                f"QPS {prev['qps']:.0f} -> {b['qps']:.0f} | "
+                f"recall@5 {prev['quality']['total']['recall_at_5']:.3f} -> {b['quality']['total']['recall_at_5']:.3f} | "
+                f"MRR {prev['quality']['total']['mrr']:.3f} -> {b['quality']['total']['mrr']:.3f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia y recall de los backends de búsqueda.")
+    parser.add_argument("kb_files", nargs="*", default=DEFAULT_KB_FILES, help="Archivos de la KB (.csv / .json)")
+    parser.add_argument("--backends", default=",".join(DEFAULT_BACKENDS), help="Backends separados por comas")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help="Semilla de las variantes con ruido")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSONL de resultados (por defecto {DEFAULT_OUTPUT})")
+    parser.add_argument("--no-save", action="store_true", help="No guardar esta ejecución")
+    args = parser.parse_args()
+
+    missing = [path for path in args.kb_files if not os.path.exists(path)]
+    if missing:
+        parser.error(f"no existen los archivos de la KB: {', '.join(missing)} (directorio actual: {os.getcwd()})")
+    kb_files = args.kb_files
+    rows = load_kb_files(kb_files)
+    queries = build_queries(rows, args.seed)
+    if not queries:
+        parser.error(f"la KB no tiene preguntas con las que generar consultas: {', '.join(kb_files)}")
+    print(f"KB: {len(rows)} filas de {len(kb_files)} archivos | consultas: {len(queries)}")
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    if KBVectorIndex is None:
+        backends = [name for name in backends if not name.startswith("vectors")]
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "kb_files": [os.path.basename(path) for path in kb_files],
+        "rows": len(rows),
+        "queries": len(queries),
+        "seed": args.seed,
+        "backends": [],
+    }
+    for name in backends:
+        print(f"  → {name}...")
+        run["backends"].append(run_backend(name, rows, queries))
+
+    previous = load_previous_run(args.output)
+    print_report(run, previous)
+
+    if not args.no_save:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+        print(f"\n💾 Resultados añadidos a {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Detección de texto repetido en todo el sitio (boilerplate) para process_site.py y process_docs.py.
+
+La lista fija de selectores de html_extract.py no atrapa todo el "chrome" del theme:
+"Campo Obligatorio Δ", el CTA de WhatsApp, "© 2025 deseguridad.net – All rights reserved.
+¿Olvidaste tu contraseña?"... Ese texto ocupa el presupuesto de caracteres del prompt y acaba
+en las respuestas.
+
+- Cada bloque de texto (h1-h4/p/li de extract_html_blocks) se normaliza (minúsculas, espacios,
+  años -> 0000 para que "© 2025" y "© 2026" coincidan) y se resume en una huella de 64 bits.
+- Frecuencia por documento: un bloque es boilerplate si aparece en al menos `min_pages`
+  páginas y en al menos `min_share` del total.
+- Las huellas de cada documento se guardan entre ejecuciones (`<salida>.boilerplate.json`),
+  así que las páginas que no se vuelven a extraer (lastmod sin cambios) siguen contando.
+- El informe dice cuántos caracteres y tokens (~4 caracteres por token) se quitaron, en total
+  y dentro del presupuesto del prompt.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+MIN_PAGES = 3          # un bloque tiene que repetirse al menos en estas páginas...
+MIN_SHARE = 0.5        # ...y en al menos esta fracción de todas
+CHARS_PER_TOKEN = 4
+SAMPLE_CHARS = 120
+CACHE_VERSION = 1
+
+_SPACE_RE = re.compile(r"\s+")
+_YEAR_RE = re.compile(r"\b(19|20)\d\d\b")
+
+
+def boilerplate_path_for(output_csv: str) -> str:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.boilerplate.json
+    """
+    return os.path.splitext(output_csv)[0] + ".boilerplate.json"
+
+
+def block_fingerprint(text: str) -> str:
+    normalized = _YEAR_RE.sub("0000", _SPACE_RE.sub(" ", text).strip().lower())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BoilerplateDetector:
+    """
+    Uso:
+        detector = BoilerplateDetector()
+        detector.load(path)                  # huellas de ejecuciones anteriores
+        for doc, blocks in ...: detector.add_page(doc, blocks)
+        detector.prune(todos_los_docs)       # olvida documentos que ya no existen
+        detector.compute()
+        blocks = detector.filter(blocks, budget=3000)
+        detector.save(path)
+    """
+
+    def __init__(self, min_pages: int = MIN_PAGES, min_share: float = MIN_SHARE):
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.documents = {}
+        self.samples = {}
+        self.fingerprints = set()
+        self.stats = {
+            "pages_filtered": 0, "blocks_removed": 0, "chars_before": 0, "chars_removed": 0,
+            "prompt_chars_removed": 0,
+        }
+
+    def load(self, path: str) -> int:
+        """
+        Carga las huellas por documento de la ejecución anterior. Devuelve cuántos documentos leyó.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("version") != CACHE_VERSION:
+            return 0
+
+        self.documents = {doc: set(fps) for doc, fps in data.get("documents", {}).items()}
+        self.samples = {item["fingerprint"]: item["sample"] for item in data.get("boilerplate", [])}
+        return len(self.documents)
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": CACHE_VERSION,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_pages": self.min_pages,
+            "min_share": self.min_share,
+            "stats": dict(self.stats),
+            "boilerplate": sorted(
+                ({"fingerprint": fp, "pages": count, "sample": self.samples.get(fp, "")}
+                 for fp, count in self._document_frequency().items() if fp in self.fingerprints),
+                key=lambda item: -item["pages"],
+            ),
+            "documents": {doc: sorted(fps) for doc, fps in sorted(self.documents.items())},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def add_page(self, doc: str, blocks: list) -> None:
+        """
+        Registra (o sustituye) los bloques de un documento.
+        """
+        fps = set()
+        for block in blocks or ():
+            fp = block_fingerprint(block)
+            fps.add(fp)
+            self.samples.setdefault(fp, block[:SAMPLE_CHARS])
+        self.documents[doc] = fps
+
+    def prune(self, docs) -> None:
+        """
+        Conserva solo los documentos de `docs` (los demás ya no forman parte del sitio).
+        """
+        docs = set(docs)
+        self.documents = {doc: fps for doc, fps in self.documents.items() if doc in docs}
+
+    def _document_frequency(self) -> dict:
+        frequency = {}
+        for fps in self.documents.values():
+            for fp in fps:
+                frequency[fp] = frequency.get(fp, 0) + 1
+        return frequency
+
+    def compute(self) -> set:
+        threshold = max(self.min_pages, self.min_share * len(self.documents))
+        self.fingerprints = {fp for fp, count in self._document_frequency().items() if count >= threshold}
+        return self.fingerprints
+
+    def filter(self, blocks: list, budget: int = None) -> list:
+        """
+        Quita los bloques boilerplate. Si todos lo son, se devuelven sin tocar (la página no se
+        queda vacía). `budget` = caracteres que usa el prompt, para medir el ahorro real en él.
+        """
+        if not blocks:
+            return blocks
+
+        kept = []
+        removed_chars = 0
+        prompt_removed = 0
+        position = 0
+        for block in blocks:
+            size = len(block) + 1
+            if block_fingerprint(block) in self.fingerprints:
+                removed_chars += size
+                if budget is not None and position < budget:
+                    prompt_removed += min(size, budget - position)
+            else:
+                kept.append(block)
+            position += size
+
+        self.stats["chars_before"] += position
+        if not kept or not removed_chars:
+            return blocks
+
+        self.stats["pages_filtered"] += 1
+        self.stats["blocks_removed"] += len(blocks) - len(kept)
+        self.stats["chars_removed"] += removed_chars
+        self.stats["prompt_chars_removed"] += prompt_removed
+        return kept
+
+    def summary(self) -> str:
+        s = self.stats
+        share = s["chars_removed"] / s["chars_before"] if s["chars_before"] else 0.0
+        return (
+            f"boilerplate: {len(self.fingerprints)} bloques repetidos en {len(self.documents)} documentos | "
+            f"{s['blocks_removed']} bloques quitados de {s['pages_filtered']} páginas | "
+            f"{s['chars_removed']} caracteres ({share:.0%}, ~{s['chars_removed'] // CHARS_PER_TOKEN} tokens), "
+            f"{s['prompt_chars_removed']} dentro del presupuesto del prompt (~{s['prompt_chars_removed'] // CHARS_PER_TOKEN} tokens)"
+        )
+
+    def top_blocks(self, limit: int = 5) -> list:
+        """
+        [(páginas, muestra)] de los bloques boilerplate más repetidos.
+        """
+        frequency = self._document_frequency()
+        ranked = sorted(self.fingerprints, key=lambda fp: -frequency.get(fp, 0))
+        return [(frequency.get(fp, 0), self.samples.get(fp, "")) for fp in ranked[:limit]]
@@ -0,0 +1,50 @@
+"""
+Extractor de DOCX (python-docx) para extractors.py.
+
+Se importa la primera vez que aparece un .docx, así que el aviso de que falta python-docx
+solo sale cuando hay DOCX que procesar.
+"""
+
+import os
+
+from extractors import join_within_budget
+
+try:
+    import docx
+except ImportError:
+    docx = None
+    print("ADVERTENCIA: python-docx no está instalado. No se procesarán DOCX.")
+
+
+def iter_docx_text(document):
+    """
+    Genera el texto (ya limpio) de cada párrafo del DOCX, uno a uno.
+    """
+    for para in document.paragraphs:
+        txt = para.text.strip()
+        if txt:
+            yield txt
+
+
+def extract_docx_content(file_path: str, max_chars: int = None) -> tuple:
+    """
+    Extrae texto de un DOCX hasta reunir `max_chars` caracteres (None = documento completo).
+    Título = nombre de archivo sin extensión.
+    """
+    if docx is None:
+        return "", ""
+
+    title = os.path.splitext(os.path.basename(file_path))[0]
+
+    try:
+        document = docx.Document(file_path)
+    except Exception as e:
+        print(f"Error al procesar DOCX {file_path}: {e}")
+        return title, ""
+
+    full_text = join_within_budget(iter_docx_text(document), max_chars)
+    return title, full_text
+
+
+def extract(file_path: str, options: dict) -> tuple:
+    return extract_docx_content(file_path, options.get("max_chars"))
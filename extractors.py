@@ -0,0 +1,82 @@
+"""
+Registro de extractores de texto por tipo de archivo (process_docs.py, ragkb.py extract).
+
+Cada extensión apunta a un extractor "módulo:función" que solo se importa cuando aparece
+el primer archivo de ese tipo: una carpeta solo con HTML no carga pdfplumber ni python-docx
+(ni avisa de que faltan).
+
+Un extractor es una función `extract(file_path, options) -> (title, text)`, con options:
+- max_chars: dejar de leer al reunir estos caracteres (None = documento completo).
+- html_backend / html_blocks: parser HTML y devolver la lista de bloques en lugar del texto.
+
+Tipos nuevos, sin tocar el código:
+    register_extractor(".txt", "Texto", "mi_modulo:extract")
+o en la sección "docs" de kb_config.json:
+    {"docs": {"extractors": {".txt": ["Texto", "mi_modulo:extract"]}}}
+"""
+
+import importlib
+
+# Extensión -> (etiqueta de "source" en el CSV, "módulo:función")
+EXTRACTORS = {}
+
+# Extractores ya importados (None = el módulo no se pudo cargar)
+_loaded = {}
+
+
+def register_extractor(ext: str, source: str, target: str) -> None:
+    ext = ext.lower() if ext.startswith(".") else "." + ext.lower()
+    EXTRACTORS[ext] = (source, target)
+    _loaded.pop(ext, None)
+
+
+def supported_extensions() -> dict:
+    """
+    {extensión: etiqueta de "source"} de los tipos registrados.
+    """
+    return {ext: source for ext, (source, _) in EXTRACTORS.items()}
+
+
+def source_label(ext: str) -> str:
+    return EXTRACTORS[ext.lower()][0]
+
+
+def get_extractor(ext: str):
+    """
+    Función extractora de la extensión (la importa la primera vez), o None si no hay.
+    """
+    ext = ext.lower()
+    if ext in _loaded:
+        return _loaded[ext]
+    if ext not in EXTRACTORS:
+        return None
+
+    module_name, _, func_name = EXTRACTORS[ext][1].partition(":")
+    try:
+        func = getattr(importlib.import_module(module_name), func_name)
+    except (ImportError, AttributeError) as e:
+        print(f"ADVERTENCIA: no se pudo cargar el extractor de {ext} ({EXTRACTORS[ext][1]}): {e}")
+        func = None
+    _loaded[ext] = func
+    return func
+
+
+def join_within_budget(parts, max_chars: int = None) -> str:
+    """
+    Une los fragmentos con espacios y deja de consumir `parts` en cuanto el texto
+    alcanza `max_chars` caracteres (None = todos). Sirve con generadores perezosos:
+    las páginas/párrafos que no se necesitan ni siquiera se leen.
+    """
+    collected = []
+    length = -1
+    for part in parts:
+        collected.append(part)
+        length += len(part) + 1
+        if max_chars is not None and length >= max_chars:
+            break
+    return " ".join(collected)
+
+
+register_extractor(".html", "Web (HTML)", "html_extract:extract")
+register_extractor(".pdf", "Documento PDF", "pdf_extract:extract")
+register_extractor(".docx", "Documento DOCX", "docx_extract:extract")
@@ -0,0 +1,364 @@
+"""
+Caché de consultas frecuentes (hot queries) a partir de los logs de conversaciones.
+
+handle_user_message ejecuta search_knowledge_base (LIKE sobre toda la tabla + scoring en PHP)
+con cada mensaje, aunque el tráfico real se concentra en unas pocas decenas de preguntas.
+Este script:
+
+1. Lee los logs exportados con la forma de RAG_Chatbot_Database::get_combined_logs
+   (id, session_id, user_message, bot_response, source, status, created_at...), en JSON,
+   JSONL o CSV.
+2. Normaliza cada mensaje como el plugin: sanitize_text_field + extract_key_terms. La clave
+   de la caché son esos términos ordenados (sort($terms, SORT_STRING) + implode(' ') en PHP),
+   así "precio mediciones" y "mediciones, precio" comparten entrada.
+3. Agrupa las claves que solo se distinguen por la puntuación pegada ("precio?" / "precio")
+   en clústeres y se queda con los más frecuentes (--min-count, --max-entries). El clúster
+   solo decide qué entra: la puntuación pegada cambia los resultados del plugin.
+4. Precalcula, para cada clave de esos clústeres, las 5 FAQ que devolvería
+   search_knowledge_base con el mensaje más frecuente de esa clave (réplica de kb_baseline.py).
+5. Escribe un artefacto JSON compacto: {clave: entrada} + sugerencias + FAQ, con sellos de
+   versión (formato, normalizador y hash de la KB): si la KB cambia, hay que regenerarlo.
+6. Repite los logs contra la caché: tasa de aciertos sobre todos los mensajes y sobre el
+   último tramo (--holdout), con una caché construida solo con los mensajes anteriores.
+   También mide cuántos aciertos devuelven exactamente las mismas FAQ que la búsqueda real.
+
+Uso:
+    python hot_queries.py build logs.json [--kb KB ...] [-o hot_queries.json] [--min-count 2] [--holdout 0.2]
+    python hot_queries.py lookup hot_queries.json "¿cuánto cuesta la medición de ruido?"
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+from kb_baseline import LikeSearch
+from kb_io import KB_FIELDS, load_kb_files
+from kb_text import extract_key_terms, query_index_terms, sanitize_text_field
+
+CACHE_FORMAT = "rag-hot-queries"
+CACHE_VERSION = 2
+# Cambia si cambia la normalización de kb_text.py (las claves dejarían de coincidir)
+NORMALIZER_VERSION = "sanitize_text_field+extract_key_terms/1"
+
+DEFAULT_CACHE_PATH = "./hot_queries.json"
+DEFAULT_KB_FILES = [
+    "./deseguridad_knowledge_base_servicios.csv",
+    "./deseguridad_knowledge_base_otros.csv",
+]
+TOP_K = 5
+MIN_COUNT = 2
+MAX_ENTRIES = 500
+HOLDOUT = 0.2
+
+
+# ==========================
+# LOGS
+# ==========================
+
+def load_logs(path: str) -> list:
+    """
+    Filas de log (dicts) de un JSON (lista, o {"data": [...]} como la respuesta AJAX de
+    WordPress), JSONL o CSV.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            header = f.readline()
+            f.seek(0)
+            delimiter = ";" if header.count(";") >= header.count(",") else ","
+            return list(csv.DictReader(f, delimiter=delimiter))
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if ext == ".jsonl":
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("data") or data.get("logs") or []
+    return [row for row in data if isinstance(row, dict)]
+
+
+def load_messages(paths: list) -> list:
+    """
+    Mensajes de usuario en orden cronológico (get_combined_logs los devuelve del más reciente
+    al más antiguo). Se omiten los mensajes vacíos.
+    """
+    rows = []
+    for path in paths:
+        rows.extend(load_logs(path))
+    rows = [row for row in rows if str(row.get("user_message") or "").strip()]
+    rows.sort(key=lambda row: (str(row.get("created_at") or ""), int(row.get("id") or 0)))
+    return [str(row["user_message"]) for row in rows]
+
+
+# ==========================
+# NORMALIZACIÓN
+# ==========================
+
+def query_key(message: str) -> str:
+    """
+    Clave de la caché: los términos de extract_key_terms ordenados ("" si no hay ninguno,
+    y entonces el plugin tampoco busca).
+    """
+    return " ".join(sorted(extract_key_terms(sanitize_text_field(message.strip()))))
+
+
+def cluster_key(message: str) -> str:
+    """
+    Clave del clúster: los mismos términos sin la puntuación pegada.
+    """
+    return " ".join(sorted(query_index_terms(sanitize_text_field(message.strip()))))
+
+
+def kb_fingerprint(rows: list) -> str:
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update("\x1f".join(row.get(field, "") for field in KB_FIELDS).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+# ==========================
+# CONSTRUCCIÓN
+# ==========================
+
+def build_cache(messages: list, rows: list, search: LikeSearch = None, min_count: int = MIN_COUNT,
+                max_entries: int = MAX_ENTRIES, k: int = TOP_K) -> dict:
+    """
+    Artefacto de la caché para `messages`. Un clúster entra si se repite al menos
+    `min_count` veces; como mucho `max_entries` clústeres, los más frecuentes. Cada clave
+    del clúster tiene su propia entrada, calculada con su mensaje más frecuente.
+    """
+    search = search or LikeSearch(rows)
+
+    key_counts = Counter()
+    key_messages = {}
+    clusters = {}
+    for message in messages:
+        key = query_key(message)
+        if not key:
+            continue
+        key_counts[key] += 1
+        key_messages.setdefault(key, Counter())[message.strip()] += 1
+        cluster = clusters.setdefault(cluster_key(message), {"count": 0, "keys": set()})
+        cluster["count"] += 1
+        cluster["keys"].add(key)
+
+    hot = sorted(
+        (cluster for cluster in clusters.values() if cluster["count"] >= min_count),
+        key=lambda cluster: -cluster["count"],
+    )[:max_entries]
+
+    faq_ids = {}
+    entries = []
+    keys = {}
+    for cluster in hot:
+        for key in sorted(cluster["keys"], key=lambda key: (-key_counts[key], key)):
+            if key in keys:
+                continue
+            representative = key_messages[key].most_common(1)[0][0]
+            suggestions = []
+            for doc_id, score in search.search(representative, k):
+                suggestions.append([faq_ids.setdefault(doc_id, len(faq_ids)), score])
+            keys[key] = len(entries)
+            entries.append([key_counts[key], representative, suggestions])
+
+    faqs = [None] * len(faq_ids)
+    for doc_id, faq_id in faq_ids.items():
+        row = rows[doc_id]
+        faqs[faq_id] = [row["question"], row["answer"], row["category"], row["source"], row["source_url"]]
+
+    return {
+        "format": CACHE_FORMAT,
+        "version": CACHE_VERSION,
+        "normalizer": NORMALIZER_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kb": {"rows": len(rows), "hash": kb_fingerprint(rows)},
+        "limit": k,
+        "stats": {
+            "messages": len(messages),
+            "distinct_keys": len(key_counts),
+            "clusters": len(clusters),
+            "hot_clusters": len(hot),
+            "hot_keys": len(entries),
+        },
+        "keys": keys,
+        "entries": entries,
+        "faqs": faqs,
+    }
+
+
+class HotQueryCache:
+    """
+    Consulta del artefacto: una búsqueda en un dict por mensaje.
+    """
+
+    def __init__(self, data: dict):
+        if data.get("format") != CACHE_FORMAT or data.get("version") != CACHE_VERSION:
+            raise ValueError("El archivo no es una caché de consultas frecuentes compatible.")
+        if data.get("normalizer") != NORMALIZER_VERSION:
+            raise ValueError(f"La caché se generó con otro normalizador ({data.get('normalizer')}); vuelve a generarla.")
+        self.data = data
+        self.keys = data["keys"]
+        self.entries = data["entries"]
+        self.faqs = data["faqs"]
+
+    @classmethod
+    def load(cls, path: str) -> "HotQueryCache":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def get(self, message: str):
+        """
+        Lista de FAQ (dicts como los de search_knowledge_base, con "score") o None si el
+        mensaje no está en la caché y hay que buscar.
+        """
+        entry_id = self.keys.get(query_key(message))
+        if entry_id is None:
+            return None
+        return [
+            dict(zip(KB_FIELDS, self.faqs[faq_id]), score=score)
+            for faq_id, score in self.entries[entry_id][2]
+        ]
+
+    def is_stale(self, rows: list) -> bool:
+        return self.data["kb"]["hash"] != kb_fingerprint(rows)
+
+
+# ==========================
+# REPETICIÓN DE LOGS
+# ==========================
+
+def replay(cache: HotQueryCache, messages: list, rows: list, search: LikeSearch) -> dict:
+    """
+    Tasa de aciertos de la caché sobre `messages` y, de los aciertos, cuántos devuelven
+    exactamente las mismas FAQ que search_knowledge_base con el mensaje original.
+    """
+    searchable = hits = same = 0
+    for message in messages:
+        if not query_key(message):
+            continue  # sin términos: el plugin tampoco consulta la tabla
+        searchable += 1
+        cached = cache.get(message)
+        if cached is None:
+            continue
+        hits += 1
+        expected = [rows[doc_id]["question"] for doc_id, _ in search.search(message, cache.data["limit"])]
+        if [faq["question"] for faq in cached] == expected:
+            same += 1
+
+    return {
+        "messages": len(messages),
+        "searchable": searchable,
+        "hits": hits,
+        "hit_rate": round(hits / searchable, 4) if searchable else 0.0,
+        "same_results": round(same / hits, 4) if hits else None,
+    }
+
+
+def _pct(value) -> str:
+    return "-" if value is None else f"{value * 100:.1f}%"
+
+
+# ==========================
+# CLI
+# ==========================
+
+def cmd_build(args) -> None:
+    start = time.perf_counter()
+    messages = load_messages(args.logs)
+    rows = load_kb_files(args.kb)
+    search = LikeSearch(rows)
+    print(f"Mensajes: {len(messages)} | FAQ en la KB: {len(rows)}")
+
+    # Caché con el tramo inicial, repetida sobre el tramo final que no vio
+    split = int(len(messages) * (1 - args.holdout))
+    holdout_result = None
+    if args.holdout and 0 < split < len(messages):
+        train_cache = HotQueryCache(build_cache(messages[:split], rows, search, args.min_count, args.max_entries, args.k))
+        holdout_result = replay(train_cache, messages[split:], rows, search)
+
+    cache = HotQueryCache(build_cache(messages, rows, search, args.min_count, args.max_entries, args.k))
+    full_result = replay(cache, messages, rows, search)
+    cache.data["replay"] = {"all": full_result, "holdout": holdout_result, "holdout_share": args.holdout}
+    cache.data["sources"] = {
+        "logs": [os.path.basename(path) for path in args.logs],
+        "kb": [os.path.basename(path) for path in args.kb],
+    }
+    cache.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    stats = cache.data["stats"]
+    print(f"Claves distintas: {stats['distinct_keys']} | clústeres: {stats['clusters']} | "
+          f"en caché: {stats['hot_clusters']} ({stats['hot_keys']} claves, min. {args.min_count} repeticiones)")
+    print(f"Aciertos repitiendo todos los logs: {_pct(full_result['hit_rate'])} de {full_result['searchable']} búsquedas "
+          f"| mismas FAQ que la búsqueda: {_pct(full_result['same_results'])}")
+    if holdout_result:
+        print(f"Aciertos en el último {args.holdout:.0%} (caché construida con el resto): {_pct(holdout_result['hit_rate'])} "
+              f"de {holdout_result['searchable']} búsquedas | mismas FAQ: {_pct(holdout_result['same_results'])}")
+
+    if cache.entries:
+        print("\nConsultas más frecuentes:")
+        for count, representative, suggestions in cache.entries[:args.show]:
+            print(f"  {count:>5}  {representative[:80]}  ({len(suggestions)} FAQ)")
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"\n📄 {args.output} ({size_kb:.1f} KB, KB {cache.data['kb']['hash']}) en {elapsed * 1000:.0f} ms")
+
+
+def cmd_lookup(args) -> None:
+    cache = HotQueryCache.load(args.cache)
+
+    start = time.perf_counter()
+    results = cache.get(args.query)
+    elapsed = time.perf_counter() - start
+
+    print(f"Clave: {query_key(args.query) or '(sin términos)'}")
+    if results is None:
+        print(f"No está en la caché ({elapsed * 1000:.3f} ms): el plugin haría la búsqueda normal.")
+        return
+    print(f"{len(results)} FAQ en {elapsed * 1000:.3f} ms\n")
+    for rank, faq in enumerate(results, 1):
+        print(f"{rank}. [{faq['score']}] {faq['question']}")
+        print(f"   {faq['category']} | {faq['source_url']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Caché de consultas frecuentes a partir de los logs de conversaciones.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Construir la caché desde logs exportados")
+    build.add_argument("logs", nargs="+", help="Logs de conversaciones (.json, .jsonl o .csv)")
+    build.add_argument("--kb", nargs="+", default=DEFAULT_KB_FILES, help="Archivos de la KB (.csv o .json)")
+    build.add_argument("-o", "--output", default=DEFAULT_CACHE_PATH, help=f"Artefacto de la caché (por defecto {DEFAULT_CACHE_PATH})")
+    build.add_argument("--min-count", type=int, default=MIN_COUNT, help=f"Repeticiones mínimas para entrar en la caché (por defecto {MIN_COUNT})")
+    build.add_argument("--max-entries", type=int, default=MAX_ENTRIES, help=f"Máximo de clústeres en la caché (por defecto {MAX_ENTRIES})")
+    build.add_argument("--holdout", type=float, default=HOLDOUT, help=f"Fracción final de los logs para medir aciertos sin verlos (por defecto {HOLDOUT}; 0 = no)")
+    build.add_argument("-k", type=int, default=TOP_K, help=f"FAQ por consulta (por defecto {TOP_K})")
+    build.add_argument("--show", type=int, default=10, help="Consultas frecuentes que se muestran")
+    build.set_defaults(func=cmd_build)
+
+    lookup = subparsers.add_parser("lookup", help="Consultar la caché")
+    lookup.add_argument("cache", help="Artefacto de la caché")
+    lookup.add_argument("query", help="Mensaje del usuario")
+    lookup.set_defaults(func=cmd_lookup)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
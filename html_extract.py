@@ -0,0 +1,316 @@
+"""
+Extractor HTML compartido por process_site.py y process_docs.py.
+
+Recorre el árbol UNA sola vez:
+- poda header/footer/nav/aside y los contenedores típicos del theme y de Elementor,
+- detecta el <title>,
+- recoge el texto de h1-h4, p y li dentro de <main>, o <article>, o <body>.
+
+El resultado es el mismo que el de la versión anterior (cuatro find_all + ocho select +
+find_all final): cada bloque es el get_text(strip=True) del elemento, en orden de documento.
+
+Backends:
+- "lxml": parser en C, mucho más rápido (pip install lxml).
+- "bs4": BeautifulSoup con html.parser (siempre disponible con beautifulsoup4).
+- "auto": lxml si está instalado; si no, bs4.
+
+El parser se importa al extraer el primer HTML, no al importar este módulo: bs4 tarda
+~70 ms en cargarse y con lxml instalado no se usa.
+"""
+
+import importlib.util
+
+# Se asignan en _load_backend
+lxml = None
+BeautifulSoup = None
+NavigableString = None
+_BS4_SKIP_STRINGS = ()
+
+DEFAULT_BACKEND = "auto"
+
+# Bloques de texto que se extraen
+TEXT_TAGS = frozenset(["h1", "h2", "h3", "h4", "p", "li"])
+
+# Bloques típicos de cabecera, pie y navegación que se eliminan
+PRUNE_TAGS = frozenset(["header", "footer", "nav", "aside"])
+PRUNE_CLASSES = frozenset([
+    "site-header",
+    "site-footer",
+    "main-navigation",
+    "menu-principal",
+    "elementor-location-header",
+    "elementor-location-footer",
+])
+PRUNE_IDS = frozenset(["site-header", "site-footer"])
+
+# El texto de estas etiquetas no forma parte de get_text()
+SKIP_TEXT_TAGS = frozenset(["script", "style", "template"])
+
+
+def normalize_title(raw_title: str) -> str:
+    """
+    Limpia el título quitando sufijos comunes del sitio.
+    """
+    if not raw_title:
+        return ""
+
+    title = raw_title.replace("- DeSeguridad.net", "").strip()
+    title = title.replace("| DeSeguridad.net", "").strip()
+    return title
+
+
+_available_backends = None
+
+
+def available_backends() -> list:
+    """
+    Backends instalados (se comprueba sin importarlos).
+    """
+    global _available_backends
+    if _available_backends is None:
+        _available_backends = [
+            backend for backend, module in (("lxml", "lxml"), ("bs4", "bs4"))
+            if importlib.util.find_spec(module) is not None
+        ]
+    return list(_available_backends)
+
+
+def _load_backend(backend: str) -> None:
+    global lxml, BeautifulSoup, NavigableString, _BS4_SKIP_STRINGS
+    if backend == "lxml" and lxml is None:
+        import lxml.html
+    elif backend == "bs4" and BeautifulSoup is None:
+        from bs4 import BeautifulSoup, NavigableString, Comment, Declaration, Doctype, ProcessingInstruction
+        from bs4.element import Script, Stylesheet, TemplateString
+        _BS4_SKIP_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction, Script, Stylesheet, TemplateString)
+
+
+def resolve_backend(backend: str = DEFAULT_BACKEND) -> str:
+    if backend == "auto":
+        backends = available_backends()
+        if not backends:
+            raise RuntimeError("Se necesita lxml o beautifulsoup4 para extraer HTML.")
+        return backends[0]
+
+    if backend not in available_backends():
+        raise RuntimeError(f"Backend HTML no disponible: {backend}")
+    return backend
+
+
+# ==========================
+# ADAPTADORES POR BACKEND
+# ==========================
+
+def _lxml_root(html: str):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Cadenas con declaración de encoding (<?xml ... encoding=...?>)
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except lxml.etree.ParserError:
+        return None
+
+
+def _lxml_children(el):
+    """
+    Hijos de un elemento lxml en orden: texto propio, y cada hijo seguido de su tail.
+    Los comentarios e instrucciones se omiten, pero no el texto que va detrás (tail).
+    """
+    if el.text:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            yield child
+        if child.tail:
+            yield child.tail
+
+
+def _lxml_info(el) -> tuple:
+    return el.tag.lower(), el.get("class", ""), el.get("id")
+
+
+def _bs4_children(node):
+    for child in node.contents:
+        if isinstance(child, NavigableString):
+            if not isinstance(child, _BS4_SKIP_STRINGS):
+                yield str(child)
+        else:
+            yield child
+
+
+def _bs4_info(node) -> tuple:
+    classes = node.get("class") or []
+    if not isinstance(classes, str):
+        classes = " ".join(classes)
+    return node.name, classes, node.get("id")
+
+
+# ==========================
+# RECORRIDO ÚNICO
+# ==========================
+
+def _walk(root, children, info) -> tuple:
+    """
+    Recorre el árbol una vez y devuelve (raw_title, blocks | None).
+    blocks es None si no hay <main>, <article> ni <body>.
+    """
+    title = None
+    title_chunks = None
+
+    # Cada bloque: [fragmentos de texto, dentro de main, dentro de article, dentro de body]
+    blocks = []
+    open_blocks = []
+
+    main_state = None      # None: no visto | "open": dentro del primer <main> | "done"
+    article_state = None
+    body_state = None
+
+    # Marco de pila: [iterador de hijos, acciones al salir]
+    stack = [[iter(children(root)), ()]]
+    skip_text_depth = 0
+
+    while stack:
+        frame = stack[-1]
+        item = next(frame[0], None)
+
+        if item is None:
+            stack.pop()
+            for action in frame[1]:
+                if action == "block":
+                    open_blocks.pop()
+                elif action == "main":
+                    main_state = "done"
+                elif action == "article":
+                    article_state = "done"
+                elif action == "body":
+                    body_state = "done"
+                elif action == "title":
+                    title = "".join(title_chunks)
+                    title_chunks = None
+                elif action == "skip":
+                    skip_text_depth -= 1
+            continue
+
+        if isinstance(item, str):
+            if title_chunks is not None:
+                title_chunks.append(item)
+            if skip_text_depth:
+                continue
+            if open_blocks:
+                txt = item.strip()
+                if txt:
+                    for block in open_blocks:
+                        block[0].append(txt)
+            continue
+
+        tag, classes, el_id = info(item)
+
+        # Poda: el subárbol completo se ignora
+        if tag in PRUNE_TAGS or (el_id and el_id in PRUNE_IDS):
+            continue
+        if classes and not PRUNE_CLASSES.isdisjoint(classes.split()):
+            continue
+
+        actions = []
+
+        if tag == "title" and title is None and title_chunks is None:
+            title_chunks = []
+            actions.append("title")
+        elif tag in SKIP_TEXT_TAGS:
+            skip_text_depth += 1
+            actions.append("skip")
+        elif tag == "main" and main_state is None:
+            main_state = "open"
+            actions.append("main")
+        elif tag == "article" and article_state is None:
+            article_state = "open"
+            actions.append("article")
+        elif tag == "body" and body_state is None:
+            body_state = "open"
+            actions.append("body")
+
+        if tag in TEXT_TAGS:
+            block = [[], main_state == "open", article_state == "open", body_state == "open"]
+            blocks.append(block)
+            open_blocks.append(block)
+            actions.append("block")
+
+        stack.append([iter(children(item)), actions])
+
+    if main_state is not None:
+        scope = 1
+    elif article_state is not None:
+        scope = 2
+    elif body_state is not None:
+        scope = 3
+    else:
+        return (title or "").strip(), None
+
+    texts = []
+    for block in blocks:
+        if block[scope]:
+            txt = "".join(block[0])
+            if txt:
+                texts.append(txt)
+
+    return (title or "").strip(), texts
+
+
+# ==========================
+# API PÚBLICA
+# ==========================
+
+def extract_html_blocks(html: str, backend: str = DEFAULT_BACKEND) -> tuple:
+    """
+    Devuelve (title, blocks):
+    - title: título limpio (normalize_title)
+    - blocks: lista de textos de h1-h4/p/li del contenedor principal,
+      o None si no hay <main>, <article> ni <body>.
+    """
+    backend = resolve_backend(backend)
+    _load_backend(backend)
+
+    if backend == "lxml":
+        root = _lxml_root(html) if html else None
+        if root is None:
+            return "", None
+        raw_title, blocks = _walk(root, _lxml_children, _lxml_info)
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+        raw_title, blocks = _walk(soup, _bs4_children, _bs4_info)
+
+    return normalize_title(raw_title), blocks
+
+
+def extract_html_text(html: str, backend: str = DEFAULT_BACKEND) -> tuple:
+    """
+    Devuelve (title, full_text) con los bloques unidos por espacios.
+    full_text es "" si no hay contenedor principal.
+    """
+    title, blocks = extract_html_blocks(html, backend)
+    return title, " ".join(blocks) if blocks else ""
+
+
+def extract_html_file(file_path: str, backend: str = DEFAULT_BACKEND, keep_blocks: bool = False) -> tuple:
+    """
+    Lee un HTML local y devuelve (title, texto principal). Con keep_blocks=True, en lugar del
+    texto unido devuelve la lista de bloques (para el detector de boilerplate).
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except (UnicodeDecodeError, FileNotFoundError):
+        return "", ""
+
+    if keep_blocks:
+        title, blocks = extract_html_blocks(content, backend)
+        return title, blocks or []
+    return extract_html_text(content, backend)
+
+
+def extract(file_path: str, options: dict) -> tuple:
+    """
+    Extractor de .html para extractors.py.
+    """
+    return extract_html_file(file_path, options.get("html_backend", DEFAULT_BACKEND), options.get("html_blocks", False))
+
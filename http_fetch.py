@@ -0,0 +1,242 @@
+"""
+Capa de descarga HTTP para process_site.py.
+
+- Una única sesión `requests` con pool de conexiones (keep-alive).
+- Descargas en paralelo con un máximo global de hilos y un máximo por host,
+  más un intervalo mínimo entre peticiones al mismo host (cortesía con el servidor).
+- GET condicional: guarda ETag / Last-Modified y el cuerpo de cada URL en SQLite;
+  si el servidor responde 304 se reutiliza el cuerpo guardado.
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Valores por defecto
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST = 2
+DEFAULT_MIN_DELAY = 0.25
+DEFAULT_TIMEOUT = 20
+DEFAULT_CACHE_PATH = "./.http_cache.sqlite"
+USER_AGENT = "RAG-Chatbot-KB-Builder/1.0 (+https://deseguridad.net)"
+
+
+class FetchResult:
+    """
+    Resultado de una descarga.
+    - status: código HTTP (0 si hubo error de red)
+    - text: cuerpo (el guardado en caché si status == 304)
+    - not_modified: True si el servidor respondió 304
+    - error: mensaje de error o ""
+    - elapsed: segundos de la descarga, incluida la espera por el límite del host
+    """
+
+    def __init__(self, url: str, status: int = 0, text: str = "", not_modified: bool = False, error: str = ""):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.not_modified = not_modified
+        self.error = error
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.text) and not self.error
+
+    @property
+    def transient(self) -> bool:
+        """
+        True si el fallo puede ser pasajero (error de red, 429 o 5xx). Un 404/410 o una
+        página vacía no lo son: la página ya no existe o no tiene contenido.
+        """
+        return bool(self.error) and (self.status == 0 or self.status == 429 or self.status >= 500)
+
+
+class ValidatorStore:
+    """
+    Guarda ETag, Last-Modified y cuerpo por URL (SQLite, seguro entre hilos).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url: str):
+        """
+        Devuelve (etag, last_modified, body) o None.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def set(self, url: str, etag: str, last_modified: str, body: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class Fetcher:
+    """
+    Descargador con sesión compartida, paralelismo acotado y GET condicional.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, per_host: int = DEFAULT_PER_HOST,
+                 min_delay: float = DEFAULT_MIN_DELAY, timeout: float = DEFAULT_TIMEOUT,
+                 cache_path: str = DEFAULT_CACHE_PATH):
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.min_delay = min_delay
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.store = ValidatorStore(cache_path) if cache_path else None
+
+        self._hosts_lock = threading.Lock()
+        self._host_slots = {}
+        self._host_next_time = {}
+        self._host_delays = {}
+
+        self.stats = {"downloaded": 0, "not_modified": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------
+    # Cortesía por host
+    # ------------------------------
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def set_host_delay(self, host: str, seconds: float) -> None:
+        """
+        Intervalo mínimo propio de un host (p. ej. el Crawl-delay de su robots.txt).
+        Nunca baja de min_delay.
+        """
+        with self._hosts_lock:
+            self._host_delays[host.lower()] = max(self.min_delay, seconds)
+
+    def _wait_turn(self, host: str) -> None:
+        """
+        Respeta un intervalo mínimo entre el inicio de dos peticiones al mismo host.
+        """
+        with self._hosts_lock:
+            now = time.monotonic()
+            start = max(now, self._host_next_time.get(host, now))
+            self._host_next_time[host] = start + self._host_delays.get(host, self.min_delay)
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # ------------------------------
+    # Descarga
+    # ------------------------------
+
+    def fetch(self, url: str) -> FetchResult:
+        """
+        Descarga una URL con GET condicional si ya se descargó antes.
+        """
+        start = time.perf_counter()
+        result = self._fetch(url)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _fetch(self, url: str) -> FetchResult:
+        host = urlparse(url).netloc.lower()
+        cached = self.store.get(url) if self.store else None
+
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        with self._host_slot(host):
+            self._wait_turn(host)
+            try:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+            except Exception as e:
+                self._count("errors")
+                return FetchResult(url, error=str(e))
+
+        if resp.status_code == 304 and cached:
+            self._count("not_modified")
+            self.store.touch(url)
+            return FetchResult(url, status=304, text=cached[2], not_modified=True)
+
+        try:
+            resp.raise_for_status()
+        except Exception as e:
+            self._count("errors")
+            return FetchResult(url, status=resp.status_code, error=str(e))
+
+        text = resp.text
+        self._count("downloaded")
+        if self.store:
+            self.store.set(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), text)
+
+        return FetchResult(url, status=resp.status_code, text=text)
+
+    def fetch_many(self, urls: list) -> list:
+        """
+        Descarga varias URLs en paralelo. Devuelve los resultados en el mismo orden que `urls`.
+        """
+        if not urls:
+            return []
+
+        workers = min(self.max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as executor:
+            return list(executor.map(self.fetch, urls))
+
+    def summary(self) -> str:
+        return (
+            f"descargas: {self.stats['downloaded']} nuevas, "
+            f"{self.stats['not_modified']} sin cambios (304), {self.stats['errors']} errores"
+        )
+
+    def close(self) -> None:
+        self.session.close()
+        if self.store:
+            self.store.close()
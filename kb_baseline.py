@@ -0,0 +1,103 @@
+"""
+Réplica en Python de la búsqueda actual del plugin (RAG_Chatbot_Database::search_knowledge_base),
+como línea base para los benchmarks de recuperación:
+
+1. sanitize_text_field + extract_key_terms sobre la consulta.
+2. WHERE con un AND de (LOWER(question) LIKE '%term%' OR ... category ... OR ... answer ...),
+   en el orden de la tabla y con LIMIT limit * 3.
+   La colación de MySQL (utf8mb4_*_ci) ignora tildes y mayúsculas: se compara con el texto normalizado.
+3. calculate_relevance_score sobre cada fila (normalizando los campos en cada consulta, como PHP),
+   orden estable por score descendente y top `limit`.
+
+prepared_relevance_score da el mismo score a partir de las columnas search_* que los generadores
+añaden al CSV (kb_text.search_columns), sin volver a normalizar la respuesta en cada consulta.
+"""
+
+from kb_text import extract_key_terms, normalize_text, php_strlen, sanitize_text_field
+
+# Puntos de calculate_relevance_score
+SCORE_QUESTION = 10
+SCORE_CATEGORY = 5
+SCORE_ANSWER = 2
+BONUS_FULL_QUERY = 20
+BONUS_CATEGORY = 15
+
+
+def calculate_relevance_score(normalized_query: str, row: dict) -> int:
+    return score_normalized(
+        normalized_query,
+        normalize_text(row["question"]), normalize_text(row["category"]), normalize_text(row["answer"]),
+    )
+
+
+def prepared_relevance_score(normalized_query: str, row: dict) -> int:
+    """
+    calculate_relevance_score con los campos ya normalizados (columnas search_* del CSV).
+    """
+    return score_normalized(
+        normalized_query, row["search_question"], row["search_category"], row["search_answer"],
+    )
+
+
+def score_normalized(normalized_query: str, question_norm: str, category_norm: str, answer_norm: str) -> int:
+    score = 0
+    # explode(' ', $query) + strlen >= 3 (bytes); la puntuación se conserva
+    for term in normalized_query.split(" "):
+        if php_strlen(term) < 3:
+            continue
+        if term in question_norm:
+            score += SCORE_QUESTION
+        if term in category_norm:
+            score += SCORE_CATEGORY
+        if term in answer_norm:
+            score += SCORE_ANSWER
+
+    if normalized_query in question_norm:
+        score += BONUS_FULL_QUERY
+
+    if category_norm == normalized_query:
+        score += BONUS_CATEGORY
+
+    return score
+
+
+class LikeSearch:
+    """
+    Búsqueda LIKE + scoring en PHP, fila a fila como en MySQL (sin índices).
+    """
+
+    name = "like"
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        # Lo que MySQL compara con LIKE bajo la colación *_ci
+        self._like_columns = [
+            (normalize_text(row["question"]), normalize_text(row["category"]), normalize_text(row["answer"]))
+            for row in rows
+        ]
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Devuelve [(doc_id, score)] en el mismo orden que el plugin.
+        """
+        query = sanitize_text_field(query)
+        terms = extract_key_terms(query)
+        if not terms:
+            return []
+
+        fetch_limit = limit * 3
+        candidates = []
+        for doc_id, columns in enumerate(self._like_columns):
+            if all(any(term in column for column in columns) for term in terms):
+                candidates.append(doc_id)
+                if len(candidates) >= fetch_limit:
+                    break
+
+        if not candidates:
+            return []
+
+        normalized_query = normalize_text(query)
+        scored = [(doc_id, calculate_relevance_score(normalized_query, self.rows[doc_id])) for doc_id in candidates]
+        # usort es estable desde PHP 8
+        scored.sort(key=lambda item: -item[1])
+        return scored[:limit]
@@ -0,0 +1,138 @@
+"""
+Configuración compartida de los scripts Python (endpoint, API key, modelo y precios del LLM,
+rutas y URLs de los generadores).
+
+Orden de prioridad (cada nivel sobrescribe al anterior):
+1. Valores por defecto de DEFAULT_LLM_CONFIG (o las constantes de cada script).
+2. Archivo JSON (`kb_config.json` en el directorio actual, o la ruta de RAGKB_CONFIG / --config),
+   con las claves dentro de "llm", "docs" (process_docs.py) o "site" (process_site.py):
+       {"llm": {"api_url": "...", "api_key": "...", "model": "gpt-4o-mini"},
+        "docs": {"root_dir": "./deseguridad_site"}}
+3. Variables de entorno RAGKB_LLM_*, RAGKB_DOCS_*, RAGKB_SITE_* (por ejemplo RAGKB_LLM_API_KEY
+   o RAGKB_DOCS_ROOT_DIR).
+
+La API key no tiene valor por defecto: no debe quedar escrita en el código.
+"""
+
+import json
+import os
+
+DEFAULT_CONFIG_PATH = "./kb_config.json"
+CONFIG_PATH_ENV = "RAGKB_CONFIG"
+ENV_PREFIX = "RAGKB_LLM_"
+
+DEFAULT_LLM_CONFIG = {
+    "api_url": "https://routellm.abacus.ai/v1/chat/completions",
+    "api_key": "",
+    "model": "gpt-4o-mini",
+    "timeout": 30.0,
+    # Conexiones keep-alive que se mantienen abiertas hacia el endpoint
+    "pool_size": 16,
+    # USD por millón de tokens (prompt / respuesta). None = se toma de MODEL_PRICES.
+    "price_input": None,
+    "price_output": None,
+}
+
+# Precios de referencia en USD por millón de tokens (entrada, salida)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+_FLOAT_KEYS = {"timeout", "price_input", "price_output"}
+_INT_KEYS = {"pool_size"}
+
+
+def _coerce(key: str, value):
+    if value is None or value == "":
+        return None if key in _FLOAT_KEYS | _INT_KEYS else value
+    if key in _FLOAT_KEYS:
+        return float(value)
+    if key in _INT_KEYS:
+        return int(value)
+    return str(value)
+
+
+def _load_config_file(path: str = None) -> dict:
+    """
+    Contenido del archivo de configuración ({} si no hay).
+    Si se pasa `path` explícito (o RAGKB_CONFIG) y no existe, lanza FileNotFoundError.
+    """
+    explicit = path or os.environ.get(CONFIG_PATH_ENV)
+    config_path = explicit or DEFAULT_CONFIG_PATH
+    if not explicit and not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_llm_config(path: str = None) -> dict:
+    """
+    Configuración del LLM combinando valores por defecto, archivo y entorno.
+    Si se pasa `path` explícito y no existe, lanza FileNotFoundError.
+    """
+    config = dict(DEFAULT_LLM_CONFIG)
+
+    for key, value in _load_config_file(path).get("llm", {}).items():
+        if key in config:
+            config[key] = _coerce(key, value)
+
+    for key in config:
+        value = os.environ.get(ENV_PREFIX + key.upper())
+        if value is not None:
+            config[key] = _coerce(key, value)
+
+    prices = MODEL_PRICES.get(config["model"], (None, None))
+    if config["price_input"] is None:
+        config["price_input"] = prices[0]
+    if config["price_output"] is None:
+        config["price_output"] = prices[1]
+
+    return config
+
+
+_TRUE_VALUES = {"1", "true", "yes", "si", "sí", "on"}
+
+
+def _coerce_like(default, value):
+    """
+    Convierte un valor de variable de entorno al tipo del valor por defecto.
+    Listas: JSON o separadas por comas/espacios. Diccionarios: JSON.
+    """
+    if isinstance(default, bool):
+        return value.strip().lower() in _TRUE_VALUES
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, list):
+        value = value.strip()
+        if value.startswith("["):
+            return json.loads(value)
+        return [item for item in value.replace(",", " ").split() if item]
+    if isinstance(default, dict):
+        return json.loads(value)
+    return value
+
+
+def load_section_config(section: str, defaults: dict, path: str = None) -> dict:
+    """
+    Configuración de un script (sección "docs", "site"...): `defaults` (las constantes del
+    script), luego la sección del archivo y luego las variables RAGKB_<SECCIÓN>_<CLAVE>.
+    Solo se aceptan las claves de `defaults`.
+    """
+    config = dict(defaults)
+
+    for key, value in _load_config_file(path).get(section, {}).items():
+        if key in config:
+            config[key] = value
+
+    prefix = f"RAGKB_{section.upper()}_"
+    for key, default in defaults.items():
+        value = os.environ.get(prefix + key.upper())
+        if value is not None:
+            config[key] = _coerce_like(default, value)
+
+    return config
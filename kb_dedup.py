@@ -0,0 +1,315 @@
+"""
+Detección de pares pregunta/respuesta casi duplicados (MinHash + LSH).
+
+Las plantillas se solapan a propósito, el mismo texto de pie de página se cuela en muchas
+respuestas y los CSV de servicios y otros comparten filas. Este script:
+
+1. Representa cada fila con shingles de 3 palabras del texto normalizado (pregunta, respuesta
+   o ambas) y calcula su firma MinHash (NUM_PERM permutaciones).
+2. Divide la firma en bandas (LSH): solo las filas que coinciden en alguna banda se comparan,
+   así que no hace falta comparar todos los pares.
+3. Confirma cada candidato con la similitud de Jaccard real y une los pares por encima del
+   umbral en componentes (union-find).
+4. Dentro de cada componente elige la fila canónica (la de respuesta más completa) y solo le
+   asigna las filas que superan el umbral contra ella; las que solo estaban encadenadas
+   (A~B, B~C, pero no A~C) forman sus propios clústeres. Según el modo:
+   - report: solo el informe;
+   - flag: escribe todas las filas con las columnas extra dup_cluster y dup_of;
+   - collapse: escribe solo las filas canónicas y las no duplicadas.
+
+Uso:
+    python kb_dedup.py deseguridad_knowledge_base_servicios.csv deseguridad_knowledge_base_otros.csv \
+        [--threshold 0.7] [--field qa|question|answer] [--mode report|flag|collapse] [-o salida.csv]
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from kb_io import load_kb_rows, write_kb_csv
+from kb_text import tokenize
+
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_FIELD = "qa"
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+RANDOM_SEED = 1
+
+DEFAULT_REPORT_PATH = "./kb_dedup_report.json"
+DEFAULT_OUTPUT_CSV = "./deseguridad_knowledge_base_dedup.csv"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+# ==========================
+# SHINGLES Y FIRMAS
+# ==========================
+
+def row_text(row: dict, field: str) -> str:
+    if field == "question":
+        return row["question"]
+    if field == "answer":
+        return row["answer"]
+    return f"{row['question']} {row['answer']}"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    Conjunto de hashes (crc32) de los n-gramas de palabras del texto normalizado.
+    Los textos más cortos que `size` usan sus palabras sueltas.
+    """
+    words = tokenize(text)
+    if len(words) < size:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+class MinHasher:
+    """
+    Permutaciones (a * x + b) mod p, calculadas en bloque con NumPy.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = RANDOM_SEED):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 2 ** 61 - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 2 ** 61 - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        if not shingle_set:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        with np.errstate(over="ignore"):
+            hashed = (np.outer(values, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return hashed.min(axis=0)
+
+
+def choose_bands(threshold: float, num_perm: int = NUM_PERM) -> tuple:
+    """
+    (bandas, filas por banda) cuyo umbral aproximado (1/b)^(1/r) es el más alto que no supera
+    `threshold`. Con el punto medio de la curva por encima del umbral, los pares entre ambos
+    casi nunca serían candidatos; los falsos positivos los descarta el Jaccard exacto.
+    """
+    best = None
+    for rows_per_band in range(1, num_perm + 1):
+        if num_perm % rows_per_band:
+            continue
+        bands = num_perm // rows_per_band
+        approx = (1 / bands) ** (1 / rows_per_band)
+        # Si ninguno queda por debajo (umbral ínfimo), el más bajo posible
+        key = (approx > threshold, abs(approx - threshold))
+        if best is None or key < best[0]:
+            best = (key, bands, rows_per_band)
+    return best[1], best[2]
+
+
+# ==========================
+# CLÚSTERES
+# ==========================
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def find_duplicates(rows: list, threshold: float = DEFAULT_THRESHOLD, field: str = DEFAULT_FIELD,
+                    num_perm: int = NUM_PERM) -> tuple:
+    """
+    Devuelve (clústeres, shingles por fila, estadísticas). Cada clúster es una lista de
+    índices de fila (la primera es la canónica) con al menos dos filas, y todas superan el
+    umbral contra la canónica.
+    """
+    hasher = MinHasher(num_perm)
+    bands, rows_per_band = choose_bands(threshold, num_perm)
+
+    shingle_sets = [shingles(row_text(row, field)) for row in rows]
+    signatures = [hasher.signature(s) for s in shingle_sets]
+
+    # LSH: filas que comparten una banda completa son candidatas
+    candidates = set()
+    for band in range(bands):
+        start = band * rows_per_band
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            buckets.setdefault(signature[start:start + rows_per_band].tobytes(), []).append(index)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    candidates.add((members[i], members[j]))
+
+    union_find = _UnionFind(len(rows))
+    confirmed = 0
+    for i, j in candidates:
+        if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+            union_find.union(i, j)
+            confirmed += 1
+
+    groups = {}
+    for index in range(len(rows)):
+        groups.setdefault(union_find.find(index), []).append(index)
+
+    # El union-find encadena pares (enlace simple): un componente puede juntar filas que no se
+    # parecen entre sí. Cada clúster se queda solo con las filas cercanas a su canónica.
+    clusters = []
+    chained = 0
+    for members in groups.values():
+        pending = members
+        first_round = True
+        while len(pending) > 1:
+            # Canónica: la respuesta más completa; a igualdad, la que aparece antes
+            canonical = max(pending, key=lambda i: (len(rows[i]["answer"]), -i))
+            close = [
+                i for i in pending
+                if i != canonical and jaccard(shingle_sets[canonical], shingle_sets[i]) >= threshold
+            ]
+            if close:
+                clusters.append([canonical] + close)
+            assigned = set(close)
+            assigned.add(canonical)
+            pending = [i for i in pending if i not in assigned]
+            if first_round:
+                chained += len(pending)
+                first_round = False
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+
+    stats = {
+        "rows": len(rows),
+        "bands": bands,
+        "rows_per_band": rows_per_band,
+        "candidate_pairs": len(candidates),
+        "confirmed_pairs": confirmed,
+        "chained_rows": chained,
+        "all_pairs": len(rows) * (len(rows) - 1) // 2,
+    }
+    return clusters, shingle_sets, stats
+
+
+# ==========================
+# CLI
+# ==========================
+
+def build_report(rows: list, origins: list, clusters: list, shingle_sets: list, stats: dict, args) -> dict:
+    report_clusters = []
+    for cluster_id, members in enumerate(clusters, 1):
+        canonical = members[0]
+        report_clusters.append({
+            "cluster": cluster_id,
+            "size": len(members),
+            "keep": {"file": origins[canonical][0], "row": origins[canonical][1], "question": rows[canonical]["question"]},
+            "duplicates": [
+                {
+                    "file": origins[i][0],
+                    "row": origins[i][1],
+                    "question": rows[i]["question"],
+                    "similarity": round(jaccard(shingle_sets[canonical], shingle_sets[i]), 3),
+                }
+                for i in members[1:]
+            ],
+        })
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "threshold": args.threshold,
+        "field": args.field,
+        "stats": dict(stats, clusters=len(clusters), duplicate_rows=sum(len(c) - 1 for c in clusters)),
+        "clusters": report_clusters,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detecta y agrupa pares pregunta/respuesta casi duplicados (MinHash + LSH).")
+    parser.add_argument("inputs", nargs="+", help="Archivos de la KB (.csv o .json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Similitud de Jaccard mínima (por defecto {DEFAULT_THRESHOLD})")
+    parser.add_argument("--field", default=DEFAULT_FIELD, choices=["qa", "question", "answer"], help="Texto que se compara (por defecto pregunta + respuesta)")
+    parser.add_argument("--mode", default="report", choices=["report", "flag", "collapse"], help="report, flag (columnas dup_*) o collapse (solo canónicas)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_CSV, help=f"CSV de salida para flag/collapse (por defecto {DEFAULT_OUTPUT_CSV})")
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help=f"Informe JSON de clústeres (por defecto {DEFAULT_REPORT_PATH})")
+    parser.add_argument("--show", type=int, default=10, help="Clústeres que se muestran en consola")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    rows = []
+    origins = []
+    for path in args.inputs:
+        for line, row in enumerate(load_kb_rows(path), 1):
+            rows.append(row)
+            origins.append((os.path.basename(path), line))
+
+    start = time.perf_counter()
+    clusters, shingle_sets, stats = find_duplicates(rows, args.threshold, args.field)
+    elapsed = time.perf_counter() - start
+
+    report = build_report(rows, origins, clusters, shingle_sets, stats, args)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Filas: {stats['rows']} | umbral: {args.threshold} | campo: {args.field}")
+    print(f"LSH: {stats['bands']} bandas x {stats['rows_per_band']} filas | "
+          f"pares candidatos: {stats['candidate_pairs']} de {stats['all_pairs']} | confirmados: {stats['confirmed_pairs']}")
+    print(f"Clústeres: {len(clusters)} | filas duplicadas: {report['stats']['duplicate_rows']} | "
+          f"separadas de su componente (encadenadas, por debajo del umbral): {stats['chained_rows']} | {elapsed * 1000:.0f} ms\n")
+
+    for cluster in report["clusters"][:args.show]:
+        keep = cluster["keep"]
+        print(f"#{cluster['cluster']} ({cluster['size']} filas) se conserva {keep['file']}:{keep['row']}")
+        print(f"    {keep['question'][:110]}")
+        for dup in cluster["duplicates"]:
+            print(f"  - [{dup['similarity']:.2f}] {dup['file']}:{dup['row']} {dup['question'][:90]}")
+    print(f"\n📄 Informe: {args.report}")
+
+    if args.mode == "report":
+        return
+
+    duplicate_of = {}
+    cluster_of = {}
+    for cluster_id, members in enumerate(clusters, 1):
+        for i in members:
+            cluster_of[i] = cluster_id
+        for i in members[1:]:
+            duplicate_of[i] = members[0]
+
+    if args.mode == "flag":
+        output_rows = []
+        for i, row in enumerate(rows):
+            flagged = dict(row, dup_cluster=cluster_of.get(i, ""), dup_of="")
+            if i in duplicate_of:
+                file_name, line = origins[duplicate_of[i]]
+                flagged["dup_of"] = f"{file_name}:{line}"
+            output_rows.append(flagged)
+        write_kb_csv(args.output, output_rows, extra_fields=["dup_cluster", "dup_of"])
+    else:
+        output_rows = [row for i, row in enumerate(rows) if i not in duplicate_of]
+        write_kb_csv(args.output, output_rows)
+
+    print(f"✅ {len(output_rows)} filas escritas en {args.output} (modo {args.mode})")
+
+
+if __name__ == "__main__":
+    main()
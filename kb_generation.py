@@ -0,0 +1,157 @@
+"""
+Utilidades compartidas para generar respuestas con el LLM desde process_site.py y process_docs.py.
+
+- Ejecuta varias preguntas de una misma página en paralelo (pool de hilos).
+- Mantiene el orden original de las preguntas, para que el CSV sea determinista.
+- Una llamada lenta o fallida no bloquea al resto: cada pregunta se resuelve por separado.
+- Modo por lotes: una sola llamada por página con todas sus preguntas y respuestas en JSON.
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Número por defecto de peticiones simultáneas al LLM
+DEFAULT_MAX_WORKERS = 4
+
+
+def generate_answers_concurrently(preguntas: list, answer_fn, max_workers: int = DEFAULT_MAX_WORKERS,
+                                  fallback_fn=None) -> list:
+    """
+    Genera las respuestas de `preguntas` llamando a `answer_fn(pregunta)` con hasta
+    `max_workers` peticiones en vuelo.
+
+    Devuelve la lista de respuestas en el mismo orden que `preguntas`.
+    Si una llamada lanza una excepción, se usa `fallback_fn(pregunta)`; sin fallback_fn,
+    la respuesta queda en None para que quien llama la registre como fallida.
+    """
+    if max_workers <= 1 or len(preguntas) <= 1:
+        return [_safe_answer(answer_fn, fallback_fn, pregunta) for pregunta in preguntas]
+
+    workers = min(max_workers, len(preguntas))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as executor:
+        futures = [
+            executor.submit(_safe_answer, answer_fn, fallback_fn, pregunta)
+            for pregunta in preguntas
+        ]
+        # Recogemos en el orden de envío: el orden del CSV no depende de qué llamada termine antes
+        return [future.result() for future in futures]
+
+
+def _safe_answer(answer_fn, fallback_fn, pregunta: str) -> str:
+    try:
+        return answer_fn(pregunta)
+    except Exception as e:
+        print(f"  ⚠️  Error generando respuesta para '{pregunta}': {e}")
+        return fallback_fn(pregunta) if fallback_fn else None
+
+
+# ==========================
+# MODO POR LOTES (una llamada por página)
+# ==========================
+
+# Instrucciones de formato que se añaden al prompt por lotes
+BATCH_FORMAT_INSTRUCTIONS = """- Devuelve ÚNICAMENTE un objeto JSON válido, sin texto adicional ni bloques de código, con este formato:
+{"respuestas": [{"id": 1, "respuesta": "..."}, {"id": 2, "respuesta": "..."}]}
+- Incluye una respuesta por cada pregunta, usando el mismo número (id) de la lista."""
+
+
+def format_numbered_questions(preguntas: list) -> str:
+    """
+    Devuelve las preguntas numeradas desde 1, una por línea.
+    """
+    return "\n".join(f"{i}. {pregunta}" for i, pregunta in enumerate(preguntas, start=1))
+
+
+def parse_batch_answers(raw: str, total: int) -> dict:
+    """
+    Interpreta la respuesta JSON del modo por lotes.
+
+    Devuelve {indice (base 0): respuesta} solo para las respuestas válidas y no vacías.
+    Acepta {"respuestas": [...]}, una lista directa o un objeto {"1": "...", "2": "..."}.
+    Si el JSON no se puede interpretar, devuelve un dict vacío.
+    """
+    if not raw:
+        return {}
+
+    text = raw.strip()
+    # Quitar bloques ```json ... ``` si el modelo los añade igualmente
+    fence = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fence:
+        text = fence.group(1).strip()
+
+    start_positions = [pos for pos in (text.find("{"), text.find("[")) if pos >= 0]
+    if not start_positions:
+        return {}
+
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text[min(start_positions):])
+    except ValueError:
+        return {}
+
+    if isinstance(data, dict) and isinstance(data.get("respuestas"), list):
+        items = data["respuestas"]
+    elif isinstance(data, list):
+        items = data
+    elif isinstance(data, dict):
+        items = [{"id": key, "respuesta": value} for key, value in data.items()]
+    else:
+        return {}
+
+    answers = {}
+    for position, item in enumerate(items, start=1):
+        if isinstance(item, dict):
+            item_id = item.get("id", position)
+            answer = item.get("respuesta", item.get("answer"))
+        else:
+            item_id, answer = position, item
+
+        try:
+            index = int(item_id) - 1
+        except (TypeError, ValueError):
+            continue
+
+        if 0 <= index < total and isinstance(answer, str) and answer.strip():
+            answers.setdefault(index, answer.strip())
+
+    return answers
+
+
+def batch_is_complete(raw: str, total: int) -> bool:
+    """
+    True si la respuesta por lotes trae las `total` respuestas. Solo entonces se guarda en la
+    caché del LLM: una respuesta rota o incompleta se repetiría desde la caché en cada ejecución.
+    """
+    return len(parse_batch_answers(raw, total)) == total
+
+
+def generate_answers_batched(preguntas: list, batch_fn, answer_fn, max_workers: int = DEFAULT_MAX_WORKERS,
+                             fallback_fn=None) -> list:
+    """
+    Genera todas las respuestas de una página con una sola llamada `batch_fn(preguntas)`,
+    que debe devolver el texto crudo del LLM en el formato de BATCH_FORMAT_INSTRUCTIONS.
+
+    Las preguntas que falten en la respuesta (o todas, si no se puede interpretar)
+    se resuelven una a una con `answer_fn`, usando generate_answers_concurrently
+    (las que vuelvan a fallar quedan en None si no hay fallback_fn).
+    """
+    if not preguntas:
+        return []
+
+    try:
+        raw = batch_fn(preguntas)
+    except Exception as e:
+        print(f"  ⚠️  Error en la llamada por lotes: {e}")
+        raw = ""
+
+    answers = parse_batch_answers(raw, len(preguntas))
+    missing = [i for i in range(len(preguntas)) if i not in answers]
+
+    if missing:
+        print(f"  ⚠️  Lote incompleto: {len(missing)} de {len(preguntas)} respuestas se piden por separado.")
+        retried = generate_answers_concurrently(
+            [preguntas[i] for i in missing], answer_fn, max_workers=max_workers, fallback_fn=fallback_fn
+        )
+        answers.update(zip(missing, retried))
+
+    return [answers[i] for i in range(len(preguntas))]
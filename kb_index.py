@@ -0,0 +1,278 @@
+"""
+Índice invertido BM25F de la base de conocimientos (offline).
+
+El plugin busca con un AND de LOWER(col) LIKE '%term%' sobre question/category/answer
+(recorrido completo de la tabla) y luego puntúa cada fila en PHP. Este script construye,
+después de generar el CSV, un índice invertido que se puede cargar en el servidor (o en
+los benchmarks) para buscar por posting lists en lugar de recorrer la tabla.
+
+- Términos: misma normalización y stopwords que normalize_text / extract_key_terms
+  del plugin (kb_text.py), separando la puntuación.
+- Campos: question, category y answer, con pesos en la misma proporción que
+  calculate_relevance_score (10 / 5 / 2).
+- Artefacto JSON compacto: postings planas [doc, tf_question, tf_category, tf_answer, ...],
+  longitudes por campo y los datos mínimos de cada documento.
+
+Uso:
+    python kb_index.py build deseguridad_knowledge_base_servicios.csv deseguridad_knowledge_base_otros.csv -o kb_index.json
+    python kb_index.py query kb_index.json "precio de las mediciones higiénicas" [-k 5] [--and] [--no-prefix]
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import time
+from collections import Counter
+
+from kb_io import load_kb_files
+from kb_text import index_terms, query_index_terms
+
+INDEX_FORMAT = "rag-kb-bm25f"
+INDEX_VERSION = 1
+
+DEFAULT_INDEX_PATH = "./kb_index.json"
+
+FIELDS = ("question", "category", "answer")
+
+# Misma proporción que calculate_relevance_score (question 10, category 5, answer 2)
+FIELD_WEIGHTS = {"question": 5.0, "category": 2.5, "answer": 1.0}
+
+# Normalización por longitud de cada campo (la categoría casi no varía de longitud)
+FIELD_B = {"question": 0.75, "category": 0.3, "answer": 0.75}
+
+BM25_K1 = 1.2
+
+# LIKE '%term%' también encuentra palabras más largas: un término de consulta se amplía
+# a los términos del vocabulario que empiezan por él (peso reducido).
+PREFIX_WEIGHT = 0.5
+PREFIX_MAX_EXPANSIONS = 20
+PREFIX_MIN_LENGTH = 4
+
+
+class KBIndex:
+    """
+    Índice BM25F cargado en memoria.
+    """
+
+    def __init__(self, data: dict):
+        if data.get("format") != INDEX_FORMAT or data.get("version") != INDEX_VERSION:
+            raise ValueError("El archivo no es un índice BM25F compatible.")
+
+        self.data = data
+        self.fields = data["fields"]
+        self.weights = [data["field_weights"][field] for field in self.fields]
+        self.field_b = [data["field_b"][field] for field in self.fields]
+        self.k1 = data["k1"]
+        self.docs = data["docs"]
+        self.lengths = data["lengths"]
+        self.avg_lengths = data["avg_lengths"]
+        self.postings = data["postings"]
+        self.vocabulary = sorted(self.postings)
+
+        total = len(self.docs)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in ((term, len(plist) // 4) for term, plist in self.postings.items())
+        }
+
+        # Factor de normalización por documento y campo, precalculado
+        self.norms = [
+            [
+                1 - b + b * (length / avg if avg else 0)
+                for length, avg, b in zip(doc_lengths, self.avg_lengths, self.field_b)
+            ]
+            for doc_lengths in self.lengths
+        ]
+
+    # ------------------------------
+    # Construcción
+    # ------------------------------
+
+    @classmethod
+    def build(cls, rows: list, sources: list = None) -> "KBIndex":
+        postings = {}
+        lengths = []
+        docs = []
+
+        for doc_id, row in enumerate(rows):
+            doc_lengths = []
+            per_term = {}
+            for field_pos, field in enumerate(FIELDS):
+                terms = index_terms(row.get(field, ""))
+                doc_lengths.append(len(terms))
+                for term, tf in Counter(terms).items():
+                    per_term.setdefault(term, [0, 0, 0])[field_pos] = tf
+
+            for term, tfs in per_term.items():
+                postings.setdefault(term, []).extend([doc_id] + tfs)
+
+            lengths.append(doc_lengths)
+            docs.append([row.get("question", ""), row.get("category", ""), row.get("source_url", "")])
+
+        total = len(rows)
+        avg_lengths = [
+            (sum(doc_lengths[pos] for doc_lengths in lengths) / total) if total else 0.0
+            for pos in range(len(FIELDS))
+        ]
+
+        return cls({
+            "format": INDEX_FORMAT,
+            "version": INDEX_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sources": sources or [],
+            "fields": list(FIELDS),
+            "field_weights": FIELD_WEIGHTS,
+            "field_b": FIELD_B,
+            "k1": BM25_K1,
+            "doc_count": total,
+            "avg_lengths": avg_lengths,
+            "lengths": lengths,
+            "docs": docs,
+            "postings": {term: postings[term] for term in sorted(postings)},
+        })
+
+    def save(self, path: str) -> None:
+        """
+        Escribe el índice de forma atómica (archivo temporal + rename).
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "KBIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # ------------------------------
+    # Consulta
+    # ------------------------------
+
+    def lookup(self, term: str) -> list:
+        """
+        Posting list de un término: [(doc_id, (tf_question, tf_category, tf_answer)), ...].
+        """
+        plist = self.postings.get(term, [])
+        return [(plist[i], tuple(plist[i + 1:i + 4])) for i in range(0, len(plist), 4)]
+
+    def expand(self, term: str, prefix: bool = True) -> dict:
+        """
+        {término del vocabulario: peso} para un término de consulta.
+        """
+        expansions = {term: 1.0} if term in self.postings else {}
+        if prefix and len(term) >= PREFIX_MIN_LENGTH:
+            pos = bisect.bisect_right(self.vocabulary, term)
+            added = 0
+            while pos < len(self.vocabulary) and self.vocabulary[pos].startswith(term):
+                if added >= PREFIX_MAX_EXPANSIONS:
+                    break
+                expansions.setdefault(self.vocabulary[pos], PREFIX_WEIGHT)
+                added += 1
+                pos += 1
+        return expansions
+
+    def search(self, query: str, k: int = 5, require_all: bool = False, prefix: bool = True) -> list:
+        """
+        Devuelve [(doc_id, score)] ordenado por score descendente.
+        require_all=True exige que cada término de la consulta (o una ampliación) esté
+        en el documento, como el AND del plugin.
+        """
+        terms = query_index_terms(query)
+        if not terms:
+            return []
+
+        scores = {}
+        matched = {}
+        k1 = self.k1
+
+        for term_pos, term in enumerate(terms):
+            for vocab_term, query_weight in self.expand(term, prefix).items():
+                idf = self.idf[vocab_term] * query_weight
+                plist = self.postings[vocab_term]
+                for i in range(0, len(plist), 4):
+                    doc_id = plist[i]
+                    norms = self.norms[doc_id]
+                    tf = 0.0
+                    for field_pos in range(3):
+                        field_tf = plist[i + 1 + field_pos]
+                        if field_tf:
+                            tf += self.weights[field_pos] * field_tf / norms[field_pos]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf / (k1 + tf)
+                    matched.setdefault(doc_id, set()).add(term_pos)
+
+        if require_all:
+            scores = {doc_id: score for doc_id, score in scores.items() if len(matched[doc_id]) == len(terms)}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def doc(self, doc_id: int) -> dict:
+        question, category, source_url = self.docs[doc_id]
+        return {"id": doc_id, "question": question, "category": category, "source_url": source_url}
+
+    def summary(self) -> str:
+        total_postings = sum(len(plist) // 4 for plist in self.postings.values())
+        return f"{len(self.docs)} documentos, {len(self.postings)} términos, {total_postings} postings"
+
+
+# ==========================
+# CLI
+# ==========================
+
+def cmd_build(args) -> None:
+    start = time.perf_counter()
+    rows = load_kb_files(args.inputs)
+    index = KBIndex.build(rows, sources=[os.path.basename(path) for path in args.inputs])
+    index.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"✅ Índice creado: {index.summary()}")
+    print(f"📄 {args.output} ({size_kb:.1f} KB) en {elapsed * 1000:.0f} ms")
+
+
+def cmd_query(args) -> None:
+    index = KBIndex.load(args.index)
+
+    start = time.perf_counter()
+    results = index.search(args.query, k=args.k, require_all=args.require_all, prefix=args.prefix)
+    elapsed = time.perf_counter() - start
+
+    print(f"Términos: {', '.join(query_index_terms(args.query)) or '(ninguno)'}")
+    print(f"{len(results)} resultados en {elapsed * 1000:.2f} ms\n")
+    for rank, (doc_id, score) in enumerate(results, 1):
+        doc = index.doc(doc_id)
+        print(f"{rank}. [{score:.3f}] {doc['question']}")
+        print(f"   {doc['category']} | {doc['source_url']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Índice invertido BM25F de la base de conocimientos.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Construir el índice desde CSV/JSON")
+    build.add_argument("inputs", nargs="+", help="Archivos de la KB (.csv o .json)")
+    build.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH, help=f"Archivo del índice (por defecto {DEFAULT_INDEX_PATH})")
+    build.set_defaults(func=cmd_build)
+
+    query = subparsers.add_parser("query", help="Consultar un índice")
+    query.add_argument("index", help="Archivo del índice")
+    query.add_argument("query", help="Consulta del usuario")
+    query.add_argument("-k", type=int, default=5, help="Número de resultados (por defecto 5)")
+    query.add_argument("--and", dest="require_all", action="store_true", help="Exigir todos los términos (como el plugin)")
+    query.add_argument("--no-prefix", dest="prefix", action="store_false", help="No ampliar términos por prefijo")
+    query.set_defaults(func=cmd_query)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Lectura de la base de conocimientos generada, en cualquiera de sus formatos:
+
+- CSV del plugin (question;answer;category;source;source_url, con o sin BOM).
+- JSON con una lista de objetos, con claves en inglés (question/answer/...) o en español
+  (pregunta/respuesta/categoria/fuente/url_fuente), como deseguridad_knowledge_base.json.
+- Almacén columnar binario .rkb (kb_store.py), que se abre con mmap sin leer las filas.
+
+Todas las herramientas (índices, benchmarks, deduplicación) leen las filas con load_kb_rows.
+iter_kb_rows lee los formatos de texto en streaming (una fila cada vez), también el JSON.
+"""
+
+import csv
+import json
+import os
+
+KB_FIELDS = ["question", "answer", "category", "source", "source_url"]
+
+# Claves alternativas del JSON
+FIELD_ALIASES = {
+    "question": ["question", "pregunta"],
+    "answer": ["answer", "respuesta"],
+    "category": ["category", "categoria"],
+    "source": ["source", "fuente"],
+    "source_url": ["source_url", "url_fuente", "url"],
+}
+
+
+def _normalize_row(raw: dict) -> dict:
+    row = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = ""
+        for alias in aliases:
+            if raw.get(alias):
+                value = raw[alias]
+                break
+        row[field] = str(value).strip()
+    return row
+
+
+def _detect_delimiter(header_line: str) -> str:
+    return ";" if header_line.count(";") >= header_line.count(",") else ","
+
+
+def iter_csv_rows(path: str):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        delimiter = _detect_delimiter(f.readline())
+        f.seek(0)
+        for raw in csv.DictReader(f, delimiter=delimiter):
+            raw = {(key or "").strip().lower(): value for key, value in raw.items()}
+            yield _normalize_row(raw)
+
+
+JSON_CHUNK_CHARS = 1 << 16
+
+
+def _iter_json_array(f):
+    """
+    Elementos de una lista JSON leídos por bloques, sin cargar el archivo entero.
+    Si el documento no es una lista (p. ej. {"items": [...]}), se lee completo.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(JSON_CHUNK_CHARS)
+    pos = len(buffer) - len(buffer.lstrip())
+    if not buffer[pos:pos + 1] == "[":
+        data = json.loads(buffer + f.read())
+        if isinstance(data, dict):
+            data = data.get("items") or data.get("entries") or []
+        yield from data
+        return
+
+    pos += 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        # Un valor que acaba justo al final del bloque puede estar cortado (p. ej. un número)
+        if end is None or (end == len(buffer) and not eof):
+            chunk = f.read(JSON_CHUNK_CHARS)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            if eof and not buffer.strip():
+                raise ValueError("Lista JSON sin cerrar")
+            continue
+        yield item
+        pos = end
+
+
+def iter_json_rows(path: str):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in _iter_json_array(f):
+            if isinstance(raw, dict):
+                yield _normalize_row(raw)
+
+
+def iter_kb_rows(path: str):
+    """
+    Filas de un CSV o JSON en streaming, sin las que no tienen pregunta (igual que el importador del plugin).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        rows = iter_json_rows(path)
+    elif ext == ".csv":
+        rows = iter_csv_rows(path)
+    else:
+        raise ValueError(f"Formato de KB no soportado: {path}")
+
+    for row in rows:
+        if row["question"]:
+            yield row
+
+
+def load_kb_rows(path: str) -> list:
+    """
+    Devuelve las filas de la KB como dicts con las claves de KB_FIELDS.
+    Se omiten las filas sin pregunta (igual que el importador del plugin).
+    Un .rkb se devuelve como kb_store.KBStore: secuencia de solo lectura que decodifica
+    cada fila al acceder a ella.
+    """
+    if os.path.splitext(path)[1].lower() == ".rkb":
+        from kb_store import KBStore
+        return KBStore(path)
+
+    return list(iter_kb_rows(path))
+
+
+def load_kb_files(paths: list) -> list:
+    """
+    Une las filas de varios archivos, en orden. Con un solo archivo se devuelve tal cual
+    (un .rkb sigue siendo perezoso).
+    """
+    if len(paths) == 1:
+        return load_kb_rows(paths[0])
+
+    rows = []
+    for path in paths:
+        rows.extend(load_kb_rows(path))
+    return rows
+
+
+def write_kb_csv(path: str, rows: list, extra_fields: list = None) -> None:
+    """
+    Escribe filas en el formato del plugin (question;answer;category;source;source_url, UTF-8 con BOM).
+    Las columnas extra van después de las cinco estándar; el importador las ignora.
+    """
+    fields = KB_FIELDS + list(extra_fields or [])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([row.get(field, "") for field in fields])
+    os.replace(tmp_path, path)
@@ -0,0 +1,168 @@
+"""
+Escritura en streaming del CSV y diario (journal) para reanudar ejecuciones interrumpidas.
+
+- KBStreamWriter: escribe cada fila en `<salida>.partial` en cuanto se produce y, al terminar,
+  renombra el archivo a la salida definitiva (el CSV anterior no se toca hasta ese momento).
+- ResumeJournal: JSONL de solo-añadir con cada (página/archivo, pregunta) ya respondida.
+  Con --resume, las respuestas del diario se reutilizan sin volver a llamar al LLM.
+
+Cada línea del diario guarda la huella de la página (texto, plantillas, modelo y modo de
+contexto, ver kb_manifest.make_entry): si la página cambió desde la ejecución interrumpida,
+sus respuestas guardadas no se reutilizan.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+
+from kb_io import KB_FIELDS
+from kb_text import SEARCH_FIELDS, search_columns
+
+
+def journal_path_for(output_csv: str) -> str:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.journal.jsonl
+    """
+    return os.path.splitext(output_csv)[0] + ".journal.jsonl"
+
+
+def entry_fingerprint(entry: dict) -> str:
+    payload = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class KBStreamWriter:
+    """
+    CSV del plugin escrito fila a fila en un archivo parcial.
+    Con search_columns=True se añaden las columnas de kb_text.SEARCH_FIELDS tras las cinco estándar.
+    """
+
+    def __init__(self, output_csv: str, search_columns: bool = False):
+        self.output_csv = output_csv
+        self.partial_path = output_csv + ".partial"
+        self.rows_written = 0
+        self.search_columns = search_columns
+        self.fields = KB_FIELDS + (SEARCH_FIELDS if search_columns else [])
+        self._file = open(self.partial_path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file, delimiter=";")
+        self._writer.writerow(self.fields)
+
+    def write_rows(self, rows: list) -> None:
+        for row in rows:
+            if self.search_columns:
+                row = {**row, **search_columns(row)}
+            self._writer.writerow([row.get(field, "") for field in self.fields])
+        self.rows_written += len(rows)
+        self._file.flush()
+
+    def commit(self) -> None:
+        """
+        Cierra el parcial y lo convierte en la salida definitiva (rename atómico).
+        """
+        self._file.close()
+        os.replace(self.partial_path, self.output_csv)
+
+    def close(self) -> None:
+        """
+        Cierra sin publicar (el parcial queda en disco).
+        """
+        if not self._file.closed:
+            self._file.close()
+
+
+class ResumeJournal:
+    """
+    Diario JSONL de respuestas completadas, seguro entre hilos.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.done = {}
+        self.resumed = 0
+        self._lock = threading.Lock()
+
+        if resume:
+            self._load()
+        mode = "a" if resume else "w"
+        self._file = open(path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir si el proceso murió durante el append
+                    continue
+                self.done[(record["key"], record["fingerprint"], record["row"]["question"])] = record["row"]
+
+    def get(self, key: str, fingerprint: str, question: str):
+        """
+        Fila ya completada para esta pregunta, o None.
+        """
+        row = self.done.get((key, fingerprint, question))
+        if row is not None:
+            with self._lock:
+                self.resumed += 1
+        return row
+
+    def record(self, key: str, fingerprint: str, row: dict) -> None:
+        line = json.dumps({"key": key, "fingerprint": fingerprint, "row": row}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def finish(self) -> None:
+        """
+        Ejecución completa: el diario ya no hace falta.
+        """
+        self._file.close()
+        os.remove(self.path)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def failed_path_for(output_csv: str) -> str:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.failed.jsonl
+    """
+    return os.path.splitext(output_csv)[0] + ".failed.jsonl"
+
+
+class FailedItemsLog:
+    """
+    Preguntas que no obtuvieron respuesta del LLM en esta ejecución (JSONL).
+    No se escriben en el CSV ni en el diario: --resume las vuelve a pedir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def record(self, key: str, question: str, source_url: str) -> None:
+        line = json.dumps(
+            {"key": key, "question": question, "source_url": source_url, "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        """
+        Cierra el registro; si no hubo fallos, elimina el archivo.
+        """
+        self._file.close()
+        if not self.count:
+            os.remove(self.path)
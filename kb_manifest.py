@@ -0,0 +1,131 @@
+"""
+Manifiesto para reconstruir la base de conocimientos de forma incremental.
+
+Por cada URL o archivo procesado se guarda:
+- hash del texto extraído,
+- hash del conjunto de preguntas (plantillas ya aplicadas al título),
+- modelo LLM usado,
+- modo de contexto del prompt (prefix / chunks),
+- source_url con el que se escribieron sus filas en el CSV.
+
+En la siguiente ejecución solo se regeneran las páginas cuyo contenido, plantillas o modelo
+hayan cambiado; el resto reutiliza sus filas del CSV anterior. Las páginas que ya no se
+procesan desaparecen del manifiesto y del CSV.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(output_csv: str) -> str:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.manifest.json
+    """
+    return os.path.splitext(output_csv)[0] + ".manifest.json"
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_questions(preguntas: list) -> str:
+    payload = json.dumps(preguntas, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Campos que deciden si una página cambió. Las entradas antiguas sin "context_mode"
+# se generaron con el prefijo del texto.
+ENTRY_FIELDS = ("text_hash", "templates_hash", "model", "source_url", "context_mode")
+ENTRY_DEFAULTS = {"context_mode": "prefix"}
+
+
+def make_entry(text: str, preguntas: list, model: str, source_url: str, context_mode: str = "prefix") -> dict:
+    """
+    Crea la entrada del manifiesto para una página o archivo.
+    """
+    return {
+        "text_hash": hash_text(text),
+        "templates_hash": hash_questions(preguntas),
+        "model": model,
+        "source_url": source_url,
+        "context_mode": context_mode,
+    }
+
+
+def is_unchanged(previous: dict, current: dict) -> bool:
+    """
+    True si la página no cambió respecto a la ejecución anterior.
+    """
+    if not previous:
+        return False
+
+    return all(
+        previous.get(field, ENTRY_DEFAULTS.get(field)) == current.get(field, ENTRY_DEFAULTS.get(field))
+        for field in ENTRY_FIELDS
+    )
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Devuelve {clave (URL o ruta): entrada}. Si no existe o es inválido, un dict vacío.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  No se pudo leer el manifiesto {path}: {e}")
+        return {}
+
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+
+    return data.get("entries", {})
+
+
+def save_manifest(path: str, entries: dict) -> None:
+    """
+    Escribe el manifiesto de forma atómica (archivo temporal + rename).
+    """
+    data = {
+        "version": MANIFEST_VERSION,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entries": entries,
+    }
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_previous_rows(csv_path: str) -> dict:
+    """
+    Lee el CSV anterior y agrupa sus filas por source_url, conservando el orden.
+    """
+    rows_by_url = {}
+
+    if not os.path.exists(csv_path):
+        return rows_by_url
+
+    with open(csv_path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        for row in reader:
+            if not row.get("question"):
+                continue
+            rows_by_url.setdefault(row.get("source_url", ""), []).append({
+                "question": row.get("question", ""),
+                "answer": row.get("answer", ""),
+                "category": row.get("category", ""),
+                "source": row.get("source", ""),
+                "source_url": row.get("source_url", ""),
+            })
+
+    return rows_by_url
@@ -0,0 +1,456 @@
+"""
+Exportación masiva de la base de conocimientos a SQL para la tabla del plugin
+(`wp_rag_knowledge_base`), como alternativa a "Importar FAQs" del admin, que inserta fila a
+fila y se corta por tiempo con archivos grandes.
+
+- Formato insert: INSERT multi-fila en trozos (ROWS_PER_INSERT filas y como mucho
+  MAX_STATEMENT_BYTES por sentencia, por debajo del max_allowed_packet por defecto de MySQL).
+- Formato load-data (solo MySQL): los datos van a un .tsv y el .sql lo carga con
+  LOAD DATA LOCAL INFILE (lo más rápido; requiere `mysql --local-infile=1`).
+- Modos (los mismos nombres que el admin, más upsert):
+  - replace: vacía la tabla y carga todas las filas;
+  - append: añade las filas sin tocar las existentes;
+  - upsert: clave = hash de pregunta + source_url. Las filas se cargan en una tabla temporal
+    de staging con su key_hash y content_hash; se actualizan las existentes cuyo contenido
+    cambió y se insertan las nuevas. Las demás filas de la tabla no se tocan.
+- Dialectos mysql y sqlite. --verify-sqlite ejecuta el mismo modo contra una base SQLite
+  local (en memoria o un archivo) con el esquema del plugin y comprueba el resultado.
+
+Las filas se limpian como lo hace el plugin al importar: sin etiquetas ni saltos de línea en
+pregunta/categoría/fuente, columnas recortadas a su longitud y filas sin pregunta o sin
+respuesta descartadas.
+
+Uso:
+    python kb_sql_export.py deseguridad_knowledge_base_servicios.csv deseguridad_knowledge_base_otros.csv \
+        [--mode replace|append|upsert] [--dialect mysql|sqlite] [--format insert|load-data] \
+        [--table-prefix wp_] [-o deseguridad_knowledge_base.sql] [--verify-sqlite [BASE.sqlite]]
+
+    mysql --default-character-set=utf8mb4 [--local-infile=1] NOMBRE_BD < deseguridad_knowledge_base.sql
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+from kb_io import KB_FIELDS, load_kb_files
+from kb_text import sanitize_text_field
+
+DEFAULT_OUTPUT_SQL = "./deseguridad_knowledge_base.sql"
+DEFAULT_TABLE_PREFIX = "wp_"
+TABLE_NAME = "rag_knowledge_base"
+
+MODES = ["replace", "append", "upsert"]
+DIALECTS = ["mysql", "sqlite"]
+FORMATS = ["insert", "load-data"]
+DEFAULT_MODE = "append"
+DEFAULT_DIALECT = "mysql"
+DEFAULT_FORMAT = "insert"
+
+ROWS_PER_INSERT = 1000
+MAX_STATEMENT_BYTES = 1024 * 1024
+
+# Longitud de las columnas varchar de la tabla del plugin (includes/class-database.php)
+FIELD_LIMITS = {"category": 255, "source": 500, "source_url": 500}
+
+# Campos que el plugin limpia con sanitize_text_field (la respuesta pasa por wp_kses_post y
+# source_url por esc_url_raw, que conserva los %XX)
+TEXT_FIELDS = ["question", "category", "source"]
+
+_MYSQL_ESCAPES = {"\\": "\\\\", "'": "\\'", "\0": "\\0", "\n": "\\n", "\r": "\\r", "\x1a": "\\Z"}
+_MYSQL_ESCAPE_RE = re.compile("[\\\\'\0\n\r\x1a]")
+_TSV_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"}
+_TSV_ESCAPE_RE = re.compile("[\\\\\t\n\r\0]")
+
+# Esquema del plugin traducido a SQLite, para --verify-sqlite
+SQLITE_SCHEMA = """CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    category TEXT DEFAULT '',
+    source TEXT DEFAULT '',
+    source_url TEXT DEFAULT '',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);"""
+
+
+def data_path_for(output_sql: str) -> str:
+    """
+    ./deseguridad_knowledge_base.sql -> ./deseguridad_knowledge_base.tsv (datos de LOAD DATA)
+    """
+    return os.path.splitext(output_sql)[0] + ".tsv"
+
+
+# ==========================
+# FILAS Y HASHES
+# ==========================
+
+def clean_row(row: dict):
+    """
+    Fila lista para la tabla, o None si le falta la pregunta o la respuesta.
+    """
+    cleaned = {}
+    for field in KB_FIELDS:
+        value = str(row.get(field) or "").replace("\0", "").strip().strip("\"'")
+        if field in TEXT_FIELDS:
+            value = sanitize_text_field(value)
+        if field in FIELD_LIMITS:
+            value = value[:FIELD_LIMITS[field]]
+        cleaned[field] = value
+
+    if not cleaned["question"] or not cleaned["answer"]:
+        return None
+    return cleaned
+
+
+def key_hash(row: dict) -> str:
+    """
+    Identidad de la fila en modo upsert: pregunta + source_url.
+    """
+    return hashlib.sha256(f"{row['question']}\n{row['source_url']}".encode("utf-8")).hexdigest()
+
+
+def content_hash(row: dict) -> str:
+    return hashlib.sha256("\n".join(row[field] for field in KB_FIELDS).encode("utf-8")).hexdigest()
+
+
+def prepare_rows(rows: list, mode: str) -> tuple:
+    """
+    Limpia las filas. En upsert, si una clave se repite gana la última aparición.
+    Devuelve (filas, estadísticas).
+    """
+    stats = {"input": len(rows), "skipped_empty": 0, "duplicate_keys": 0}
+    prepared = []
+    for row in rows:
+        cleaned = clean_row(row)
+        if cleaned is None:
+            stats["skipped_empty"] += 1
+            continue
+        prepared.append(cleaned)
+
+    if mode == "upsert":
+        by_key = {}
+        for row in prepared:
+            by_key[key_hash(row)] = row
+        stats["duplicate_keys"] = len(prepared) - len(by_key)
+        prepared = list(by_key.values())
+
+    stats["rows"] = len(prepared)
+    return prepared, stats
+
+
+# ==========================
+# SQL
+# ==========================
+
+def quote(value: str, dialect: str) -> str:
+    if dialect == "mysql":
+        return "'" + _MYSQL_ESCAPE_RE.sub(lambda m: _MYSQL_ESCAPES[m.group()], value) + "'"
+    return "'" + value.replace("'", "''") + "'"
+
+
+def iter_insert_statements(table: str, columns: list, tuples, dialect: str,
+                           rows_per_insert: int = ROWS_PER_INSERT, max_bytes: int = MAX_STATEMENT_BYTES):
+    """
+    INSERT multi-fila de como mucho `rows_per_insert` filas y unos `max_bytes` bytes cada uno.
+    """
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+    values = []
+    size = len(head)
+    for values_tuple in tuples:
+        item = "(" + ", ".join(quote(value, dialect) for value in values_tuple) + ")"
+        item_size = len(item.encode("utf-8")) + 2
+        if values and (len(values) >= rows_per_insert or size + item_size > max_bytes):
+            yield head + ",\n".join(values) + ";"
+            values = []
+            size = len(head)
+        values.append(item)
+        size += item_size
+    if values:
+        yield head + ",\n".join(values) + ";"
+
+
+def _hash_expressions(dialect: str) -> tuple:
+    """
+    Expresiones SQL de key_hash y content_hash sobre las columnas de la tabla (mismo valor que
+    key_hash()/content_hash() en Python). En SQLite, SHA2 la registra --verify-sqlite.
+    """
+    if dialect == "mysql":
+        newline = "CHAR(10 USING utf8mb4)"
+        key = f"SHA2(CONCAT(question, {newline}, source_url), 256)"
+        content = f"SHA2(CONCAT_WS({newline}, {', '.join(KB_FIELDS)}), 256)"
+    else:
+        newline = " || char(10) || "
+        key = f"SHA2(question{newline}source_url, 256)"
+        content = f"SHA2({newline.join(KB_FIELDS)}, 256)"
+    return key, content
+
+
+def _staging_statements(table: str, staging: str, current: str, dialect: str) -> tuple:
+    """
+    Sentencias del modo upsert tras cargar el staging: (crear staging, hashes actuales de la
+    tabla, update, insert, limpieza), cada una como lista de sentencias.
+    """
+    key_expr, content_expr = _hash_expressions(dialect)
+    columns = ", ".join(KB_FIELDS)
+    if dialect == "mysql":
+        create_staging = (
+            f"CREATE TEMPORARY TABLE {staging} (\n"
+            "    key_hash char(64) NOT NULL,\n"
+            "    content_hash char(64) NOT NULL,\n"
+            "    question text NOT NULL,\n"
+            "    answer longtext NOT NULL,\n"
+            "    category varchar(255) DEFAULT '',\n"
+            "    source varchar(500) DEFAULT '',\n"
+            "    source_url varchar(500) DEFAULT '',\n"
+            "    PRIMARY KEY (key_hash)\n"
+            ") DEFAULT CHARSET=utf8mb4;"
+        )
+        create_current = (
+            f"CREATE TEMPORARY TABLE {current} (PRIMARY KEY (id), KEY key_hash_idx (key_hash))\n"
+            f"SELECT id, {key_expr} AS key_hash, {content_expr} AS content_hash FROM {table};"
+        )
+        update = (
+            f"UPDATE {table} t\n"
+            f"JOIN {current} c ON c.id = t.id\n"
+            f"JOIN {staging} s ON s.key_hash = c.key_hash\n"
+            "SET t.answer = s.answer, t.category = s.category, t.source = s.source\n"
+            "WHERE c.content_hash <> s.content_hash;"
+        )
+        create_staging, create_current, update = [create_staging], [create_current], [update]
+        drop = [f"DROP TEMPORARY TABLE {staging}, {current};"]
+    else:
+        create_staging = (
+            f"CREATE TEMP TABLE {staging} (\n"
+            "    key_hash TEXT PRIMARY KEY,\n"
+            "    content_hash TEXT NOT NULL,\n"
+            "    question TEXT NOT NULL,\n"
+            "    answer TEXT NOT NULL,\n"
+            "    category TEXT DEFAULT '',\n"
+            "    source TEXT DEFAULT '',\n"
+            "    source_url TEXT DEFAULT ''\n"
+            ");"
+        )
+        create_current = [
+            f"CREATE TEMP TABLE {current} AS\n"
+            f"SELECT id, {key_expr} AS key_hash, {content_expr} AS content_hash FROM {table};",
+            f"CREATE INDEX temp.{current}_key_hash_idx ON {current} (key_hash);",
+        ]
+        update = (
+            f"UPDATE {table} SET answer = s.answer, category = s.category, source = s.source\n"
+            f"FROM {current} c JOIN {staging} s ON s.key_hash = c.key_hash\n"
+            f"WHERE c.id = {table}.id AND c.content_hash <> s.content_hash;"
+        )
+        create_staging, update = [create_staging], [update]
+        drop = [f"DROP TABLE {staging};", f"DROP TABLE {current};"]
+
+    insert = [
+        f"INSERT INTO {table} ({columns})\n"
+        f"SELECT {', '.join('s.' + f for f in KB_FIELDS)} FROM {staging} s\n"
+        f"LEFT JOIN {current} c ON c.key_hash = s.key_hash\n"
+        "WHERE c.id IS NULL;"
+    ]
+    return create_staging, create_current, update, insert, drop
+
+
+def load_data_statement(table: str, columns: list, data_path: str) -> str:
+    path = data_path.replace("\\", "\\\\").replace("'", "\\'")
+    return (
+        f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} CHARACTER SET utf8mb4\n"
+        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'\n"
+        f"({', '.join(columns)});"
+    )
+
+
+def write_load_data_file(path: str, tuples) -> int:
+    """
+    TSV con el escapado por defecto de LOAD DATA (\\t, \\n, \\\\...). Devuelve las filas escritas.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for values_tuple in tuples:
+            f.write("\t".join(_TSV_ESCAPE_RE.sub(lambda m: _TSV_ESCAPES[m.group()], value) for value in values_tuple))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def row_tuples(rows: list, mode: str):
+    """
+    Valores de cada fila en el orden de las columnas cargadas (en upsert, con sus hashes delante).
+    """
+    if mode == "upsert":
+        return ((key_hash(row), content_hash(row)) + tuple(row[f] for f in KB_FIELDS) for row in rows)
+    return (tuple(row[f] for f in KB_FIELDS) for row in rows)
+
+
+def iter_script(rows: list, table: str, mode: str, dialect: str = DEFAULT_DIALECT, fmt: str = DEFAULT_FORMAT,
+                data_path: str = None, rows_per_insert: int = ROWS_PER_INSERT):
+    """
+    Sentencias del script de carga, en orden. Con fmt="load-data" los datos se leen de
+    `data_path` (hay que escribirlo con write_load_data_file y las mismas filas).
+    """
+    if fmt == "load-data" and dialect != "mysql":
+        raise ValueError("LOAD DATA solo existe en MySQL: usa --format insert con --dialect sqlite")
+
+    if dialect == "mysql":
+        yield "SET NAMES utf8mb4;"
+        if mode == "replace":
+            # TRUNCATE hace commit implícito: va antes de la transacción (igual que el admin)
+            yield f"TRUNCATE TABLE {table};"
+        yield "START TRANSACTION;"
+    else:
+        yield "BEGIN;"
+        if mode == "replace":
+            yield f"DELETE FROM {table};"
+
+    tuples = row_tuples(rows, mode)
+    if mode == "upsert":
+        staging, current = f"{table}_staging", f"{table}_current"
+        create_staging, create_current, update, insert, drop = _staging_statements(table, staging, current, dialect)
+        target, columns = staging, ["key_hash", "content_hash"] + KB_FIELDS
+        yield from create_staging
+    else:
+        target, columns = table, KB_FIELDS
+
+    if fmt == "load-data":
+        yield load_data_statement(target, columns, data_path)
+    else:
+        yield from iter_insert_statements(target, columns, tuples, dialect, rows_per_insert)
+
+    if mode == "upsert":
+        yield from create_current
+        yield from update
+        yield from insert
+        yield from drop
+
+    yield "COMMIT;"
+
+
+# ==========================
+# VERIFICACIÓN (SQLite)
+# ==========================
+
+def _sha2(value, bits):
+    if value is None:
+        return None
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+
+
+def verify_sqlite(rows: list, table: str, mode: str, db_path: str = ":memory:",
+                  rows_per_insert: int = ROWS_PER_INSERT) -> dict:
+    """
+    Ejecuta el script del dialecto sqlite contra `db_path` (se crea la tabla si no existe) y
+    comprueba que la tabla quedó como exige el modo. Devuelve un dict con el resultado.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.create_function("SHA2", 2, _sha2, deterministic=True)
+    try:
+        conn.execute(SQLITE_SCHEMA.format(table=table))
+        before = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+        start = time.perf_counter()
+        statements = 0
+        for statement in iter_script(rows, table, mode, "sqlite", "insert", rows_per_insert=rows_per_insert):
+            conn.execute(statement)
+            statements += 1
+        elapsed = time.perf_counter() - start
+
+        after = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        stored = {}
+        for values in conn.execute(f"SELECT {', '.join(KB_FIELDS)} FROM {table}"):
+            row = dict(zip(KB_FIELDS, values))
+            stored.setdefault(key_hash(row), set()).add(content_hash(row))
+    finally:
+        conn.close()
+
+    missing = sum(1 for row in rows if content_hash(row) not in stored.get(key_hash(row), ()))
+    if mode == "replace":
+        expected = len(rows)
+    elif mode == "append":
+        expected = before + len(rows)
+    else:
+        expected = None  # depende de cuántas claves ya existían
+    ok = missing == 0 and (expected is None or after == expected)
+
+    return {
+        "ok": ok,
+        "before": before,
+        "after": after,
+        "expected": expected,
+        "missing": missing,
+        "statements": statements,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(len(rows) / elapsed) if elapsed else None,
+    }
+
+
+# ==========================
+# MAIN
+# ==========================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exporta la KB a SQL de carga masiva para la tabla rag_knowledge_base del plugin.")
+    parser.add_argument("inputs", nargs="+", help="Archivos de la KB (.csv o .json)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_SQL, help=f"Script SQL de salida (por defecto {DEFAULT_OUTPUT_SQL})")
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=MODES, help=f"replace, append o upsert por hash de pregunta + URL (por defecto {DEFAULT_MODE})")
+    parser.add_argument("--dialect", default=DEFAULT_DIALECT, choices=DIALECTS, help=f"Dialecto SQL (por defecto {DEFAULT_DIALECT})")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=FORMATS, help="insert (INSERT multi-fila) o load-data (.tsv + LOAD DATA LOCAL INFILE, solo MySQL)")
+    parser.add_argument("--table-prefix", default=DEFAULT_TABLE_PREFIX, help=f"Prefijo de tablas de WordPress (por defecto {DEFAULT_TABLE_PREFIX})")
+    parser.add_argument("--rows-per-insert", type=int, default=ROWS_PER_INSERT, help=f"Filas por INSERT (por defecto {ROWS_PER_INSERT})")
+    parser.add_argument(
+        "--verify-sqlite", nargs="?", const=":memory:", metavar="BASE",
+        help="Ejecutar la carga contra SQLite (en memoria o en el archivo BASE) y comprobar el resultado",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    table = args.table_prefix + TABLE_NAME
+    if args.format == "load-data" and args.dialect != "mysql":
+        print("⚠️  LOAD DATA solo existe en MySQL: usa --format insert con --dialect sqlite.")
+        return
+
+    rows, stats = prepare_rows(load_kb_files(args.inputs), args.mode)
+    print(f"Filas: {stats['input']} leídas | {stats['rows']} a cargar | {stats['skipped_empty']} sin pregunta o respuesta"
+          + (f" | {stats['duplicate_keys']} claves repetidas (gana la última)" if args.mode == "upsert" else ""))
+    print(f"Tabla: {table} | modo: {args.mode} | dialecto: {args.dialect} | formato: {args.format}")
+
+    start = time.perf_counter()
+    data_path = None
+    if args.format == "load-data":
+        data_path = data_path_for(args.output)
+        write_load_data_file(data_path, row_tuples(rows, args.mode))
+
+    statements = 0
+    with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+        f.write(f"-- {len(rows)} filas para {table} (modo {args.mode}), generado por kb_sql_export.py\n")
+        for statement in iter_script(rows, table, args.mode, args.dialect, args.format,
+                                     os.path.abspath(data_path) if data_path else None, args.rows_per_insert):
+            f.write(statement + "\n")
+            statements += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"📄 {args.output}: {statements} sentencias, {os.path.getsize(args.output) / 1024:.0f} KB ({elapsed * 1000:.0f} ms)")
+    if data_path:
+        print(f"📄 Datos para LOAD DATA: {data_path} ({os.path.getsize(data_path) / 1024:.0f} KB)")
+    if args.dialect == "mysql":
+        local_infile = " --local-infile=1" if data_path else ""
+        print(f"   Cargar con: mysql --default-character-set=utf8mb4{local_infile} NOMBRE_BD < {args.output}")
+
+    if args.verify_sqlite:
+        result = verify_sqlite(rows, table, args.mode, args.verify_sqlite, args.rows_per_insert)
+        status = "✅" if result["ok"] else "⚠️ "
+        print(
+            f"{status} Verificación SQLite ({args.verify_sqlite}): {result['before']} -> {result['after']} filas"
+            + (f" (esperadas {result['expected']})" if result["expected"] is not None else "")
+            + f", {result['missing']} filas sin cargar, {result['statements']} sentencias en {result['elapsed_s']:.2f} s"
+            + (f" ({result['rows_per_s']} filas/s)" if result["rows_per_s"] else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
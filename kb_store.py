@@ -0,0 +1,421 @@
+"""
+Almacén columnar binario de la base de conocimientos (.rkb).
+
+Los CSV del plugin y el JSON (con claves en español) se vuelven a parsear enteros como dicts
+en cada herramienta. El .rkb se genera una vez a partir de cualquiera de ellos y se abre con
+mmap: abrirlo solo lee la cabecera, y cada fila se decodifica cuando se accede a ella.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+- Cabecera: magic "RKB1", versión, número de filas y número de secciones.
+- Directorio: (nombre, offset, longitud) de cada sección.
+- "meta": JSON con los campos, las fuentes convertidas (tamaño y mtime) y la fecha.
+- question / answer: "<campo>.off" (uint64, filas + 1 offsets) y "<campo>.dat" (UTF-8 concatenado).
+  El texto de la fila i es dat[off[i]:off[i + 1]].
+- category / source / source_url: valores internados. "<campo>.ids" (uint32 por fila) apunta
+  a una tabla de valores distintos con el mismo esquema .off/.dat.
+
+Uso:
+    python kb_store.py convert deseguridad_knowledge_base_servicios.csv deseguridad_knowledge_base_otros.csv -o kb.rkb
+    python kb_store.py info kb.rkb
+    python kb_store.py show kb.rkb 0 42 [--field answer]
+
+Desde Python: kb_io.load_kb_rows("kb.rkb") devuelve un KBStore, y open_kb_store(ruta) convierte
+un CSV/JSON a su .rkb la primera vez (o cuando cambia) y lo reutiliza en las siguientes.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Sequence
+
+from kb_io import KB_FIELDS, iter_kb_rows
+
+STORE_MAGIC = b"RKB1"
+STORE_VERSION = 1
+
+TEXT_FIELDS = ("question", "answer")
+INTERNED_FIELDS = ("category", "source", "source_url")
+
+_HEADER = struct.Struct("<4sHHQII")     # magic, versión, flags, filas, secciones, reservado
+_SECTION = struct.Struct("<16sQQ")      # nombre, offset, longitud
+_ALIGN = 8
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def store_path_for(kb_path: str) -> str:
+    """
+    ./deseguridad_knowledge_base.json -> ./deseguridad_knowledge_base.rkb
+    """
+    return os.path.splitext(kb_path)[0] + ".rkb"
+
+
+def _source_info(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _le_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+# ==========================
+# ESCRITURA
+# ==========================
+
+class KBStoreWriter:
+    """
+    Convierte filas a .rkb en streaming: el texto de question/answer va a archivos temporales
+    y en memoria solo quedan los offsets (8 bytes por fila) y los valores internados distintos.
+
+    Uso:
+        writer = KBStoreWriter("kb.rkb")
+        for row in filas: writer.add(row)
+        writer.commit({"sources": [...]})
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        spill_dir = os.path.dirname(os.path.abspath(path))
+        self._blobs = {field: tempfile.TemporaryFile(dir=spill_dir) for field in TEXT_FIELDS}
+        self._offsets = {field: array("Q", [0]) for field in TEXT_FIELDS}
+        self._ids = {field: array("I") for field in INTERNED_FIELDS}
+        self._tables = {field: {} for field in INTERNED_FIELDS}
+
+    def add(self, row: dict) -> None:
+        for field in TEXT_FIELDS:
+            data = (row.get(field) or "").encode("utf-8")
+            self._blobs[field].write(data)
+            offsets = self._offsets[field]
+            offsets.append(offsets[-1] + len(data))
+        for field in INTERNED_FIELDS:
+            table = self._tables[field]
+            self._ids[field].append(table.setdefault(row.get(field) or "", len(table)))
+        self.rows += 1
+
+    def _sections(self, meta: dict) -> list:
+        """
+        [(nombre, bytes o archivo temporal, longitud)] en el orden del archivo.
+        """
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        sections = [("meta", meta_bytes, len(meta_bytes))]
+
+        for field in TEXT_FIELDS:
+            offsets = self._offsets[field]
+            sections.append((field + ".off", _le_bytes(offsets), len(offsets) * 8))
+            sections.append((field + ".dat", self._blobs[field], offsets[-1]))
+
+        for field in INTERNED_FIELDS:
+            values = [value.encode("utf-8") for value in self._tables[field]]
+            offsets = array("Q", [0])
+            for value in values:
+                offsets.append(offsets[-1] + len(value))
+            ids = _le_bytes(self._ids[field])
+            sections.append((field + ".ids", ids, len(ids)))
+            sections.append((field + ".off", _le_bytes(offsets), len(offsets) * 8))
+            sections.append((field + ".dat", b"".join(values), offsets[-1]))
+
+        return sections
+
+    def commit(self, meta: dict = None) -> None:
+        """
+        Escribe el .rkb (en un temporal que se renombra al terminar) y libera los temporales.
+        """
+        meta = dict(meta or {})
+        meta.setdefault("fields", KB_FIELDS)
+        meta.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        meta["rows"] = self.rows
+        sections = self._sections(meta)
+
+        position = _HEADER.size + _SECTION.size * len(sections)
+        directory = []
+        for name, _, length in sections:
+            position += -position % _ALIGN
+            directory.append((name, position, length))
+            position += length
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, self.rows, len(sections), 0))
+                for name, offset, length in directory:
+                    f.write(_SECTION.pack(name.encode("ascii"), offset, length))
+                for (_, content, length), (_, offset, _) in zip(sections, directory):
+                    f.write(b"\0" * (offset - f.tell()))
+                    if isinstance(content, bytes):
+                        f.write(content)
+                    else:
+                        content.seek(0)
+                        while True:
+                            chunk = content.read(1 << 20)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+            os.replace(tmp_path, self.path)
+        finally:
+            self.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def close(self) -> None:
+        for blob in self._blobs.values():
+            blob.close()
+
+
+def convert_to_store(inputs: list, output: str) -> int:
+    """
+    Convierte uno o varios CSV/JSON (en orden) a un .rkb leyéndolos en streaming.
+    Devuelve el número de filas.
+    """
+    writer = KBStoreWriter(output)
+    try:
+        for path in inputs:
+            for row in iter_kb_rows(path):
+                writer.add(row)
+    except BaseException:
+        writer.close()
+        raise
+    writer.commit({"sources": [_source_info(path) for path in inputs]})
+    return writer.rows
+
+
+# ==========================
+# LECTURA
+# ==========================
+
+class KBStore(Sequence):
+    """
+    Filas de un .rkb como secuencia de solo lectura de dicts con las claves de KB_FIELDS.
+    store[i] decodifica solo la fila i; get(i, campo) solo ese campo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: archivo .rkb vacío")
+        self._views = []
+
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: archivo .rkb truncado")
+        magic, version, _, rows, section_count, _ = _HEADER.unpack_from(self._mmap, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"{path}: no es un .rkb de la versión {STORE_VERSION}")
+        self.rows = rows
+
+        self._sections = {}
+        for index in range(section_count):
+            name, offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + index * _SECTION.size)
+            self._sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        self.meta = json.loads(self._raw("meta").tobytes().decode("utf-8"))
+        self._text = {field: (self._array(field + ".off", "Q"), self._raw(field + ".dat")) for field in TEXT_FIELDS}
+        self._ids = {field: self._array(field + ".ids", "I") for field in INTERNED_FIELDS}
+        self._tables = {
+            field: (self._array(field + ".off", "Q"), self._raw(field + ".dat")) for field in INTERNED_FIELDS
+        }
+        self._values = {field: {} for field in INTERNED_FIELDS}
+
+    def _raw(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        view = memoryview(self._mmap)[offset:offset + length]
+        self._views.append(view)
+        return view
+
+    def _array(self, name: str, typecode: str):
+        view = self._raw(name)
+        if _LITTLE_ENDIAN:
+            view = view.cast(typecode)
+            self._views.append(view)
+            return view
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+
+    def _value(self, field: str, value_id: int) -> str:
+        cache = self._values[field]
+        value = cache.get(value_id)
+        if value is None:
+            offsets, data = self._tables[field]
+            value = cache[value_id] = str(data[offsets[value_id]:offsets[value_id + 1]], "utf-8")
+        return value
+
+    def get(self, index: int, field: str) -> str:
+        """
+        Un campo de una fila, sin decodificar el resto (admite índices negativos, como una lista).
+        """
+        index = self._row_index(index)
+        if field in self._text:
+            offsets, data = self._text[field]
+            return str(data[offsets[index]:offsets[index + 1]], "utf-8")
+        return self._value(field, self._ids[field][index])
+
+    def _row_index(self, index: int) -> int:
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError("fila fuera de rango")
+        return index
+
+    def values(self, field: str) -> list:
+        """
+        Valores distintos de un campo internado (category, source o source_url).
+        """
+        offsets, _ = self._tables[field]
+        return [self._value(field, value_id) for value_id in range(len(offsets) - 1)]
+
+    def select(self, field: str, value: str) -> list:
+        """
+        Índices de las filas cuyo campo internado vale `value` (recorre solo la columna de ids).
+        """
+        try:
+            value_id = self.values(field).index(value)
+        except ValueError:
+            return []
+        return [index for index, row_value in enumerate(self._ids[field]) if row_value == value_id]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.rows))]
+        index = self._row_index(index)
+        return {field: self.get(index, field) for field in KB_FIELDS}
+
+    def __iter__(self):
+        for index in range(self.rows):
+            yield {field: self.get(index, field) for field in KB_FIELDS}
+
+    def is_current(self, inputs: list) -> bool:
+        """
+        True si el .rkb se generó a partir de estos archivos y no han cambiado desde entonces.
+        """
+        try:
+            return self.meta.get("sources") == [_source_info(path) for path in inputs]
+        except OSError:
+            return False
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_kb_store(path: str, store_path: str = None) -> KBStore:
+    """
+    Abre un .rkb; si `path` es un CSV/JSON, lo convierte a `store_path` (por defecto junto a él)
+    la primera vez o cuando el archivo cambió, y abre el resultado.
+    """
+    if os.path.splitext(path)[1].lower() == ".rkb":
+        return KBStore(path)
+
+    store_path = store_path or store_path_for(path)
+    if os.path.exists(store_path):
+        try:
+            store = KBStore(store_path)
+        except ValueError:
+            store = None
+        if store is not None:
+            if store.is_current([path]):
+                return store
+            store.close()
+
+    convert_to_store([path], store_path)
+    return KBStore(store_path)
+
+
+# ==========================
+# CLI
+# ==========================
+
+def cmd_convert(args) -> None:
+    start = time.perf_counter()
+    rows = convert_to_store(args.inputs, args.output)
+    elapsed = time.perf_counter() - start
+
+    source_size = sum(os.path.getsize(path) for path in args.inputs)
+    size = os.path.getsize(args.output)
+    print(f"📦 {args.output}: {rows} filas en {elapsed * 1000:.0f} ms "
+          f"({size / 1024:.1f} KB; fuentes {source_size / 1024:.1f} KB)")
+
+
+def cmd_info(args) -> None:
+    start = time.perf_counter()
+    with KBStore(args.store) as store:
+        elapsed = time.perf_counter() - start
+        print(f"{args.store}: {len(store)} filas, abierto en {elapsed * 1000:.2f} ms")
+        print(f"Creado: {store.meta.get('created_at', '-')}")
+        for source in store.meta.get("sources", []):
+            print(f"  fuente: {source['path']} ({source['size']} bytes)")
+        for field in TEXT_FIELDS:
+            print(f"  {field}: {store._sections[field + '.dat'][1] / 1024:.1f} KB de texto")
+        for field in INTERNED_FIELDS:
+            print(f"  {field}: {len(store.values(field))} valores distintos")
+
+
+def cmd_show(args) -> None:
+    with KBStore(args.store) as store:
+        for index in args.rows:
+            if args.field:
+                print(f"{index}: {store.get(index, args.field)}")
+                continue
+            row = store[index]
+            print(f"[{index}] {row['question']}")
+            print(f"   {row['category']} | {row['source']} | {row['source_url']}")
+            print(f"   {row['answer'][:300]}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Almacén columnar binario (.rkb) de la base de conocimientos.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Convertir CSV/JSON de la KB a .rkb")
+    convert.add_argument("inputs", nargs="+", help="CSV del plugin o JSON de la KB (se unen en orden)")
+    convert.add_argument("-o", "--output", required=True, help="Archivo .rkb de salida")
+    convert.set_defaults(func=cmd_convert)
+
+    info = subparsers.add_parser("info", help="Resumen de un .rkb")
+    info.add_argument("store", help="Archivo .rkb")
+    info.set_defaults(func=cmd_info)
+
+    show = subparsers.add_parser("show", help="Mostrar filas concretas de un .rkb")
+    show.add_argument("store", help="Archivo .rkb")
+    show.add_argument("rows", nargs="+", type=int, help="Índices de fila (desde 0)")
+    show.add_argument("--field", choices=KB_FIELDS, help="Mostrar solo este campo")
+    show.set_defaults(func=cmd_show)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
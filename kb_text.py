@@ -0,0 +1,205 @@
+"""
+Normalización de texto compartida por las herramientas de la base de conocimientos.
+
+normalize_text y STOPWORDS replican RAG_Chatbot_Database::normalize_text y la lista de
+stopwords de extract_key_terms (includes/class-database.php), para que lo que se prepara
+en Python coincida con lo que busca el plugin.
+"""
+
+import re
+
+# Mismo mapa que strtr() en normalize_text (PHP)
+ACCENT_MAP = {
+    "á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u",
+    "Á": "a", "É": "e", "Í": "i", "Ó": "o", "Ú": "u",
+    "ñ": "n", "Ñ": "n", "ü": "u", "Ü": "u",
+}
+_ACCENT_TABLE = str.maketrans(ACCENT_MAP)
+
+# Stopwords de extract_key_terms (PHP), ya normalizadas
+STOPWORDS = frozenset([
+    "a", "acerca", "al", "ayuda", "ayudame", "busca", "buscame", "buscar", "cliente", "como",
+    "con", "consulta", "consultar", "contacto", "cuanto", "cuantos", "cual", "cuales", "cuando",
+    "dar", "de", "debo", "del", "desde", "detalle", "detalles", "dime", "donde", "duda",
+    "durante", "el", "ella", "ello", "ellos", "es", "esta", "estan", "este", "estos", "favor",
+    "haber", "hasta", "hay", "informacion", "informame", "info", "indicame", "indicarme", "ir",
+    "la", "las", "le", "les", "lo", "los", "mas", "masinfo", "me", "mostrar", "mucho", "muy",
+    "necesito", "no", "o", "otra", "otro", "para", "pero", "por", "porfavor", "pregunta",
+    "preguntas", "puedo", "que", "quien", "quienes", "quiero", "respuestas", "respuesta",
+    "saber", "se", "ser", "servicio", "sin", "soporte", "sobre", "solo", "son", "su", "tambien",
+    "tanto", "tengo", "todo", "todos", "un", "una", "unas", "uno", "unos", "usted", "vez",
+    "ver", "ya",
+])
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minúsculas y sin tildes (equivalente a normalize_text del plugin).
+    """
+    return text.lower().translate(_ACCENT_TABLE)
+
+
+def tokenize(text: str) -> list:
+    """
+    Normaliza y separa en palabras, descartando signos de puntuación.
+    """
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def light_stem(token: str) -> str:
+    """
+    Stemmer ligero para español: quita el plural y la vocal final de género.
+    precios/precio -> preci, evaluaciones -> evaluacion, luces -> luz.
+    """
+    if len(token) <= 3:
+        return token
+
+    if token.endswith("ces"):
+        token = token[:-3] + "z"
+    elif token.endswith("iones"):
+        token = token[:-2]
+    elif token.endswith("es") and len(token) > 4 and token[-3] not in "aeiou":
+        token = token[:-2]
+    elif token.endswith("s"):
+        token = token[:-1]
+
+    if len(token) > 4 and token[-1] in "aeo":
+        token = token[:-1]
+
+    return token
+
+
+def content_terms(text: str, stem: bool = True) -> list:
+    """
+    Palabras significativas de un texto: normalizadas, sin stopwords, de 3+ caracteres
+    y (opcionalmente) con stemming ligero.
+    """
+    terms = []
+    for token in tokenize(text):
+        if len(token) < 3 or token in STOPWORDS:
+            continue
+        terms.append(light_stem(token) if stem else token)
+    return terms
+
+
+# ==========================
+# PARIDAD CON EL PLUGIN (PHP)
+# ==========================
+
+# preg_split('/\s+/') sin modificador /u: solo espacios ASCII
+_PHP_WHITESPACE_RE = re.compile(r"[ \t\n\r\f\v]+")
+
+
+def php_strlen(text: str) -> int:
+    """
+    strlen() de PHP: longitud en bytes UTF-8 ("ñu" cuenta 3).
+    """
+    return len(text.encode("utf-8"))
+
+
+def extract_key_terms(query: str) -> list:
+    """
+    Réplica de RAG_Chatbot_Database::extract_key_terms: normaliza, separa por espacios,
+    descarta stopwords y palabras de menos de 3 bytes, y elimina duplicados conservando
+    el primer orden de aparición (array_unique). Los signos de puntuación pegados a una
+    palabra se conservan, igual que en PHP ("precio?" es un término).
+    """
+    terms = []
+    for word in _PHP_WHITESPACE_RE.split(normalize_text(query)):
+        if word and php_strlen(word) >= 3 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms
+
+
+def index_terms(text: str) -> list:
+    """
+    Términos para los índices offline: mismas reglas que extract_key_terms
+    (normalización, stopwords, 3+ bytes) pero separando también la puntuación,
+    para que "precio?" y "precio" caigan en la misma posting list. Conserva repeticiones.
+    """
+    return [
+        token for token in tokenize(text)
+        if php_strlen(token) >= 3 and token not in STOPWORDS
+    ]
+
+
+def query_index_terms(query: str) -> list:
+    """
+    Términos de consulta para los índices: los de extract_key_terms sin puntuación, sin duplicados.
+    """
+    terms = []
+    for key_term in extract_key_terms(query):
+        for token in index_terms(key_term):
+            if token not in terms:
+                terms.append(token)
+    return terms
+
+
+_TAG_BLOCK_RE = re.compile(r"<(script|style)[^>]*?>.*?</\1>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]*>")
+_PHP_SPACES_RE = re.compile(r"[\r\n\t ]+")
+_PERCENT_OCTET_RE = re.compile(r"%[a-fA-F0-9]{2}")
+
+
+def sanitize_text_field(text: str) -> str:
+    """
+    Aproximación de sanitize_text_field() de WordPress, que el plugin aplica a la consulta:
+    quita etiquetas HTML (y el contenido de script/style), saltos de línea, tabulaciones,
+    espacios repetidos y octetos %XX.
+    """
+    text = _TAG_BLOCK_RE.sub("", text)
+    text = _TAG_RE.sub("", text)
+    text = _PHP_SPACES_RE.sub(" ", text)
+
+    found = False
+    while _PERCENT_OCTET_RE.search(text):
+        text = _PERCENT_OCTET_RE.sub("", text)
+        found = True
+    if found:
+        text = re.sub(r" +", " ", text)
+
+    return text.strip()
+
+
+# ==========================
+# COLUMNAS DE BÚSQUEDA PRECALCULADAS
+# ==========================
+
+# Columnas extra que los generadores añaden después de las cinco del plugin
+# (el importador las ignora): texto ya normalizado para los stripos() de
+# calculate_relevance_score, raíces de las palabras y frecuencia de cada raíz.
+SEARCH_FIELDS = ["search_question", "search_category", "search_answer", "search_stems", "search_tf"]
+
+
+def term_frequencies(terms: list) -> list:
+    """
+    [(término, apariciones)] ordenado por frecuencia descendente y, a igualdad, alfabéticamente.
+    """
+    counts = {}
+    for term in terms:
+        counts[term] = counts.get(term, 0) + 1
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def search_columns(row: dict) -> dict:
+    """
+    Valores de SEARCH_FIELDS para una fila de la KB:
+    - search_question/category/answer: normalize_text del campo (igual que el plugin).
+    - search_stems: raíces (light_stem) de index_terms de pregunta, categoría y respuesta,
+      sin repetir y en orden de aparición, separadas por espacios.
+    - search_tf: "raíz:apariciones" separados por espacios, de más a menos frecuente.
+    """
+    stems = [
+        light_stem(term)
+        for field in ("question", "category", "answer")
+        for term in index_terms(row.get(field, ""))
+    ]
+    return {
+        "search_question": normalize_text(row.get("question", "")),
+        "search_category": normalize_text(row.get("category", "")),
+        "search_answer": normalize_text(row.get("answer", "")),
+        "search_stems": " ".join(dict.fromkeys(stems)),
+        "search_tf": " ".join(f"{term}:{count}" for term, count in term_frequencies(stems)),
+    }
@@ -0,0 +1,272 @@
+"""
+Índice vectorial local (sin red) para buscar FAQs por similitud.
+
+Las palabras clave no encuentran paráfrasis ("cuánto se demora" / "tiempo que tarda").
+Aquí cada fila de la KB se representa con n-gramas de caracteres (3 a 5) del texto
+normalizado, proyectados con hashing a un vector de DEFAULT_DIM dimensiones, ponderados
+con TF-IDF y normalizados (coseno = producto escalar).
+
+Archivos del índice (a partir de una ruta base, p. ej. ./kb_vectors):
+- kb_vectors.npy: matriz float32 (filas x dimensiones), se abre con mmap.
+- kb_vectors.idf.npy: vector IDF para vectorizar las consultas.
+- kb_vectors.ids.json: parámetros del vectorizador y datos mínimos de cada fila.
+
+Uso:
+    python kb_vectors.py build deseguridad_knowledge_base_servicios.csv deseguridad_knowledge_base_otros.csv -o kb_vectors
+    python kb_vectors.py query kb_vectors "tiempo que tarda la batería psicosocial" [-k 5]
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from kb_io import load_kb_files
+from kb_text import normalize_text
+
+VECTORS_FORMAT = "rag-kb-vectors"
+VECTORS_VERSION = 1
+
+DEFAULT_VECTORS_PATH = "./kb_vectors"
+
+# Dimensiones del hashing (potencia de 2). Con signo, las colisiones tienden a cancelarse.
+DEFAULT_DIM = 4096
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+
+# Peso de la pregunta y de la respuesta en el vector de cada fila
+QUESTION_WEIGHT = 0.7
+ANSWER_WEIGHT = 0.3
+
+# Consultas por bloque en search_many (acota la memoria de la matriz de scores)
+QUERY_BLOCK_SIZE = 512
+
+
+class HashedNgramVectorizer:
+    """
+    n-gramas de caracteres con hashing (crc32, estable entre ejecuciones) y signo.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngram_min: int = NGRAM_MIN, ngram_max: int = NGRAM_MAX):
+        if dim & (dim - 1):
+            raise ValueError("dim debe ser potencia de 2")
+        self.dim = dim
+        self.mask = dim - 1
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.idf = None
+
+    def features(self, text: str) -> tuple:
+        """
+        Devuelve (índices, signos) de los n-gramas del texto normalizado.
+        Cada palabra se rodea de espacios para que los bordes cuenten.
+        """
+        words = normalize_text(text).split()
+        data = (" " + " ".join(words) + " ").encode("utf-8") if words else b""
+        indices = []
+        signs = []
+        length = len(data)
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            for start in range(0, length - n + 1):
+                h = zlib.crc32(data[start:start + n])
+                indices.append(h & self.mask)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        return indices, signs
+
+    def raw_vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        indices, signs = self.features(text)
+        if indices:
+            np.add.at(vector, np.asarray(indices), np.asarray(signs, dtype=np.float32))
+        return vector
+
+    def fit_idf(self, raw_matrix: np.ndarray) -> None:
+        """
+        IDF suavizado por dimensión: log((1 + N) / (1 + df)) + 1.
+        """
+        total = raw_matrix.shape[0]
+        df = np.count_nonzero(raw_matrix, axis=0)
+        self.idf = (np.log((1 + total) / (1 + df)) + 1).astype(np.float32)
+
+    def transform(self, texts: list) -> np.ndarray:
+        """
+        Vectores TF-IDF normalizados (una fila por texto).
+        """
+        matrix = np.vstack([self.raw_vector(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+        if self.idf is not None:
+            matrix *= self.idf
+        return _normalize_rows(matrix)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def paths_for(base_path: str) -> tuple:
+    """
+    ./kb_vectors -> (./kb_vectors.npy, ./kb_vectors.idf.npy, ./kb_vectors.ids.json)
+    """
+    base = base_path[:-4] if base_path.endswith(".npy") else base_path
+    return base + ".npy", base + ".idf.npy", base + ".ids.json"
+
+
+class KBVectorIndex:
+    """
+    Matriz de vectores de la KB con búsqueda top-k por coseno.
+    """
+
+    def __init__(self, matrix: np.ndarray, vectorizer: HashedNgramVectorizer, meta: dict):
+        self.matrix = matrix
+        self.vectorizer = vectorizer
+        self.meta = meta
+        self.docs = meta["docs"]
+
+    @classmethod
+    def build(cls, rows: list, dim: int = DEFAULT_DIM, sources: list = None) -> "KBVectorIndex":
+        vectorizer = HashedNgramVectorizer(dim)
+
+        question_raw = np.vstack([vectorizer.raw_vector(row["question"]) for row in rows]) if rows else np.zeros((0, dim), np.float32)
+        answer_raw = np.vstack([vectorizer.raw_vector(row["answer"]) for row in rows]) if rows else np.zeros((0, dim), np.float32)
+
+        vectorizer.fit_idf(np.vstack([question_raw, answer_raw]))
+        matrix = _normalize_rows(
+            QUESTION_WEIGHT * _normalize_rows(question_raw * vectorizer.idf)
+            + ANSWER_WEIGHT * _normalize_rows(answer_raw * vectorizer.idf)
+        ).astype(np.float32)
+
+        meta = {
+            "format": VECTORS_FORMAT,
+            "version": VECTORS_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sources": sources or [],
+            "dim": dim,
+            "ngram_range": [vectorizer.ngram_min, vectorizer.ngram_max],
+            "weights": {"question": QUESTION_WEIGHT, "answer": ANSWER_WEIGHT},
+            "docs": [
+                {"question": row["question"], "category": row["category"], "source_url": row["source_url"]}
+                for row in rows
+            ],
+        }
+        return cls(matrix, vectorizer, meta)
+
+    def save(self, base_path: str) -> None:
+        matrix_path, idf_path, ids_path = paths_for(base_path)
+        np.save(matrix_path, self.matrix)
+        np.save(idf_path, self.vectorizer.idf)
+
+        tmp_path = ids_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, ids_path)
+
+    @classmethod
+    def load(cls, base_path: str, mmap: bool = True) -> "KBVectorIndex":
+        matrix_path, idf_path, ids_path = paths_for(base_path)
+        with open(ids_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("format") != VECTORS_FORMAT or meta.get("version") != VECTORS_VERSION:
+            raise ValueError("El archivo no es un índice vectorial compatible.")
+
+        ngram_min, ngram_max = meta["ngram_range"]
+        vectorizer = HashedNgramVectorizer(meta["dim"], ngram_min, ngram_max)
+        vectorizer.idf = np.load(idf_path)
+        matrix = np.load(matrix_path, mmap_mode="r" if mmap else None)
+        return cls(matrix, vectorizer, meta)
+
+    def search_many(self, queries: list, k: int = 5) -> list:
+        """
+        Top-k por coseno para varias consultas a la vez (producto de matrices por bloques).
+        Devuelve una lista por consulta con [(doc_id, score)].
+        """
+        results = []
+        total = self.matrix.shape[0]
+        if total == 0:
+            return [[] for _ in queries]
+        k = min(k, total)
+
+        for block_start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            block = self.vectorizer.transform(queries[block_start:block_start + QUERY_BLOCK_SIZE])
+            scores = block @ self.matrix.T
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < total else np.tile(np.arange(total), (len(block), 1))
+            for row, candidates in enumerate(top):
+                candidate_scores = scores[row, candidates]
+                order = np.argsort(-candidate_scores, kind="stable")
+                results.append([(int(candidates[i]), float(candidate_scores[i])) for i in order])
+
+        return results
+
+    def search(self, query: str, k: int = 5) -> list:
+        return self.search_many([query], k)[0]
+
+    def doc(self, doc_id: int) -> dict:
+        return dict(self.docs[doc_id], id=doc_id)
+
+    def summary(self) -> str:
+        rows, dim = self.matrix.shape
+        return f"{rows} filas x {dim} dimensiones ({self.matrix.nbytes / 1024:.0f} KB)"
+
+
+# ==========================
+# CLI
+# ==========================
+
+def cmd_build(args) -> None:
+    start = time.perf_counter()
+    rows = load_kb_files(args.inputs)
+    index = KBVectorIndex.build(rows, dim=args.dim, sources=[os.path.basename(path) for path in args.inputs])
+    index.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Índice vectorial creado: {index.summary()}")
+    print(f"📄 {', '.join(paths_for(args.output))} en {elapsed * 1000:.0f} ms")
+
+
+def cmd_query(args) -> None:
+    start = time.perf_counter()
+    index = KBVectorIndex.load(args.index)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = index.search(args.query, k=args.k)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Carga: {load_ms:.1f} ms | consulta: {query_ms:.2f} ms\n")
+    for rank, (doc_id, score) in enumerate(results, 1):
+        doc = index.doc(doc_id)
+        print(f"{rank}. [{score:.3f}] {doc['question']}")
+        print(f"   {doc['category']} | {doc['source_url']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Índice vectorial (n-gramas de caracteres + TF-IDF) de la base de conocimientos.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Construir el índice desde CSV/JSON")
+    build.add_argument("inputs", nargs="+", help="Archivos de la KB (.csv o .json)")
+    build.add_argument("-o", "--output", default=DEFAULT_VECTORS_PATH, help=f"Ruta base del índice (por defecto {DEFAULT_VECTORS_PATH})")
+    build.add_argument("--dim", type=int, default=DEFAULT_DIM, help=f"Dimensiones del hashing, potencia de 2 (por defecto {DEFAULT_DIM})")
+    build.set_defaults(func=cmd_build)
+
+    query = subparsers.add_parser("query", help="Consultar un índice")
+    query.add_argument("index", help="Ruta base del índice")
+    query.add_argument("query", help="Consulta del usuario")
+    query.add_argument("-k", type=int, default=5, help="Número de resultados (por defecto 5)")
+    query.set_defaults(func=cmd_query)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Caché persistente de respuestas del LLM (un único archivo SQLite).
+
+- La clave es un hash del modelo, el endpoint y el prompt completo (direccionamiento por contenido):
+  si el prompt no cambia, la respuesta se reutiliza sin llamar a la red.
+- Expulsión por antigüedad (max_age_days) y por tamaño (max_entries), de las menos usadas primero.
+- Modo `refresh`: ignora lo guardado al leer, pero sigue escribiendo las respuestas nuevas.
+- Segura para usar desde varios hilos (generación concurrente).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Valores por defecto
+DEFAULT_CACHE_PATH = "./.llm_cache.sqlite"
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def make_cache_key(model: str, endpoint: str, prompt: str) -> str:
+    """
+    Hash SHA-256 de (modelo, endpoint, prompt).
+    """
+    payload = json.dumps([model, endpoint, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Caché de respuestas del LLM respaldada por SQLite.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, refresh: bool = False):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+        self.evict()
+
+    def get(self, model: str, endpoint: str, prompt: str):
+        """
+        Devuelve la respuesta guardada o None (también None en modo refresh).
+        """
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        key = make_cache_key(model, endpoint, prompt)
+        now = time.time()
+        min_created = now - self.max_age_days * 86400
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, min_created),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, model: str, endpoint: str, prompt: str, response: str) -> None:
+        """
+        Guarda una respuesta. Las respuestas vacías no se guardan.
+        """
+        if not response:
+            return
+
+        key = make_cache_key(model, endpoint, prompt)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO llm_cache (key, model, endpoint, response, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (key, model, endpoint, response, now, now),
+            )
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """
+        Elimina entradas caducadas y, si se supera max_entries, las de acceso más antiguo.
+        Devuelve el número de entradas eliminadas.
+        """
+        min_created = time.time() - self.max_age_days * 86400
+
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (min_created,)).rowcount
+
+            total = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            overflow = total - self.max_entries
+            if overflow > 0:
+                removed += self._conn.execute(
+                    """DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?
+                    )""",
+                    (overflow,),
+                ).rowcount
+
+            self._conn.commit()
+
+        return removed
+
+    def summary(self) -> str:
+        return f"caché LLM: {self.hits} aciertos, {self.misses} fallos ({self.path})"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,550 @@
+"""
+Cliente del LLM (API compatible con OpenAI) para process_site.py y process_docs.py.
+
+- Limitador token bucket adaptativo (AIMD): sube el ritmo poco a poco mientras todo va bien
+  y lo reduce a la mitad ante un 429, respetando Retry-After.
+- Reintentos con backoff exponencial y jitter para 429, 5xx, timeouts y errores de red.
+- Circuit breaker: tras varios fallos seguidos se "abre" y todas las llamadas esperan a que
+  pase el enfriamiento (la generación se pausa en lugar de llenar el CSV de respuestas
+  de relleno). Luego deja pasar una llamada de prueba.
+- Los errores se lanzan como LLMError: quien llama decide qué hacer con el elemento fallido.
+- Sesión HTTP con pool de conexiones keep-alive, compartida por todos los hilos.
+- Telemetría (LLMTelemetry): latencia, código HTTP, tokens de `usage` y coste estimado de cada
+  llamada, más el tiempo esperando al limitador, al circuit breaker y en backoff. Se resume al
+  final de la ejecución y se guarda en JSON (`<salida>.llm_metrics.json`).
+
+La configuración (endpoint, key, modelo, precios) viene de kb_config.load_llm_config().
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Valores por defecto
+DEFAULT_TIMEOUT = 30
+DEFAULT_RATE = 2.0              # peticiones por segundo al empezar
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_BURST = 4
+DEFAULT_RATE_INCREASE = 0.1     # aumento aditivo por cada respuesta correcta
+DEFAULT_RATE_DECREASE = 0.5     # factor multiplicativo ante un 429
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5   # fallos seguidos que abren el circuito
+DEFAULT_COOLDOWN = 30.0         # segundos con el circuito abierto (se duplica si sigue fallando)
+DEFAULT_MAX_COOLDOWN = 300.0
+DEFAULT_MAX_OUTAGE = 900.0      # tras este tiempo caído, las llamadas fallan sin esperar
+DEFAULT_POOL_SIZE = 16
+
+RETRYABLE_STATUS = frozenset([408, 409, 425, 429, 500, 502, 503, 504])
+
+
+class LLMError(Exception):
+    """
+    Error al obtener una respuesta del LLM.
+    """
+
+    def __init__(self, message: str, status: int = 0, retryable: bool = True):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class CircuitOpenError(LLMError):
+    """
+    El proveedor lleva caído más de max_outage segundos.
+    """
+
+
+def parse_retry_after(value: str):
+    """
+    Retry-After en segundos (acepta número o fecha HTTP). None si no se puede interpretar.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket con ritmo adaptativo (aumento aditivo, disminución multiplicativa).
+    `clock` y `sleep` se pueden sustituir en las pruebas.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, min_rate: float = DEFAULT_MIN_RATE,
+                 max_rate: float = DEFAULT_MAX_RATE, increase: float = DEFAULT_RATE_INCREASE,
+                 decrease: float = DEFAULT_RATE_DECREASE, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._clock = clock
+        self._sleep = sleep
+
+        self._tokens = float(burst)
+        self._last = clock()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        """
+        Bloquea hasta poder hacer una petición.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: float = None) -> None:
+        """
+        429 del proveedor: se reduce el ritmo y, si hay Retry-After, se pausan todas las peticiones.
+        Varias respuestas 429 de peticiones que ya estaban en vuelo cuentan como una sola.
+        """
+        with self._lock:
+            now = self._clock()
+            if now - self._last_decrease > 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold fallos seguidos) -> open -> (cooldown) -> half-open -> closed/open.
+    `clock` se puede sustituir en las pruebas.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 max_cooldown: float = DEFAULT_MAX_COOLDOWN, max_outage: float = DEFAULT_MAX_OUTAGE,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_outage = max_outage
+        self._clock = clock
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._outage_start = None
+        self._probe_in_flight = False
+        self._cond = threading.Condition()
+
+    def before_call(self) -> None:
+        """
+        Espera mientras el circuito esté abierto. Lanza CircuitOpenError si la caída
+        dura más de max_outage.
+        """
+        with self._cond:
+            while True:
+                if self.state == "closed":
+                    return
+
+                now = self._clock()
+                if self._outage_start is not None and now - self._outage_start > self.max_outage:
+                    raise CircuitOpenError(
+                        f"El LLM lleva más de {int(self.max_outage)} s sin responder (circuito abierto)"
+                    )
+
+                if self.state == "open" and now >= self._open_until:
+                    self.state = "half-open"
+
+                if self.state == "half-open" and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return
+
+                wait = max(0.05, self._open_until - now) if self.state == "open" else 1.0
+                self._cond.wait(wait)
+
+    def record_success(self) -> None:
+        with self._cond:
+            if self.state != "closed":
+                print("  ✅ LLM disponible de nuevo: se reanuda la generación.")
+            self.state = "closed"
+            self.failures = 0
+            self._cooldown = self.base_cooldown
+            self._outage_start = None
+            self._probe_in_flight = False
+            self._cond.notify_all()
+
+    def record_neutral(self) -> None:
+        """
+        Respuesta que no dice nada de la salud del endpoint (429, petición inválida): no reinicia
+        ni suma fallos seguidos; solo libera la sonda si el circuito estaba medio abierto.
+        """
+        with self._cond:
+            self._probe_in_flight = False
+            self._cond.notify_all()
+
+    def record_failure(self) -> None:
+        with self._cond:
+            self.failures += 1
+            if self.state == "half-open":
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._open(self._clock())
+            elif self.state == "closed" and self.failures >= self.failure_threshold:
+                self._open(self._clock())
+            self._probe_in_flight = False
+            self._cond.notify_all()
+
+    def _open(self, now: float) -> None:
+        self.state = "open"
+        self.opened += 1
+        self._open_until = now + self._cooldown
+        if self._outage_start is None:
+            self._outage_start = now
+        print(f"  ⏸️  Circuito abierto tras {self.failures} fallos seguidos: generación en pausa {int(self._cooldown)} s.")
+
+
+def metrics_path_for(output_csv: str) -> str:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.llm_metrics.json
+    """
+    return os.path.splitext(output_csv)[0] + ".llm_metrics.json"
+
+
+def _percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LLMTelemetry:
+    """
+    Registro de cada petición HTTP al LLM (incluidos los reintentos), seguro entre hilos.
+    """
+
+    def __init__(self, model: str, price_input: float = None, price_output: float = None):
+        self.model = model
+        self.price_input = price_input
+        self.price_output = price_output
+        self.calls = []
+        self.cache_hits = 0
+        # Segundos acumulados (sumados entre hilos) fuera de la petición HTTP
+        self.waits = {"rate_limiter": 0.0, "circuit_breaker": 0.0, "backoff": 0.0}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def cost(self, prompt_tokens: int, completion_tokens: int):
+        """
+        Coste estimado en USD, o None si no hay precios para el modelo.
+        """
+        if self.price_input is None or self.price_output is None:
+            return None
+        return (prompt_tokens * self.price_input + completion_tokens * self.price_output) / 1_000_000
+
+    def record_call(self, latency: float, status: int, attempt: int, usage: dict = None, error: str = None) -> None:
+        usage = usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        call = {
+            "ts": round(time.time(), 3),
+            "latency_ms": round(latency * 1000, 1),
+            "status": status,
+            "attempt": attempt,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": self.cost(prompt_tokens, completion_tokens),
+            "error": error,
+        }
+        with self._lock:
+            self.calls.append(call)
+
+    def record_wait(self, kind: str, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.waits[kind] += seconds
+
+    def record_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+            waits = dict(self.waits)
+            cache_hits = self.cache_hits
+
+        latencies = sorted(call["latency_ms"] for call in calls)
+        by_status = {}
+        for call in calls:
+            by_status[str(call["status"])] = by_status.get(str(call["status"]), 0) + 1
+        prompt_tokens = sum(call["prompt_tokens"] for call in calls)
+        completion_tokens = sum(call["completion_tokens"] for call in calls)
+        ok_calls = [call for call in calls if call["error"] is None]
+        priced = self.price_input is not None and self.price_output is not None
+
+        return {
+            "model": self.model,
+            "wall_s": round(time.time() - self.started, 2),
+            "calls": len(calls),
+            "ok": len(ok_calls),
+            "cache_hits": cache_hits,
+            "by_status": by_status,
+            "latency_ms": {
+                "total": round(sum(latencies), 1),
+                "mean": round(sum(latencies) / len(latencies), 1) if latencies else None,
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None,
+                # Tiempo de peticiones que no produjeron respuesta (errores, 429)
+                "failed": round(sum(call["latency_ms"] for call in calls if call["error"] is not None), 1),
+            },
+            "wait_s": {kind: round(seconds, 2) for kind, seconds in waits.items()},
+            "tokens": {
+                "prompt": prompt_tokens,
+                "completion": completion_tokens,
+                "prompt_per_call": round(prompt_tokens / len(ok_calls), 1) if ok_calls else None,
+                "completion_per_call": round(completion_tokens / len(ok_calls), 1) if ok_calls else None,
+            },
+            "cost_usd": round(sum(call["cost_usd"] for call in calls), 6) if priced else None,
+            "price_per_1m": {"input": self.price_input, "output": self.price_output},
+        }
+
+    def report_lines(self) -> list:
+        """
+        Resumen legible para el final de la ejecución.
+        """
+        data = self.summary()
+        latency = data["latency_ms"]
+        tokens = data["tokens"]
+        waits = data["wait_s"]
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(data["by_status"].items())) or "-"
+
+        lines = [
+            f"Peticiones HTTP: {data['calls']} ({statuses}) | respuestas de la caché: {data['cache_hits']}",
+        ]
+        if data["calls"]:
+            lines.append(
+                f"Latencia: p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, máx {latency['max']:.0f} ms | "
+                f"tiempo en peticiones {latency['total'] / 1000:.1f} s (fallidas {latency['failed'] / 1000:.1f} s)"
+            )
+        lines.append(
+            f"Esperas: limitador {waits['rate_limiter']:.1f} s, circuito abierto {waits['circuit_breaker']:.1f} s, "
+            f"backoff {waits['backoff']:.1f} s"
+        )
+        cost = f"{data['cost_usd']:.4f} USD" if data["cost_usd"] is not None else "sin precio para el modelo"
+        lines.append(f"Tokens: {tokens['prompt']} de prompt + {tokens['completion']} de respuesta | coste estimado: {cost}")
+        return lines
+
+    def save(self, path: str, extra: dict = None) -> None:
+        """
+        Escribe el resumen y todas las llamadas en JSON (escritura atómica).
+        """
+        with self._lock:
+            calls = list(self.calls)
+        data = {"summary": self.summary(), "run": extra or {}, "calls": calls}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class LLMClient:
+    """
+    Cliente con sesión HTTP compartida, limitador adaptativo, reintentos, circuit breaker y telemetría.
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str, timeout: float = DEFAULT_TIMEOUT,
+                 rate: float = DEFAULT_RATE, max_rate: float = DEFAULT_MAX_RATE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN, max_outage: float = DEFAULT_MAX_OUTAGE,
+                 pool_size: int = DEFAULT_POOL_SIZE, price_input: float = None, price_output: float = None):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+        self.limiter = AdaptiveRateLimiter(rate=min(rate, max_rate), max_rate=max_rate)
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, cooldown=cooldown, max_outage=max_outage)
+        self.telemetry = LLMTelemetry(model, price_input, price_output)
+
+        self.stats = {"requests": 0, "ok": 0, "retries": 0, "throttled": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs) -> "LLMClient":
+        """
+        Cliente a partir de kb_config.load_llm_config(); `kwargs` ajusta ritmo y reintentos.
+        """
+        return cls(
+            config["api_url"],
+            config["api_key"],
+            config["model"],
+            timeout=config["timeout"],
+            pool_size=config["pool_size"],
+            price_input=config["price_input"],
+            price_output=config["price_output"],
+            **kwargs,
+        )
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Backoff exponencial con "full jitter"; nunca menos que Retry-After.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def _post(self, prompt: str, attempt: int = 0) -> str:
+        """
+        Una petición. Devuelve el texto o lanza LLMError; en ambos casos queda en la telemetría.
+        """
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+
+        self._count("requests")
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.telemetry.record_call(time.perf_counter() - start, 0, attempt, error=type(e).__name__)
+            raise LLMError(f"Error de red: {e}")
+        latency = time.perf_counter() - start
+
+        if resp.status_code == 429:
+            self.telemetry.record_call(latency, 429, attempt, error="throttled")
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            self._count("throttled")
+            self.limiter.on_throttle(retry_after)
+            error = LLMError("429 Too Many Requests", status=429)
+            error.retry_after = retry_after
+            raise error
+
+        if resp.status_code >= 400:
+            self.telemetry.record_call(latency, resp.status_code, attempt, error=f"HTTP {resp.status_code}")
+            raise LLMError(
+                f"HTTP {resp.status_code}: {resp.text[:200]}",
+                status=resp.status_code,
+                retryable=resp.status_code in RETRYABLE_STATUS,
+            )
+
+        try:
+            data = resp.json()
+            content = data["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            self.telemetry.record_call(latency, resp.status_code, attempt, error="bad_response")
+            raise LLMError("Respuesta sin 'choices[0].message.content'", status=resp.status_code)
+
+        usage = data.get("usage") if isinstance(data.get("usage"), dict) else None
+        if not content:
+            self.telemetry.record_call(latency, resp.status_code, attempt, usage, error="empty")
+            raise LLMError("Respuesta vacía", status=resp.status_code)
+
+        self.telemetry.record_call(latency, resp.status_code, attempt, usage)
+        return content
+
+    def complete(self, prompt: str) -> str:
+        """
+        Devuelve la respuesta del LLM. Lanza LLMError si no se consigue tras los reintentos.
+        """
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            self.breaker.before_call()
+            self.telemetry.record_wait("circuit_breaker", time.perf_counter() - waited)
+            waited = time.perf_counter()
+            self.limiter.acquire()
+            self.telemetry.record_wait("rate_limiter", time.perf_counter() - waited)
+
+            try:
+                content = self._post(prompt, attempt)
+            except LLMError as e:
+                last_error = e
+                if e.status == 429 or not e.retryable:
+                    # Limitación de ritmo o petición inválida: no es una caída, pero tampoco
+                    # demuestra que el endpoint funcione (los 429 no reinician los fallos seguidos)
+                    self.breaker.record_neutral()
+                else:
+                    self.breaker.record_failure()
+
+                if not e.retryable or attempt == self.max_retries:
+                    break
+
+                self._count("retries")
+                delay = self._backoff(attempt, getattr(e, "retry_after", None))
+                self.telemetry.record_wait("backoff", delay)
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.limiter.on_success()
+            self._count("ok")
+            return content
+
+        self._count("errors")
+        raise last_error
+
+    def summary(self) -> str:
+        return (
+            f"LLM: {self.stats['ok']} respuestas, {self.stats['retries']} reintentos, "
+            f"{self.stats['throttled']} limitadas (429), {self.stats['errors']} fallidas, "
+            f"circuito abierto {self.breaker.opened} veces, ritmo final {self.limiter.rate:.1f} req/s"
+        )
+
+    def close(self) -> None:
+        self.session.close()
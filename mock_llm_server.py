@@ -0,0 +1,255 @@
+"""
+Servidor LLM simulado (API de chat completions compatible con OpenAI) para pruebas y benchmarks
+sin red ni coste.
+
+- Responde en el formato que espera llm_client.LLMClient: choices[0].message.content + usage.
+- Latencia configurable: fija, uniforme o lognormal (cola larga, como un proveedor real).
+- Inyección de errores 5xx y de 429 (aleatorios o por superar --max-rps), con Retry-After.
+- Los prompts del modo por lotes (process_*.py --batch) reciben el JSON {"respuestas": [...]}
+  con una respuesta por pregunta numerada.
+- usage se estima con ~4 caracteres por token.
+
+Uso:
+    python mock_llm_server.py [--port 8765] [--latency lognormal:800,0.5] [--error-rate 0.02] \
+        [--throttle-rate 0.01] [--max-rps 20]
+
+    RAGKB_LLM_API_URL=http://127.0.0.1:8765/v1/chat/completions RAGKB_LLM_API_KEY=mock \
+        python process_docs.py --no-cache
+
+Desde Python (bench_pipeline.py):
+    server = MockLLMServer(latency="fixed:50").start()
+    ... server.url ...
+    server.stop()
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = "lognormal:800,0.5"
+CHARS_PER_TOKEN = 4
+ANSWER_WORDS = 60
+
+_FILLER = (
+    "Según el contenido disponible, el servicio se presta con personal especializado y se adapta "
+    "a las necesidades de cada empresa. Para conocer alcance, tiempos y valores exactos puede "
+    "solicitar una cotización en la página del servicio."
+).split()
+
+
+def parse_latency(spec: str):
+    """
+    "fixed:MS" | "uniform:MIN,MAX" | "lognormal:MEDIANA_MS,SIGMA" -> función que devuelve segundos.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value.strip()] if params else []
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Latencia no válida: {spec!r} (usa fixed:MS, uniform:MIN,MAX o lognormal:MEDIANA,SIGMA)")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def fake_answer(question: str, rng: random.Random) -> str:
+    words = rng.sample(_FILLER, min(len(_FILLER), ANSWER_WORDS))
+    return f"Respuesta simulada a «{question.strip()}»: " + " ".join(words)
+
+
+def build_answer(prompt: str, rng: random.Random) -> str:
+    """
+    Contenido de la respuesta: JSON por lotes si el prompt trae preguntas numeradas,
+    texto plano si trae una sola pregunta.
+    """
+    batch = re.search(r"Preguntas:\s*\n(.*?)\n\s*Respuesta JSON:", prompt, re.DOTALL)
+    if batch:
+        questions = re.findall(r"^\s*(\d+)\.\s*(.+)$", batch.group(1), re.MULTILINE)
+        return json.dumps(
+            {"respuestas": [{"id": int(number), "respuesta": fake_answer(q, rng)} for number, q in questions]},
+            ensure_ascii=False,
+        )
+
+    single = re.search(r"Pregunta:\s*\n(.*?)\n\s*Respuesta:", prompt, re.DOTALL)
+    return fake_answer(single.group(1) if single else prompt[-80:], rng)
+
+
+class MockLLMServer:
+    """
+    Servidor en un hilo de fondo. Las estadísticas se acumulan en `stats`.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = 0, latency: str = DEFAULT_LATENCY,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, max_rps: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 1):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._rng = random.Random(seed)
+        self._recent = []
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _decide(self) -> tuple:
+        """
+        (resultado, latencia) para la siguiente petición: "ok", "error" o "throttled".
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.max_rps:
+                self._recent = [t for t in self._recent if now - t < 1.0]
+                if len(self._recent) >= self.max_rps:
+                    self.stats["throttled"] += 1
+                    return "throttled", 0.0
+                self._recent.append(now)
+
+            roll = self._rng.random()
+            delay = self.latency(self._rng)
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return "throttled", 0.0
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return "error", delay
+            return "ok", delay
+
+    def _record_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeceras y cuerpo van en escrituras separadas: sin esto, Nagle + ACK diferido
+            # añaden ~40 ms a cada respuesta
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, data: dict, headers: dict = None) -> None:
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    prompt = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+                except (ValueError, AttributeError):
+                    self._send_json(400, {"error": {"message": "JSON no válido"}})
+                    return
+
+                outcome, delay = server._decide()
+                if outcome == "throttled":
+                    self._send_json(429, {"error": {"message": "Rate limit"}}, {"Retry-After": str(server.retry_after)})
+                    return
+
+                time.sleep(delay)
+                if outcome == "error":
+                    self._send_json(503, {"error": {"message": "Servicio no disponible (simulado)"}})
+                    return
+
+                with server._lock:
+                    content = build_answer(prompt, server._rng)
+                prompt_tokens = estimate_tokens(prompt)
+                completion_tokens = estimate_tokens(content)
+                server._record_usage(prompt_tokens, completion_tokens)
+                self._send_json(200, {
+                    "id": f"mock-{server.stats['requests']}",
+                    "object": "chat.completion",
+                    "model": payload.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+        return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor LLM simulado compatible con OpenAI (chat completions).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help=f"fixed:MS, uniform:MIN,MAX o lognormal:MEDIANA,SIGMA (por defecto {DEFAULT_LATENCY})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de responder 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probabilidad de responder 429")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Peticiones por segundo antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Segundos de Retry-After en los 429")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = MockLLMServer(
+        args.host, args.port, args.latency, args.error_rate, args.throttle_rate,
+        args.max_rps, args.retry_after, args.seed,
+    ).start()
+    print(f"🤖 LLM simulado en {server.url} (latencia {args.latency}, errores {args.error_rate}, 429 {args.throttle_rate})")
+    print("   Ctrl-C para detener.")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"   {server.stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Extractor de PDF (pdfplumber) para extractors.py.
+
+Se importa la primera vez que aparece un .pdf, así que el aviso de que falta pdfplumber
+solo sale cuando hay PDFs que procesar.
+"""
+
+import os
+
+from extractors import join_within_budget
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+    print("ADVERTENCIA: pdfplumber no está instalado. No se procesarán PDFs.")
+
+
+def iter_pdf_text(file_path: str, start: int = 0, end: int = None):
+    """
+    Genera el texto (ya limpio) de cada página del PDF, una a una.
+    Al cerrar el generador se cierra también el PDF.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[start:end]:
+            txt = (page.extract_text() or "").strip()
+            # Liberar la caché de objetos de la página ya procesada
+            page.close()
+            if txt:
+                yield txt
+
+
+def extract_pdf_content(file_path: str, max_chars: int = None) -> tuple:
+    """
+    Extrae texto de un PDF página a página hasta reunir `max_chars` caracteres
+    (None = PDF completo).
+    Título = nombre de archivo sin extensión.
+    """
+    if pdfplumber is None:
+        return "", ""
+
+    title = os.path.splitext(os.path.basename(file_path))[0]
+
+    pages = None
+    try:
+        pages = iter_pdf_text(file_path)
+        full_text = join_within_budget(pages, max_chars)
+    except Exception as e:
+        print(f"Error al procesar PDF {file_path}: {e}")
+        return title, ""
+    finally:
+        if pages is not None:
+            pages.close()
+
+    return title, full_text
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """
+    Devuelve el número de páginas de un PDF (0 si no se puede abrir).
+    """
+    if pdfplumber is None:
+        return 0
+
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"Error al procesar PDF {file_path}: {e}")
+        return 0
+
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> str:
+    """
+    Extrae el texto de las páginas [start, end) de un PDF.
+    Se usa para repartir PDFs grandes entre varios procesos.
+    """
+    if pdfplumber is None:
+        return ""
+
+    try:
+        return " ".join(iter_pdf_text(file_path, start, end))
+    except Exception as e:
+        print(f"Error al procesar PDF {file_path} (páginas {start + 1}-{end}): {e}")
+        return ""
+
+
+def extract(file_path: str, options: dict) -> tuple:
+    return extract_pdf_content(file_path, options.get("max_chars"))
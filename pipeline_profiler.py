@@ -0,0 +1,230 @@
+"""
+Instrumentación por etapas de process_site.py y process_docs.py.
+
+- PipelineProfiler: tiempo de pared y de CPU por etapa (descarga, extracción, LLM, escritura...)
+  y por documento, pico de memoria (tracemalloc, opcional) y RSS máximo del proceso.
+  El informe final nombra los documentos más lentos y se guarda en `<salida>.profile.json`.
+- Modo --profile: cProfile del hilo principal (`.prof`, para snakeviz / pstats) y un muestreador
+  de pilas de todos los hilos en formato "folded" (`.folded`, para flamegraph.pl o speedscope).
+
+Los tiempos de etapas que corren en varios hilos (llamadas al LLM) o procesos (extracción en
+pool) se suman: pueden superar el tiempo total de la ejecución.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_INTERVAL = 0.005     # segundos entre muestras de pilas
+SLOWEST_DOCUMENTS = 10
+
+
+def profile_paths_for(output_csv: str) -> dict:
+    """
+    ./deseguridad_knowledge_base.csv -> ./deseguridad_knowledge_base.profile.{json,prof,folded}
+    """
+    base = os.path.splitext(output_csv)[0] + ".profile"
+    return {"report": base + ".json", "cprofile": base + ".prof", "folded": base + ".folded"}
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StackSampler:
+    """
+    Muestrea las pilas de todos los hilos cada `interval` segundos (formato folded de Brendan Gregg).
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Los hilos de un mismo pool se agrupan (fetch_0, fetch_1... -> fetch)
+                thread_name = names.get(thread_id, "thread").rsplit("_", 1)[0]
+                key = ";".join([thread_name] + stack[::-1])
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class PipelineProfiler:
+    """
+    Acumula tiempos por etapa y por documento. Seguro entre hilos.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.documents = {}
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.trace_memory = False
+        self.profile = False
+        self._cprofile = None
+        self._sampler = None
+        self._lock = threading.Lock()
+
+    def start(self, trace_memory: bool = False, profile: bool = False) -> None:
+        """
+        Reinicia el reloj y activa tracemalloc y/o cProfile + muestreo de pilas.
+        """
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.trace_memory = trace_memory or profile
+        self.profile = profile
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if profile:
+            self._sampler = StackSampler()
+            self._sampler.start()
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def add(self, stage: str, wall: float, cpu: float = 0.0, doc: str = None) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(stage, {"calls": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0})
+            totals["calls"] += 1
+            totals["wall"] += wall
+            totals["cpu"] += cpu
+            totals["max"] = max(totals["max"], wall)
+            if doc is not None:
+                timings = self.documents.setdefault(doc, {})
+                timings[stage] = timings.get(stage, 0.0) + wall
+
+    @contextmanager
+    def stage(self, name: str, doc: str = None):
+        """
+        with profiler.stage("llm", doc=url): ...
+
+        La CPU se mide con time.thread_time (solo el hilo actual).
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start, doc)
+
+    def stop(self) -> dict:
+        """
+        Detiene cProfile / el muestreo y devuelve el informe.
+        """
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        return self.report()
+
+    def report(self, slowest: int = SLOWEST_DOCUMENTS) -> dict:
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            stages = {
+                name: {
+                    "calls": totals["calls"],
+                    "wall_s": round(totals["wall"], 3),
+                    "cpu_s": round(totals["cpu"], 3),
+                    "max_s": round(totals["max"], 3),
+                    "share": round(totals["wall"] / wall, 3) if wall else None,
+                }
+                for name, totals in sorted(self.stages.items(), key=lambda item: -item[1]["wall"])
+            }
+            documents = sorted(
+                ({"doc": doc, "total_s": round(sum(t.values()), 3), "stages": {k: round(v, 3) for k, v in t.items()}}
+                 for doc, t in self.documents.items()),
+                key=lambda item: -item["total_s"],
+            )
+
+        memory = {"max_rss_mb": _max_rss_mb()}
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            memory["tracemalloc_current_mb"] = round(current / 1024 / 1024, 1)
+            memory["tracemalloc_peak_mb"] = round(peak / 1024 / 1024, 1)
+
+        return {
+            "wall_s": round(wall, 3),
+            "cpu_s": round(time.process_time() - self.cpu_started, 3),
+            "stages": stages,
+            "documents": len(documents),
+            "slowest_documents": documents[:slowest],
+            "memory": memory,
+        }
+
+    def report_lines(self, report: dict, top: int = 5) -> list:
+        """
+        Resumen legible: etapas ordenadas por tiempo y documentos más lentos.
+        """
+        lines = [f"Tiempo total: {report['wall_s']:.1f} s (CPU del proceso {report['cpu_s']:.1f} s)"]
+        for name, data in report["stages"].items():
+            lines.append(
+                f"  {name:<16} {data['wall_s']:>8.2f} s pared  {data['cpu_s']:>8.2f} s CPU  "
+                f"{data['calls']:>6} llamadas  máx {data['max_s']:.2f} s"
+            )
+        if report["slowest_documents"]:
+            lines.append("Documentos más lentos:")
+            for item in report["slowest_documents"][:top]:
+                detail = ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in item["stages"].items())
+                lines.append(f"  {item['total_s']:>7.2f} s  {item['doc']}  ({detail})")
+        memory = report["memory"]
+        parts = []
+        if memory.get("tracemalloc_peak_mb") is not None:
+            parts.append(f"pico tracemalloc {memory['tracemalloc_peak_mb']} MB")
+        if memory.get("max_rss_mb") is not None:
+            parts.append(f"RSS máximo {memory['max_rss_mb']} MB")
+        if parts:
+            lines.append("Memoria: " + ", ".join(parts))
+        return lines
+
+    def save(self, paths: dict, report: dict, extra: dict = None) -> list:
+        """
+        Escribe el informe JSON y, en modo --profile, el .prof y el .folded. Devuelve las rutas escritas.
+        """
+        written = []
+        with open(paths["report"], "w", encoding="utf-8") as f:
+            json.dump(dict(report, run=extra or {}), f, ensure_ascii=False, indent=2)
+        written.append(paths["report"])
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(paths["cprofile"])
+            written.append(paths["cprofile"])
+        if self._sampler is not None:
+            self._sampler.save(paths["folded"])
+            written.append(paths["folded"])
+        return written
@@ -4,38 +4,63 @@ Usa un LLM para generar respuestas específicas a cada pregunta.
 Salida: CSV compatible con el plugin RAG Chatbot para WordPress.
 
 Uso:
-    python process_site.py
+    python process_docs.py [--root-dir CARPETA] [--output CSV]
+    python ragkb.py generate docs ...
 
 Requisitos:
     pip install beautifulsoup4 pdfplumber python-docx requests
+    pip install lxml   # opcional: extracción HTML más rápida
+
+Los extractores (extractors.py) y el cliente del LLM se importan cuando hacen falta:
+una carpeta solo con HTML no carga pdfplumber ni python-docx.
 """
 
 import os
-import csv
 import json
-import requests
-from bs4 import BeautifulSoup
-
-# Para PDFs y DOCX
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
-    print("ADVERTENCIA: pdfplumber no está instalado. No se procesarán PDFs.")
-
-try:
-    import docx
-except ImportError:
-    docx = None
-    print("ADVERTENCIA: python-docx no está instalado. No se procesarán DOCX.")
-
+import time
+import argparse
+
+from boilerplate import BoilerplateDetector, boilerplate_path_for
+from extractors import get_extractor, register_extractor, source_label, supported_extensions, EXTRACTORS
+from html_extract import DEFAULT_BACKEND as HTML_BACKEND, available_backends
+from llm_cache import LLMCache
+from kb_config import load_llm_config, load_section_config
+from pipeline_profiler import PipelineProfiler, profile_paths_for
+from kb_journal import (
+    FailedItemsLog,
+    KBStreamWriter,
+    ResumeJournal,
+    entry_fingerprint,
+    failed_path_for,
+    journal_path_for,
+)
+from prompt_context import build_batch_context, build_context
+from kb_manifest import (
+    is_unchanged,
+    load_manifest,
+    load_previous_rows,
+    make_entry,
+    manifest_path_for,
+    save_manifest,
+)
+from kb_generation import (
+    BATCH_FORMAT_INSTRUCTIONS,
+    batch_is_complete,
+    format_numbered_questions,
+    generate_answers_batched,
+    generate_answers_concurrently,
+)
 
 # ==========================
 # CONFIGURACIÓN
 # ==========================
 
+# Valores por defecto de la carpeta, la salida y la URL base. Se cambian sin tocar el código con
+# la sección "docs" de kb_config.json, las variables RAGKB_DOCS_ROOT_DIR / RAGKB_DOCS_OUTPUT_CSV /
+# RAGKB_DOCS_BASE_URL o --root-dir / --output / --base-url (ver configure()).
+
 # Carpeta raíz donde están los archivos del sitio (HTML, PDF, DOCX)
-ROOT_DIR = "./deseguridad_site"  # Ajusta esta ruta a tu carpeta local
+ROOT_DIR = "./deseguridad_site"
 
 # Archivo de salida (CSV)
 OUTPUT_CSV = "./deseguridad_knowledge_base.csv"
@@ -47,17 +72,99 @@ BASE_URL = "https://deseguridad.net"
 # CONFIGURACIÓN LLM (RouteLLM / Abacus.AI)
 # ==========================
 
-# Endpoint de tu API LLM (ej. RouteLLM)
-LLM_API_URL = "https://routellm.abacus.ai/v1/chat/completions"
+# Endpoint, API key, modelo, timeout y precios se leen de kb_config.json o de las
+# variables de entorno RAGKB_LLM_* (ver kb_config.py). La key nunca va en el código.
+# --config RUTA usa otro archivo.
+LLM_CONFIG_PATH = None
+
+# Caracteres del contenido que se envían en cada prompt (modo "prefix")
+PROMPT_CHAR_BUDGET = 3000
+
+# Contenido del prompt:
+# - "prefix": los primeros PROMPT_CHAR_BUDGET caracteres del documento
+# - "chunks": los pasajes más relevantes para cada pregunta (prompt_context.py)
+CONTEXT_MODE = "prefix"
+CONTEXT_MODES = ["prefix", "chunks"]
+
+# ==========================
+# CONFIGURACIÓN DE EXTRACCIÓN
+# ==========================
+
+# Extensiones soportadas, su etiqueta de "source" en el CSV y su extractor: extractors.py.
+# Tipos adicionales: "extractors" en la sección "docs" de kb_config.json.
+
+# Procesos para extraer texto en paralelo (1 = en el proceso principal)
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+# Límite de memoria por proceso de extracción en MB (0 = sin límite; solo Linux/macOS)
+EXTRACT_WORKER_MEMORY_MB = 0
+
+# Se deja de leer un PDF/DOCX en cuanto se reúnen estos caracteres (lo único que usa el prompt).
+# None = extracción completa (--full-extract).
+EXTRACT_CHAR_BUDGET = PROMPT_CHAR_BUDGET
 
-# Tu API Key
-LLM_API_KEY = "s2_b4609507478b48fb87e345e6019e2b3d"  # Reemplaza con tu key real
+# En modo "chunks" los pasajes se eligen de todo el documento, hasta este límite
+CHUNK_SOURCE_CHAR_LIMIT = 100000
 
-# Modelo a usar (opcional, según tu API)
-LLM_MODEL = "gpt-4o-mini"  # Ajusta según lo que soporte tu endpoint
+# Con extracción completa, los PDF grandes se reparten entre procesos por rangos de páginas
+PDF_PAGES_PER_TASK = 50
+PDF_SPLIT_MIN_BYTES = 2 * 1024 * 1024
 
-# Timeout para llamadas al LLM (segundos)
-LLM_TIMEOUT = 30
+# Peticiones simultáneas al LLM por archivo (1 = modo secuencial)
+LLM_MAX_WORKERS = 4
+
+# Ritmo de peticiones: empieza en LLM_RATE req/s y se adapta a los 429 del proveedor
+# (hasta LLM_MAX_RATE). Reintentos con backoff exponencial y circuit breaker en llm_client.py.
+LLM_RATE = 2.0
+LLM_MAX_RATE = 10.0
+LLM_MAX_RETRIES = 5
+
+# Modo por lotes: una sola llamada al LLM por archivo con todas sus preguntas
+LLM_BATCH_MODE = False
+
+# Quitar los bloques de texto que se repiten en muchos HTML (pie, CTA, formularios...)
+# antes de construir el prompt (boilerplate.py). Se desactiva con --no-boilerplate.
+BOILERPLATE_FILTER = True
+
+# Añadir al CSV las columnas de búsqueda precalculadas (kb_text.SEARCH_FIELDS: texto
+# normalizado, raíces y frecuencias). El importador del plugin las ignora.
+# Se desactiva con --no-search-columns.
+SEARCH_COLUMNS = True
+
+# Caché persistente de respuestas del LLM (SQLite). Se desactiva con --no-cache.
+LLM_CACHE_PATH = "./.llm_cache.sqlite"
+LLM_CACHE_MAX_AGE_DAYS = 30
+LLM_CACHE_MAX_ENTRIES = 50000
+
+# Se inicializan en main() según los argumentos
+llm_cache = None
+llm_client = None
+
+# Tiempos por etapa y por documento (pipeline_profiler.py); main() lo arranca
+profiler = PipelineProfiler()
+
+
+# ==========================
+# CONFIGURACIÓN EXTERNA
+# ==========================
+
+def configure(config_path: str = None, root_dir: str = None, output_csv: str = None, base_url: str = None) -> dict:
+    """
+    Aplica la configuración de la sección "docs" (archivo y RAGKB_DOCS_*) sobre las constantes;
+    los argumentos no vacíos tienen prioridad. Registra los extractores adicionales.
+    """
+    global ROOT_DIR, OUTPUT_CSV, BASE_URL
+    config = load_section_config(
+        "docs",
+        {"root_dir": ROOT_DIR, "output_csv": OUTPUT_CSV, "base_url": BASE_URL, "extractors": {}},
+        config_path,
+    )
+    ROOT_DIR = root_dir or config["root_dir"]
+    OUTPUT_CSV = output_csv or config["output_csv"]
+    BASE_URL = (base_url or config["base_url"]).rstrip("/")
+    for ext, (source, target) in config["extractors"].items():
+        register_extractor(ext, source, target)
+    return config
 
 
 # ==========================
@@ -88,18 +195,6 @@ def get_category_and_url(file_path: str) -> tuple:
     return category, url_fuente
 
 
-def normalize_title(raw_title: str) -> str:
-    """
-    Limpia el título quitando sufijos comunes del sitio.
-    """
-    if not raw_title:
-        return ""
-
-    title = raw_title.replace("- DeSeguridad.net", "").strip()
-    title = title.replace("| DeSeguridad.net", "").strip()
-    return title
-
-
 def generate_question_templates(title: str) -> list:
     """
     Genera un listado de preguntas tipo para un servicio/tema.
@@ -127,52 +222,63 @@ def generate_question_templates(title: str) -> list:
 # LLAMADA AL LLM
 # ==========================
 
-def call_llm(prompt: str) -> str:
+def call_llm(prompt: str, is_valid=None) -> str:
     """
-    Llama al LLM configurado y devuelve la respuesta.
+    Llama al LLM pasando antes por la caché persistente (si está activa).
+    Con `is_valid`, solo se guardan (y se reutilizan) las respuestas que lo cumplen.
     """
-    headers = {
-        "Authorization": f"Bearer {LLM_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": LLM_MODEL,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
+    client = get_llm_client()
+    if llm_cache is not None:
+        cached = llm_cache.get(client.model, client.api_url, prompt)
+        if cached is not None and (is_valid is None or is_valid(cached)):
+            client.telemetry.record_cache_hit()
+            return cached
 
-    try:
-        response = requests.post(
-            LLM_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=LLM_TIMEOUT
+    answer = request_llm(prompt)
+
+    if llm_cache is not None and (is_valid is None or is_valid(answer)):
+        llm_cache.set(client.model, client.api_url, prompt, answer)
+
+    return answer
+
+
+def get_llm_client(rate: float = LLM_RATE, config_path: str = LLM_CONFIG_PATH):
+    """
+    Cliente compartido por todos los hilos (se crea en la primera llamada).
+    """
+    global llm_client
+    if llm_client is None:
+        # requests tarda en importarse: solo se carga si de verdad se va a llamar al LLM
+        from llm_client import LLMClient
+
+        config = load_llm_config(config_path)
+        if not config["api_key"]:
+            print("⚠️  Falta la API key del LLM: define RAGKB_LLM_API_KEY o \"api_key\" en kb_config.json.")
+        llm_client = LLMClient.from_config(
+            config,
+            rate=rate,
+            max_rate=max(LLM_MAX_RATE, rate),
+            max_retries=LLM_MAX_RETRIES,
         )
-        response.raise_for_status()
-        data = response.json()
+    return llm_client
 
-        # Extraer respuesta según formato OpenAI
-        if "choices" in data and len(data["choices"]) > 0:
-            return data["choices"][0]["message"]["content"].strip()
-        else:
-            return ""
 
-    except Exception as e:
-        print(f"  ⚠️  Error al llamar al LLM: {e}")
-        return ""
+def request_llm(prompt: str) -> str:
+    """
+    Llama al LLM configurado y devuelve la respuesta.
+    Lanza LLMError si no se consigue tras los reintentos.
+    """
+    return get_llm_client().complete(prompt)
 
 
-def generate_answer_with_llm(question: str, full_text: str, title: str) -> str:
+def generate_answer_with_llm(question: str, full_text: str, title: str,
+                             context_mode: str = CONTEXT_MODE) -> str:
     """
     Genera una respuesta específica para la pregunta usando el LLM.
     """
-    # Limitar el texto a 3000 caracteres para no saturar el prompt
-    text_chunk = full_text[:3000]
+    # Limitar el contenido para no saturar el prompt (prefijo o pasajes relevantes)
+    with profiler.stage("prompt_context"):
+        text_chunk = build_context(question, full_text, context_mode, PROMPT_CHAR_BUDGET)
 
     prompt = f"""Eres un asistente experto en servicios de seguridad y salud en el trabajo.
 
@@ -188,137 +294,363 @@ Pregunta:
 
 Respuesta:"""
 
-    answer = call_llm(prompt)
-
-    if not answer:
-        # Fallback si el LLM falla
-        answer = f"para ampliar la información especifica de {title} realiza una cotización en {url_fuente} y nospondremos en contacto para detallar y personalizar la respuesta a tus necesidades."
+    with profiler.stage("llm_answer"):
+        return call_llm(prompt)
 
-    return answer
 
-
-# ==========================
-# EXTRACCIÓN HTML (sin header/footer)
-# ==========================
-
-def extract_html_content(file_path: str) -> tuple:
+def generate_batch_answers_with_llm(questions: list, full_text: str, title: str,
+                                    context_mode: str = CONTEXT_MODE) -> str:
     """
-    Lee un HTML, elimina header/footer/nav/aside y devuelve:
-    - title (limpio)
-    - texto principal concatenado
+    Envía el contenido UNA sola vez junto con todas las preguntas.
+    Devuelve el texto crudo del LLM (JSON), que interpreta generate_answers_batched.
     """
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except (UnicodeDecodeError, FileNotFoundError):
-        return "", ""
+    with profiler.stage("prompt_context"):
+        text_chunk = build_batch_context(questions, full_text, context_mode, PROMPT_CHAR_BUDGET)
 
-    soup = BeautifulSoup(content, "html.parser")
+    prompt = f"""Eres un asistente experto en servicios de seguridad y salud en el trabajo.
 
-    # Eliminar bloques típicos de cabecera, pie y navegación
-    for selector in ["header", "footer", "nav", "aside"]:
-        for tag in soup.find_all(selector):
-            tag.decompose()
+A partir del siguiente contenido de una página web sobre "{title}", responde de forma clara, concisa y profesional cada una de las preguntas numeradas.
 
-    # Eliminar clases/ids típicos de themes
-    for css_selector in [
-        ".site-header",
-        ".site-footer",
-        "#site-header",
-        "#site-footer",
-        ".main-navigation",
-        ".menu-principal",
-        ".elementor-location-header",
-        ".elementor-location-footer"
-    ]:
-        for tag in soup.select(css_selector):
-            tag.decompose()
+Si el contenido no tiene información suficiente para responder, indica la url en donde puede ampliar la información cotizando el servicio
 
-    # Título
-    raw_title = soup.find("title").get_text().strip() if soup.find("title") else ""
-    title = normalize_title(raw_title)
+Formato:
+{BATCH_FORMAT_INSTRUCTIONS}
 
-    # Intentar quedarnos con <main> o <article> si existen
-    main_container = soup.find("main") or soup.find("article") or soup.body
+Contenido:
+{text_chunk}
 
-    if not main_container:
-        return title, ""
+Preguntas:
+{format_numbered_questions(questions)}
 
-    # Tomamos párrafos y encabezados dentro del contenedor principal
-    text_parts = []
-    for tag in main_container.find_all(["h1", "h2", "h3", "h4", "p", "li"]):
-        txt = tag.get_text(strip=True)
-        if txt:
-            text_parts.append(txt)
+Respuesta JSON:"""
 
-    full_text = " ".join(text_parts)
-    return title, full_text
+    with profiler.stage("llm_batch"):
+        return call_llm(prompt, is_valid=lambda raw: batch_is_complete(raw, len(questions)))
 
 
 # ==========================
-# EXTRACCIÓN PDF
+# EXTRACCIÓN EN PARALELO (pool de procesos)
 # ==========================
 
-def extract_pdf_content(file_path: str) -> tuple:
+def discover_files(root_dir: str) -> list:
+    """
+    Devuelve las rutas de los archivos soportados en el orden de os.walk.
+    """
+    extensions = supported_extensions()
+    file_paths = []
+    for dirpath, _, filenames in os.walk(root_dir):
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() in extensions:
+                file_paths.append(os.path.join(dirpath, filename))
+    return file_paths
+
+
+def extract_file(file_path: str, max_chars: int = EXTRACT_CHAR_BUDGET, html_backend: str = HTML_BACKEND,
+                 html_blocks: bool = False) -> tuple:
     """
-    Extrae texto de un PDF completo.
-    Título = nombre de archivo sin extensión.
+    Extrae (title, text) con el extractor registrado para su tipo (extractors.py).
+    PDF y DOCX se leen solo hasta `max_chars` caracteres (None = completos).
+    Con html_blocks=True, el texto de los HTML es su lista de bloques.
     """
-    if pdfplumber is None:
+    extractor = get_extractor(os.path.splitext(file_path)[1])
+    if extractor is None:
         return "", ""
+    return extractor(file_path, {"max_chars": max_chars, "html_backend": html_backend, "html_blocks": html_blocks})
 
-    title = os.path.splitext(os.path.basename(file_path))[0]
 
-    text_parts = []
+def _init_extract_worker(memory_mb: int, extractors: dict = None) -> None:
+    """
+    Inicializador de cada proceso de extracción: registra los extractores del proceso
+    principal (con spawn no se heredan) y aplica el techo de memoria.
+    """
+    for ext, (source, target) in (extractors or {}).items():
+        register_extractor(ext, source, target)
+
+    if not memory_mb:
+        return
+
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                txt = page.extract_text() or ""
-                txt = txt.strip()
-                if txt:
-                    text_parts.append(txt)
-    except Exception as e:
-        print(f"Error al procesar PDF {file_path}: {e}")
-        return title, ""
+        import resource
+    except ImportError:
+        return  # Windows: sin límite
 
-    full_text = " ".join(text_parts)
-    return title, full_text
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        print(f"ADVERTENCIA: no se pudo limitar la memoria del proceso de extracción: {e}")
 
 
-# ==========================
-# EXTRACCIÓN DOCX
-# ==========================
+def _extract_stage(file_path: str) -> str:
+    """
+    Etapa del perfilador para un archivo: extract_html, extract_pdf o extract_docx.
+    """
+    return "extract_" + os.path.splitext(file_path)[1].lower().lstrip(".")
+
 
-def extract_docx_content(file_path: str) -> tuple:
+def _timed_task(func, func_args: tuple) -> tuple:
     """
-    Extrae texto de un DOCX.
-    Título = nombre de archivo sin extensión.
+    Ejecuta una tarea de extracción en el proceso hijo y devuelve (resultado, pared, CPU):
+    el perfilador del proceso principal no ve el tiempo de los hijos.
     """
-    if docx is None:
-        return "", ""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = func(*func_args)
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def _plan_extraction_tasks(file_paths: list, max_chars: int = EXTRACT_CHAR_BUDGET,
+                           html_backend: str = HTML_BACKEND, html_blocks: bool = False) -> list:
+    """
+    Divide el trabajo en tareas (index, part, función, argumentos).
+    Con extracción completa, los PDF grandes se parten en rangos de PDF_PAGES_PER_TASK páginas;
+    con presupuesto de caracteres no hace falta, porque solo se leen las primeras páginas.
+    """
+    tasks = []
+    for index, file_path in enumerate(file_paths):
+        is_big_pdf = (
+            max_chars is None
+            and file_path.lower().endswith(".pdf")
+            and os.path.getsize(file_path) >= PDF_SPLIT_MIN_BYTES
+        )
+        total_pages = 0
+        if is_big_pdf:
+            from pdf_extract import count_pdf_pages, extract_pdf_page_range
+            total_pages = count_pdf_pages(file_path)
+
+        if total_pages > PDF_PAGES_PER_TASK:
+            for part, start in enumerate(range(0, total_pages, PDF_PAGES_PER_TASK)):
+                end = min(start + PDF_PAGES_PER_TASK, total_pages)
+                tasks.append((index, part, extract_pdf_page_range, (file_path, start, end)))
+        else:
+            tasks.append((index, 0, extract_file, (file_path, max_chars, html_backend, html_blocks)))
 
+    return tasks
+
+
+def _assemble(file_path: str, parts: dict) -> tuple:
+    """
+    Une los resultados parciales de un archivo en (title, text).
+    """
+    if len(parts) == 1 and isinstance(parts[0], tuple):
+        return parts[0]
+
+    # PDF repartido por rangos: título = nombre de archivo, texto = rangos en orden
     title = os.path.splitext(os.path.basename(file_path))[0]
+    text = " ".join(parts[part] for part in sorted(parts) if parts[part])
+    return title, text
 
-    try:
-        document = docx.Document(file_path)
-    except Exception as e:
-        print(f"Error al procesar DOCX {file_path}: {e}")
-        return title, ""
 
-    text_parts = []
-    for para in document.paragraphs:
-        txt = para.text.strip()
-        if txt:
-            text_parts.append(txt)
+def iter_extracted_files(file_paths: list, workers: int = EXTRACT_WORKERS,
+                         memory_mb: int = EXTRACT_WORKER_MEMORY_MB, max_chars: int = EXTRACT_CHAR_BUDGET,
+                         html_backend: str = HTML_BACKEND, html_blocks: bool = False):
+    """
+    Extrae el contenido de `file_paths` con un pool de procesos.
 
-    full_text = " ".join(text_parts)
-    return title, full_text
+    Genera (index, file_path, title, text) en cuanto cada archivo está completo,
+    sin esperar al resto: la generación con el LLM puede empezar enseguida.
+    Con html_blocks=True, `text` de los HTML es su lista de bloques (ver remove_boilerplate).
+    """
+    if workers <= 1:
+        for index, file_path in enumerate(file_paths):
+            with profiler.stage(_extract_stage(file_path), doc=file_path):
+                title, text = extract_file(file_path, max_chars, html_backend, html_blocks)
+            yield index, file_path, title, text
+        return
+
+    # El pool (multiprocessing) solo se importa si se usa: con un proceso el arranque es inmediato
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    tasks = _plan_extraction_tasks(file_paths, max_chars, html_backend, html_blocks)
+    parts_expected = {}
+    for index, _, _, _ in tasks:
+        parts_expected[index] = parts_expected.get(index, 0) + 1
+
+    parts_done = {}
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_extract_worker,
+        initargs=(memory_mb, dict(EXTRACTORS)),
+    ) as executor:
+        futures = {
+            executor.submit(_timed_task, func, func_args): (index, part)
+            for index, part, func, func_args in tasks
+        }
+
+        for future in as_completed(futures):
+            index, part = futures[future]
+            file_path = file_paths[index]
+
+            try:
+                result, wall, cpu = future.result()
+                profiler.add(_extract_stage(file_path), wall, cpu, doc=file_path)
+            except (BrokenProcessPool, MemoryError) as e:
+                print(f"  ⚠️  El proceso de extracción falló con {file_path}: {e}")
+                result = ("", "") if part == 0 and parts_expected[index] == 1 else ""
+            except Exception as e:
+                print(f"  ⚠️  Error extrayendo {file_path}: {e}")
+                result = ("", "") if part == 0 and parts_expected[index] == 1 else ""
+
+            parts = parts_done.setdefault(index, {})
+            parts[part] = result
+
+            if len(parts) == parts_expected[index]:
+                title, text = _assemble(file_path, parts_done.pop(index))
+                yield index, file_path, title, text
+
+
+def _uses_html_blocks(file_path: str) -> bool:
+    """
+    True si el extractor del archivo es el de HTML (devuelve bloques con html_blocks=True).
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    return EXTRACTORS.get(ext, ("", ""))[1].startswith("html_extract:")
+
+
+def remove_boilerplate(extracted, detector: BoilerplateDetector, cache_path: str, file_paths: list):
+    """
+    Retiene solo los HTML hasta que están todos extraídos (el detector necesita verlos todos),
+    calcula el boilerplate del sitio y los genera con el texto ya filtrado. Los PDF/DOCX no
+    intervienen en la detección y pasan a la generación en cuanto están listos.
+    """
+    cached = detector.load(cache_path)
+    html_pending = sum(1 for file_path in file_paths if _uses_html_blocks(file_path))
+    held = []
+
+    def compute():
+        with profiler.stage("boilerplate"):
+            for _, file_path, _, text in held:
+                if isinstance(text, list):
+                    detector.add_page(os.path.relpath(file_path, ROOT_DIR).replace(os.sep, "/"), text)
+            detector.prune(os.path.relpath(file_path, ROOT_DIR).replace(os.sep, "/") for file_path in file_paths)
+            detector.compute()
+
+        print(f"🧹 Boilerplate: {len(detector.fingerprints)} bloques repetidos en {len(detector.documents)} archivos HTML"
+              f"{f' ({cached} de la ejecución anterior)' if cached else ''}")
+        for pages, sample in detector.top_blocks():
+            print(f"   {pages:>4} archivos: {sample[:80]}")
+        print()
+
+    if not html_pending:
+        compute()
+
+    for result in extracted:
+        if not _uses_html_blocks(result[1]):
+            yield result
+            continue
+
+        held.append(result)
+        html_pending -= 1
+        if html_pending:
+            continue
+
+        compute()
+        for index, file_path, title, text in held:
+            if isinstance(text, list):
+                text = " ".join(detector.filter(text, budget=PROMPT_CHAR_BUDGET))
+            yield index, file_path, title, text
+        held = []
 
 
 # ==========================
 # MAIN
 # ==========================
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera la base de conocimientos desde archivos HTML, PDF y DOCX.")
+    parser.add_argument(
+        "--root-dir",
+        help=f"Carpeta con los archivos (por defecto \"root_dir\" de la configuración o {ROOT_DIR})",
+    )
+    parser.add_argument(
+        "--output",
+        help=f"CSV de salida (por defecto \"output_csv\" de la configuración o {OUTPUT_CSV})",
+    )
+    parser.add_argument(
+        "--base-url",
+        help=f"URL base para source_url (por defecto \"base_url\" de la configuración o {BASE_URL})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=LLM_MAX_WORKERS,
+        help=f"Peticiones simultáneas al LLM por archivo (por defecto {LLM_MAX_WORKERS}; 1 = secuencial)",
+    )
+    parser.add_argument(
+        "--batch", action=argparse.BooleanOptionalAction, default=LLM_BATCH_MODE,
+        help="Una sola llamada al LLM por archivo con todas sus preguntas (respuesta en JSON)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="No leer ni escribir la caché de respuestas del LLM",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Ignorar las respuestas guardadas en caché y volver a pedirlas (se actualiza la caché)",
+    )
+    parser.add_argument(
+        "--cache-path", default=LLM_CACHE_PATH,
+        help=f"Archivo SQLite de la caché del LLM (por defecto {LLM_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--extract-workers", type=int, default=EXTRACT_WORKERS,
+        help=f"Procesos para extraer texto en paralelo (por defecto {EXTRACT_WORKERS}; 1 = sin pool)",
+    )
+    parser.add_argument(
+        "--extract-memory-mb", type=int, default=EXTRACT_WORKER_MEMORY_MB,
+        help="Límite de memoria por proceso de extracción en MB (0 = sin límite)",
+    )
+    parser.add_argument(
+        "--html-backend", default=HTML_BACKEND, choices=["auto"] + available_backends(),
+        help="Parser HTML: lxml (rápido), bs4 (html.parser) o auto (lxml si está instalado)",
+    )
+    parser.add_argument(
+        "--full-extract", action="store_true",
+        help=f"Extraer PDF/DOCX completos (por defecto se leen solo los primeros {EXTRACT_CHAR_BUDGET} caracteres)",
+    )
+    parser.add_argument(
+        "--boilerplate", action=argparse.BooleanOptionalAction, default=BOILERPLATE_FILTER,
+        help="Quitar los bloques repetidos en muchos HTML antes del prompt; los HTML esperan a que se extraigan todos (--no-boilerplate para desactivarlo)",
+    )
+    parser.add_argument(
+        "--search-columns", action=argparse.BooleanOptionalAction, default=SEARCH_COLUMNS,
+        help="Añadir al CSV las columnas search_* (texto normalizado, raíces y frecuencias) tras las cinco del plugin",
+    )
+    parser.add_argument(
+        "--context", default=CONTEXT_MODE, choices=CONTEXT_MODES,
+        help=f"Contenido del prompt: prefix (primeros {PROMPT_CHAR_BUDGET} caracteres) o chunks (pasajes relevantes por pregunta)",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Reconstruir todo el CSV ignorando el manifiesto incremental",
+    )
+    parser.add_argument(
+        "--llm-rate", type=float, default=LLM_RATE,
+        help=f"Peticiones por segundo al LLM al empezar; se ajusta solo ante 429 (por defecto {LLM_RATE}, máximo {LLM_MAX_RATE})",
+    )
+    parser.add_argument(
+        "--config", default=LLM_CONFIG_PATH,
+        help="Archivo JSON de configuración: LLM y sección \"docs\" (por defecto kb_config.json o $RAGKB_CONFIG)",
+    )
+    parser.add_argument(
+        "--llm-metrics",
+        help="JSON con la telemetría de cada llamada al LLM (por defecto <salida>.llm_metrics.json)",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Medir el pico de memoria con tracemalloc (más lento)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Guardar cProfile (.profile.prof) y pilas muestreadas para flamegraph (.profile.folded); implica --trace-memory",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Reanudar una ejecución interrumpida reutilizando las respuestas de su diario (.journal.jsonl)",
+    )
+    return parser.parse_args()
+
+
 def main():
     """
     Recorre ROOT_DIR buscando archivos .html, .pdf y .docx.
@@ -328,76 +660,206 @@ def main():
     - Usa el LLM para generar respuestas específicas a cada pregunta.
     - Guarda todo en un CSV con formato: question;answer;category;source;source_url
     """
-    knowledge_base = []
+    args = parse_args()
+    configure(args.config, args.root_dir, args.output, args.base_url)
+    from llm_client import metrics_path_for
+    args.llm_metrics = args.llm_metrics or metrics_path_for(OUTPUT_CSV)
+    profiler.start(trace_memory=args.trace_memory, profile=args.profile)
 
     print(f"Procesando archivos en: {ROOT_DIR}")
-    print(f"Salida: {OUTPUT_CSV}\n")
-
-    for dirpath, _, filenames in os.walk(ROOT_DIR):
-        for filename in filenames:
-            file_path = os.path.join(dirpath, filename)
-            ext = os.path.splitext(filename)[1].lower()
-
-            if ext not in [".html", ".pdf", ".docx"]:
-                continue
-
-            print(f"📄 Procesando: {file_path}")
-
-            category, url_fuente = get_category_and_url(file_path)
-
-            # Según el tipo de archivo, extraemos contenido
-            if ext == ".html":
-                title, text = extract_html_content(file_path)
-                source = "Web (HTML)"
-            elif ext == ".pdf":
-                title, text = extract_pdf_content(file_path)
-                source = "Documento PDF"
-            elif ext == ".docx":
-                title, text = extract_docx_content(file_path)
-                source = "Documento DOCX"
+    print(f"Salida: {OUTPUT_CSV}")
+    print(f"Peticiones simultáneas al LLM: {args.workers}")
+    print(f"Modo por lotes: {'sí' if args.batch else 'no'}")
+    print(f"Contexto del prompt: {args.context}")
+
+    global llm_cache
+    if args.no_cache:
+        print("Caché LLM: desactivada\n")
+    else:
+        llm_cache = LLMCache(
+            args.cache_path,
+            max_age_days=LLM_CACHE_MAX_AGE_DAYS,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            refresh=args.refresh,
+        )
+        print(f"Caché LLM: {args.cache_path}{' (refresh)' if args.refresh else ''}\n")
+
+    # Manifiesto incremental: solo se regeneran los archivos que cambiaron
+    manifest_path = manifest_path_for(OUTPUT_CSV)
+    previous_manifest = {} if args.full else load_manifest(manifest_path)
+    previous_rows = {} if args.full else load_previous_rows(OUTPUT_CSV)
+    manifest = {}
+    reused_files = 0
+    regenerated_files = 0
+
+    # Las filas se escriben en OUTPUT_CSV.partial a medida que se generan y cada respuesta
+    # queda en el diario: si la ejecución se corta, --resume retoma donde se quedó.
+    journal_path = journal_path_for(OUTPUT_CSV)
+    if not args.resume and os.path.exists(journal_path) and os.path.getsize(journal_path):
+        print(f"⚠️  Hay un diario de una ejecución interrumpida ({journal_path}); se descarta. Usa --resume para reanudarla.")
+    journal = ResumeJournal(journal_path, resume=args.resume)
+    if args.resume:
+        print(f"⏯️  Reanudando: {len(journal.done)} respuestas en el diario")
+    writer = KBStreamWriter(OUTPUT_CSV, search_columns=args.search_columns)
+    failed_log = FailedItemsLog(failed_path_for(OUTPUT_CSV))
+    client = get_llm_client(args.llm_rate, args.config)
+
+    file_paths = discover_files(ROOT_DIR)
+    print(f"Archivos encontrados: {len(file_paths)} | procesos de extracción: {args.extract_workers}\n")
+
+    # Los archivos terminan de extraerse en cualquier orden; las filas se añaden
+    # al CSV en el orden de os.walk para que la salida sea determinista.
+    pending_rows = {}
+    next_index = 0
+
+    if args.full_extract:
+        max_chars = None
+    elif args.context == "chunks":
+        max_chars = CHUNK_SOURCE_CHAR_LIMIT
+    else:
+        max_chars = EXTRACT_CHAR_BUDGET
+    extracted = iter_extracted_files(
+        file_paths, args.extract_workers, args.extract_memory_mb, max_chars, args.html_backend, args.boilerplate
+    )
+    boilerplate = None
+    if args.boilerplate:
+        boilerplate = BoilerplateDetector()
+        extracted = remove_boilerplate(extracted, boilerplate, boilerplate_path_for(OUTPUT_CSV), file_paths)
+    for index, file_path, title, text in extracted:
+        print(f"📄 Procesando: {file_path}")
+
+        category, url_fuente = get_category_and_url(file_path)
+        manifest_key = os.path.relpath(file_path, ROOT_DIR).replace(os.sep, "/")
+        source = source_label(os.path.splitext(file_path)[1])
+        pending_rows[index] = file_rows = []
+
+        if not text:
+            if manifest_key in previous_manifest and previous_rows.get(url_fuente):
+                # Error de lectura puntual: se conservan las filas anteriores
+                print("  ⚠️  Sin contenido; se conservan las respuestas de la ejecución anterior.\n")
+                manifest[manifest_key] = previous_manifest[manifest_key]
+                file_rows.extend(previous_rows[url_fuente])
+                reused_files += 1
             else:
-                continue
-
-            if not text:
                 print(f"  → Sin contenido útil, omitido.\n")
-                continue
-
+        else:
             # Generamos preguntas tipo a partir del título
             preguntas = generate_question_templates(title)
+            entry = make_entry(text, preguntas, client.model, url_fuente, args.context)
 
-            print(f"  → Generando {len(preguntas)} respuestas con LLM...")
-
-            for pregunta in preguntas:
-                # Generar respuesta específica con el LLM
-                respuesta = generate_answer_with_llm(pregunta, text, title)
-
-                knowledge_base.append({
-                    "question": pregunta,
-                    "answer": respuesta,
-                    "category": category,
-                    "source": source,
-                    "source_url": url_fuente
-                })
-
-            print(f"  ✅ {len(preguntas)} preguntas generadas.\n")
-
-    # ------------------------------
-    # Guardar en CSV
-    # ------------------------------
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f, delimiter=";")
-        writer.writerow(["question", "answer", "category", "source", "source_url"])
-
-        for item in knowledge_base:
-            writer.writerow([
-                item["question"],
-                item["answer"],
-                item["category"],
-                item["source"],
-                item["source_url"],
-            ])
-
-    print(f"\n✅ Base de conocimientos creada con {len(knowledge_base)} registros.")
+            if is_unchanged(previous_manifest.get(manifest_key), entry) and previous_rows.get(url_fuente):
+                print(f"  ♻️  Sin cambios: se reutilizan {len(previous_rows[url_fuente])} respuestas anteriores.\n")
+                manifest[manifest_key] = previous_manifest[manifest_key]
+                file_rows.extend(previous_rows[url_fuente])
+                reused_files += 1
+            else:
+                fingerprint = entry_fingerprint(entry)
+                file_rows.extend(journal.get(manifest_key, fingerprint, pregunta) for pregunta in preguntas)
+                pendientes = [pregunta for pregunta, row in zip(preguntas, file_rows) if row is None]
+
+                if len(pendientes) < len(preguntas):
+                    print(f"  ⏯️  {len(preguntas) - len(pendientes)} respuestas recuperadas del diario")
+                if pendientes:
+                    print(f"  → Generando {len(pendientes)} respuestas con LLM...")
+
+                # Generar respuestas específicas con el LLM (en paralelo, conservando el orden)
+                answer_fn = lambda pregunta: generate_answer_with_llm(pregunta, text, title, args.context)
+
+                with profiler.stage("llm", doc=file_path):
+                    if not pendientes:
+                        respuestas = []
+                    elif args.batch:
+                        respuestas = generate_answers_batched(
+                            pendientes,
+                            lambda lote: generate_batch_answers_with_llm(lote, text, title, args.context),
+                            answer_fn,
+                            max_workers=args.workers,
+                        )
+                    else:
+                        respuestas = generate_answers_concurrently(
+                            pendientes, answer_fn, max_workers=args.workers
+                        )
+
+                nuevas = {}
+                fallidas = 0
+                with profiler.stage("journal"):
+                    for pregunta, respuesta in zip(pendientes, respuestas):
+                        if respuesta is None:
+                            # Sin respuesta del LLM: se registra para reintentarla, no se escribe en el CSV
+                            failed_log.record(manifest_key, pregunta, url_fuente)
+                            fallidas += 1
+                            continue
+                        nuevas[pregunta] = {
+                            "question": pregunta,
+                            "answer": respuesta,
+                            "category": category,
+                            "source": source,
+                            "source_url": url_fuente
+                        }
+                        journal.record(manifest_key, fingerprint, nuevas[pregunta])
+
+                file_rows[:] = [
+                    row or nuevas[pregunta]
+                    for pregunta, row in zip(preguntas, file_rows)
+                    if row or pregunta in nuevas
+                ]
+
+                if fallidas:
+                    # El archivo queda fuera del manifiesto: se completará en la próxima ejecución
+                    print(f"  ⚠️  {fallidas} preguntas sin respuesta del LLM (se reintentarán).\n")
+                else:
+                    manifest[manifest_key] = entry
+                    regenerated_files += 1
+                    print(f"  ✅ {len(preguntas)} preguntas generadas.\n")
+
+        # Pasar al CSV todos los archivos ya completos en orden
+        while next_index in pending_rows:
+            with profiler.stage("write"):
+                writer.write_rows(pending_rows.pop(next_index))
+            next_index += 1
+
+    with profiler.stage("write"):
+        writer.commit()
+        save_manifest(manifest_path, manifest)
+    failed_log.close()
+    if failed_log.count:
+        # Se conserva el diario para reanudar solo lo que falta
+        journal.close()
+    else:
+        journal.finish()
+    pruned_files = len(set(previous_manifest) - set(manifest))
+
+    print(f"\n✅ Base de conocimientos creada con {writer.rows_written} registros.")
+    print(f"♻️  Archivos reutilizados: {reused_files} | regenerados: {regenerated_files} | eliminados: {pruned_files}")
+    if boilerplate is not None:
+        boilerplate.save(boilerplate_path_for(OUTPUT_CSV))
+        print(f"🧹 {boilerplate.summary()}")
+    print(f"🤖 {client.summary()}")
+    for line in client.telemetry.report_lines():
+        print(f"   {line}")
+    client.telemetry.save(args.llm_metrics, {
+        "script": os.path.basename(__file__),
+        "batch": args.batch,
+        "workers": args.workers,
+        "context": args.context,
+        "rows": writer.rows_written,
+        "failed": failed_log.count,
+    })
+    print(f"📊 Telemetría del LLM: {args.llm_metrics}")
+    client.close()
+
+    report = profiler.stop()
+    print("⏱️  Tiempos por etapa:")
+    for line in profiler.report_lines(report):
+        print(f"   {line}")
+    for path in profiler.save(profile_paths_for(OUTPUT_CSV), report, {"script": os.path.basename(__file__)}):
+        print(f"📊 Perfil: {path}")
+    if llm_cache is not None:
+        print(f"💾 {llm_cache.summary()}")
+        llm_cache.close()
+    if failed_log.count:
+        print(f"⚠️  {failed_log.count} preguntas sin respuesta en {failed_log.path}.")
+        print("   Vuelve a ejecutar con --resume para pedir solo las que faltan.")
     print(f"📄 Archivo generado: {OUTPUT_CSV}")
     print("\nPróximo paso:")
     print("  1. Abre el admin de WordPress → RAG Chatbot → Base de Conocimientos")
@@ -6,17 +6,58 @@ Mejoras:
 - Usa plantillas de preguntas diferentes según el tipo de página.
 - Evita duplicar preguntas muy similares (ej. tiempo / demora).
 - Genera CSV compatible con el plugin RAG Chatbot: question;answer;category;source;source_url
+
+Uso:
+    python process_site.py [--url URL ...] [--output CSV]
+    python process_site.py --crawl          # o: python ragkb.py crawl
 """
 
-import csv
-import requests
+import argparse
+import os
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
+
+from boilerplate import BoilerplateDetector, boilerplate_path_for
+from html_extract import DEFAULT_BACKEND as HTML_BACKEND, available_backends, extract_html_blocks
+from llm_cache import LLMCache
+from kb_config import load_llm_config, load_section_config
+from llm_client import LLMClient, metrics_path_for
+from pipeline_profiler import PipelineProfiler, profile_paths_for
+from prompt_context import build_batch_context, build_context
+from http_fetch import Fetcher
+from site_crawler import SiteCrawler
+from kb_journal import (
+    FailedItemsLog,
+    KBStreamWriter,
+    ResumeJournal,
+    entry_fingerprint,
+    failed_path_for,
+    journal_path_for,
+)
+from kb_manifest import (
+    is_unchanged,
+    load_manifest,
+    load_previous_rows,
+    make_entry,
+    manifest_path_for,
+    save_manifest,
+)
+from kb_generation import (
+    BATCH_FORMAT_INSTRUCTIONS,
+    batch_is_complete,
+    format_numbered_questions,
+    generate_answers_batched,
+    generate_answers_concurrently,
+)
 
 # ==========================
 # CONFIGURACIÓN GENERAL
 # ==========================
 
+# Valores por defecto de URLS, SITE_ROOT, SERVICE_SLUGS y OUTPUT_CSV. Se cambian sin tocar el
+# código con la sección "site" de kb_config.json ("urls", "root", "service_slugs", "output_csv"),
+# las variables RAGKB_SITE_URLS / RAGKB_SITE_ROOT / RAGKB_SITE_SERVICE_SLUGS / RAGKB_SITE_OUTPUT_CSV
+# o --url / --output (ver configure()).
+
 # URLs del sitio que quieres procesar
 URLS = [
     #"https://deseguridad.net/",
@@ -41,21 +82,116 @@ URLS = [
     # "https://deseguridad.net/blog/ejemplo-articulo-1/",
 ]
 
+# Slugs (primer segmento de la ruta) que se clasifican como páginas de servicio.
+# Con --service-slugs ARCHIVO se leen de un archivo de texto (uno por línea, # = comentario).
+SERVICE_SLUGS = [
+    "servicios",
+    "riesgo-psicosocial",
+    "mediciones-higienicas",
+    "analisis-de-puesto-de-trabajo",
+    "seguridad-en-el-trabajo",
+    "examenes-ocupacionales",
+    "capacitacion-enfocada-en-los-riesgos",
+    "pausas-estrategicas-2",
+    "indicadores-sgsst",
+    "ee-mm-sgsst",
+    "profesiograma",
+    "plan-estrategico-de-seguridad-vial",
+    "sistema-informacion-sst",
+]
+
+# Modo --crawl (site_crawler.py): en lugar de URLS se rastrea el sitio a partir de su sitemap
+# y/o de URLs de inicio, siguiendo enlaces internos. Respeta robots.txt (Disallow, Crawl-delay).
+SITE_ROOT = "https://deseguridad.net/"
+CRAWL_MAX_PAGES = 500
+CRAWL_MAX_DEPTH = 3
+
 # Archivo de salida (CSV)
 OUTPUT_CSV = "./deseguridad_knowledge_base.csv"
 
 # Timeout para las peticiones HTTP
 HTTP_TIMEOUT = 20
 
+# Descargas en paralelo (total y por host) e intervalo mínimo entre peticiones al mismo host
+HTTP_MAX_WORKERS = 8
+HTTP_PER_HOST = 2
+HTTP_MIN_DELAY = 0.25
+
+# ETag / Last-Modified y cuerpos guardados para GET condicional (304)
+HTTP_CACHE_PATH = "./.http_cache.sqlite"
+
 
 # ==========================
 # CONFIG LLM (RouteLLM / OpenAI-like)
 # ==========================
 
-LLM_API_URL = "https://routellm.abacus.ai/v1/chat/completions"
-LLM_API_KEY = "s2_b4609507478b48fb87e345e6019e2b3d"   # <-- pon aquí tu API key válida de RouteLLM
-LLM_MODEL = "gpt-4o-mini"        # o el modelo que uses
-LLM_TIMEOUT = 30
+# Endpoint, API key, modelo, timeout y precios se leen de kb_config.json o de las
+# variables de entorno RAGKB_LLM_* (ver kb_config.py). La key nunca va en el código.
+# --config RUTA usa otro archivo.
+LLM_CONFIG_PATH = None
+
+# Peticiones simultáneas al LLM por página (1 = modo secuencial)
+LLM_MAX_WORKERS = 4
+
+# Ritmo de peticiones: empieza en LLM_RATE req/s y se adapta a los 429 del proveedor
+# (hasta LLM_MAX_RATE). Reintentos con backoff exponencial y circuit breaker en llm_client.py.
+LLM_RATE = 2.0
+LLM_MAX_RATE = 10.0
+LLM_MAX_RETRIES = 5
+
+# Modo por lotes: una sola llamada al LLM por página con todas sus preguntas
+LLM_BATCH_MODE = False
+
+# Contenido del prompt:
+# - "prefix": los primeros PROMPT_CHAR_BUDGET caracteres de la página
+# - "chunks": los pasajes más relevantes para cada pregunta (prompt_context.py)
+PROMPT_CHAR_BUDGET = 3000
+CONTEXT_MODE = "prefix"
+CONTEXT_MODES = ["prefix", "chunks"]
+
+# Quitar los bloques de texto que se repiten en muchas páginas (pie, CTA, formularios...)
+# antes de construir el prompt (boilerplate.py). Se desactiva con --no-boilerplate.
+BOILERPLATE_FILTER = True
+
+# Añadir al CSV las columnas de búsqueda precalculadas (kb_text.SEARCH_FIELDS: texto
+# normalizado, raíces y frecuencias). El importador del plugin las ignora.
+# Se desactiva con --no-search-columns.
+SEARCH_COLUMNS = True
+
+# Caché persistente de respuestas del LLM (SQLite). Se desactiva con --no-cache.
+LLM_CACHE_PATH = "./.llm_cache.sqlite"
+LLM_CACHE_MAX_AGE_DAYS = 30
+LLM_CACHE_MAX_ENTRIES = 50000
+
+# Se inicializan en main() según los argumentos
+llm_cache = None
+llm_client = None
+
+# Tiempos por etapa y por documento (pipeline_profiler.py); main() lo arranca
+profiler = PipelineProfiler()
+fetcher = None
+
+
+# ==========================
+# CONFIGURACIÓN EXTERNA
+# ==========================
+
+def configure(config_path: str = None, urls: list = None, output_csv: str = None) -> dict:
+    """
+    Aplica la configuración de la sección "site" (archivo y RAGKB_SITE_*) sobre las constantes;
+    los argumentos no vacíos tienen prioridad.
+    """
+    global URLS, SITE_ROOT, SERVICE_SLUGS, OUTPUT_CSV
+    config = load_section_config(
+        "site",
+        {"urls": URLS, "root": SITE_ROOT, "service_slugs": SERVICE_SLUGS, "output_csv": OUTPUT_CSV},
+        config_path,
+    )
+    URLS = list(urls or config["urls"])
+    SITE_ROOT = config["root"]
+    SERVICE_SLUGS = list(config["service_slugs"])
+    OUTPUT_CSV = output_csv or config["output_csv"]
+    return config
 
 
 # ==========================
@@ -86,22 +222,8 @@ def classify_page_type(url: str, category: str) -> str:
     if "terminos" in path or "condiciones" in path or "tratamiento-de-datos" in path or "politica" in path:
         return "legal"
 
-    # Servicios: aquí puedes ir afinando según tu estructura
-    if category in [
-        "servicios",
-        "riesgo-psicosocial",
-        "mediciones-higienicas",
-        "analisis-de-puesto-de-trabajo",
-        "seguridad-en-el-trabajo",
-        "examenes-ocupacionales",
-        "capacitacion-enfocada-en-los-riesgos",
-        "pausas-estrategicas-2",
-        "indicadores-sgsst",
-        "ee-mm-sgsst",
-        "profesiograma",
-        "plan-estrategico-de-seguridad-vial",
-        "sistema-informacion-sst",
-    ]:
+    # Servicios: primer segmento de la ruta en SERVICE_SLUGS (o --service-slugs ARCHIVO)
+    if category in SERVICE_SLUGS:
         return "servicio"
 
     # Fallback
@@ -129,18 +251,6 @@ def get_category_and_url(url: str) -> tuple:
     return category, url
 
 
-def normalize_title(raw_title: str) -> str:
-    """
-    Limpia el título quitando sufijos comunes del sitio.
-    """
-    if not raw_title:
-        return ""
-
-    title = raw_title.replace("- DeSeguridad.net", "").strip()
-    title = title.replace("| DeSeguridad.net", "").strip()
-    return title
-
-
 # ==========================
 # PLANTILLAS DE PREGUNTAS POR TIPO
 # ==========================
@@ -224,51 +334,55 @@ def generate_questions_by_type(page_type: str, title: str) -> list:
 # LLM
 # ==========================
 
-def call_llm(prompt: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {LLM_API_KEY}",
-        "Content-Type": "application/json"
-    }
+def call_llm(prompt: str, is_valid=None) -> str:
+    """
+    Llama al LLM pasando antes por la caché persistente (si está activa).
+    Con `is_valid`, solo se guardan (y se reutilizan) las respuestas que lo cumplen.
+    """
+    client = get_llm_client()
+    if llm_cache is not None:
+        cached = llm_cache.get(client.model, client.api_url, prompt)
+        if cached is not None and (is_valid is None or is_valid(cached)):
+            client.telemetry.record_cache_hit()
+            return cached
 
-    payload = {
-        "model": LLM_MODEL,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
+    answer = request_llm(prompt)
 
-    try:
-        resp = requests.post(
-            LLM_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=LLM_TIMEOUT
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    if llm_cache is not None and (is_valid is None or is_valid(answer)):
+        llm_cache.set(client.model, client.api_url, prompt, answer)
 
-        if "choices" in data and len(data["choices"]) > 0:
-            return data["choices"][0]["message"]["content"].strip()
-        else:
-            return ""
-    except Exception as e:
-        print(f"  ⚠️  Error al llamar al LLM: {e}")
-        return ""
+    return answer
 
 
-def generate_answer_with_llm(question: str, full_text: str, title: str, page_type: str) -> str:
+def get_llm_client(rate: float = LLM_RATE, config_path: str = LLM_CONFIG_PATH) -> LLMClient:
     """
-    Genera una respuesta específica para la pregunta usando el LLM,
-    basada en el contenido de la página.
+    Cliente compartido por todos los hilos (se crea en la primera llamada).
     """
-    text_chunk = full_text[:3000]
+    global llm_client
+    if llm_client is None:
+        config = load_llm_config(config_path)
+        if not config["api_key"]:
+            print("⚠️  Falta la API key del LLM: define RAGKB_LLM_API_KEY o \"api_key\" en kb_config.json.")
+        llm_client = LLMClient.from_config(
+            config,
+            rate=rate,
+            max_rate=max(LLM_MAX_RATE, rate),
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return llm_client
 
+
+def request_llm(prompt: str) -> str:
+    """
+    Pide la respuesta al LLM. Lanza LLMError si no se consigue tras los reintentos.
+    """
+    return get_llm_client().complete(prompt)
+
+
+def describe_page_type(page_type: str) -> str:
     # Ajustamos ligeramente el rol según el tipo de página,
     # pero sin reinventar el prompt completo.
-    tipo_descriptivo = {
+    return {
         "servicio": "un servicio ofrecido por Deseguridad.net",
         "legal": "un documento legal o de tratamiento de datos",
         "blog": "un artículo del blog de Deseguridad.net",
@@ -276,6 +390,17 @@ def generate_answer_with_llm(question: str, full_text: str, title: str, page_typ
         "otro": "una página informativa de Deseguridad.net",
     }.get(page_type, "una página de Deseguridad.net")
 
+
+def generate_answer_with_llm(question: str, full_text: str, title: str, page_type: str,
+                             context_mode: str = CONTEXT_MODE) -> str:
+    """
+    Genera una respuesta específica para la pregunta usando el LLM,
+    basada en el contenido de la página.
+    """
+    with profiler.stage("prompt_context"):
+        text_chunk = build_context(question, full_text, context_mode, PROMPT_CHAR_BUDGET)
+    tipo_descriptivo = describe_page_type(page_type)
+
     prompt = f"""Eres un asistente experto en los servicios y contenidos de Deseguridad.net
 (consultoría, mediciones, calibraciones, riesgos, normativa, etc.).
 
@@ -298,131 +423,545 @@ Pregunta:
 
 Respuesta:"""
 
-    answer = call_llm(prompt)
+    with profiler.stage("llm_answer"):
+        return call_llm(prompt)
 
-    if not answer:
-        answer = (
-            f"Para ampliar información sobre '{title}'. Te recomendamos cotizar directamente en {source_url}, para obtener una respuesta personalizada a tu caso."
-        )
 
-    return answer
+def generate_batch_answers_with_llm(questions: list, full_text: str, title: str, page_type: str,
+                                    context_mode: str = CONTEXT_MODE) -> str:
+    """
+    Envía el contenido de la página UNA sola vez junto con todas sus preguntas.
+    Devuelve el texto crudo del LLM (JSON), que interpreta generate_answers_batched.
+    """
+    with profiler.stage("prompt_context"):
+        text_chunk = build_batch_context(questions, full_text, context_mode, PROMPT_CHAR_BUDGET)
+    tipo_descriptivo = describe_page_type(page_type)
+
+    prompt = f"""Eres un asistente experto en los servicios y contenidos de Deseguridad.net
+(consultoría, mediciones, calibraciones, riesgos, normativa, etc.).
+
+A partir del siguiente contenido de {tipo_descriptivo} titulado "{title}", responde de forma clara,
+concreta y profesional cada una de las preguntas numeradas.
+
+Muy importante:
+- Usa solo la información que aparece en el contenido.
+- Si el contenido NO tiene información suficiente para responder algo (por ejemplo, licencias,
+certificados, precios o tiempos), informa que pueden ampliar la información cotizando en la página web.
+- No inventes datos ni normativas que no aparezcan aquí.
+- Cada respuesta debe ser un solo bloque de texto, sin listas numeradas a menos que el contenido lo sugiera claramente.
+- Responde como si fueras parte del equipo de Deseguridad.net, intentando acortar el camino del usuario con pasos adicionales, como contactar nuevamente a la empresa.
+{BATCH_FORMAT_INSTRUCTIONS}
+
+Contenido:
+{text_chunk}
+
+Preguntas:
+{format_numbered_questions(questions)}
+
+Respuesta JSON:"""
+
+    with profiler.stage("llm_batch"):
+        return call_llm(prompt, is_valid=lambda raw: batch_is_complete(raw, len(questions)))
 
 
 # ==========================
 # HTML DESDE URL
 # ==========================
 
+def get_fetcher() -> Fetcher:
+    global fetcher
+    if fetcher is None:
+        fetcher = Fetcher(
+            max_workers=HTTP_MAX_WORKERS,
+            per_host=HTTP_PER_HOST,
+            min_delay=HTTP_MIN_DELAY,
+            timeout=HTTP_TIMEOUT,
+            cache_path=HTTP_CACHE_PATH,
+        )
+    return fetcher
+
+
 def fetch_html(url: str) -> str:
-    try:
-        resp = requests.get(url, timeout=HTTP_TIMEOUT)
-        resp.raise_for_status()
-        return resp.text
-    except Exception as e:
-        print(f"  ⚠️  Error al descargar {url}: {e}")
+    result = get_fetcher().fetch(url)
+    profiler.add("fetch", result.elapsed, doc=url)
+    if result.error:
+        print(f"  ⚠️  Error al descargar {url}: {result.error}")
         return ""
+    return result.text
 
 
-def extract_html_content_from_url(url: str) -> tuple:
-    html = fetch_html(url)
-    if not html:
-        return "", ""
+def fetch_all_html(urls: list) -> tuple:
+    """
+    Descarga todas las URLs en paralelo (respetando el límite por host).
+    Devuelve (pages, transient):
+    - pages: {url: html}; las URLs con error quedan con ""
+    - transient: URLs cuyo error puede ser pasajero (red, 429, 5xx)
+    """
+    pages, transient = {}, set()
+    for result in get_fetcher().fetch_many(urls):
+        profiler.add("fetch", result.elapsed, doc=result.url)
+        if result.error:
+            print(f"  ⚠️  Error al descargar {result.url}: {result.error}")
+            if result.transient:
+                transient.add(result.url)
+        pages[result.url] = result.text if not result.error else ""
+    return pages, transient
+
+
+def crawl_site(start_urls: list, sitemap_urls: list, known_lastmod: dict,
+               max_pages: int = CRAWL_MAX_PAGES, max_depth: int = CRAWL_MAX_DEPTH) -> tuple:
+    """
+    Rastrea el sitio (site_crawler.py) y devuelve (urls, pages, lastmods, unchanged, transient):
+    - urls: en orden de descubrimiento (sin las noindex ni los duplicados por canonical)
+    - pages: {url: html} de las descargadas ("" si hubo error)
+    - lastmods: {url: lastmod del sitemap}
+    - unchanged: URLs no descargadas porque su lastmod coincide con `known_lastmod`
+    - transient: URLs cuyo error puede ser pasajero (red, 429, 5xx)
+    """
+    crawler = SiteCrawler(get_fetcher(), max_pages=max_pages, max_depth=max_depth)
+    with profiler.stage("crawl"):
+        crawled = crawler.crawl(start_urls, sitemap_urls, known_lastmod, use_robots_sitemaps=not sitemap_urls)
+
+    urls, pages, lastmods, unchanged, transient = [], {}, {}, set(), set()
+    for page in crawled:
+        urls.append(page.url)
+        if page.lastmod:
+            lastmods[page.url] = page.lastmod
+        if page.unchanged:
+            unchanged.add(page.url)
+        else:
+            if page.error:
+                print(f"  ⚠️  Error al descargar {page.url}: {page.error}")
+            if page.transient:
+                transient.add(page.url)
+            pages[page.url] = page.html or ""
+    print(f"  → {crawler.summary()}")
+    return urls, pages, lastmods, unchanged, transient
 
-    soup = BeautifulSoup(html, "html.parser")
 
-    for selector in ["header", "footer", "nav", "aside"]:
-        for tag in soup.find_all(selector):
-            tag.decompose()
+def load_service_slugs(path: str) -> list:
+    """
+    Un slug por línea; se ignoran las líneas vacías y las que empiezan por #.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip().strip("/").lower() for line in f if line.strip() and not line.startswith("#")]
 
-    for css_selector in [
-        ".site-header",
-        ".site-footer",
-        "#site-header",
-        "#site-footer",
-        ".main-navigation",
-        ".menu-principal",
-        ".elementor-location-header",
-        ".elementor-location-footer"
-    ]:
-        for tag in soup.select(css_selector):
-            tag.decompose()
 
-    raw_title = soup.find("title").get_text().strip() if soup.find("title") else ""
-    title = normalize_title(raw_title)
+def extract_page_blocks(url: str, html: str, html_backend: str = HTML_BACKEND) -> tuple:
+    """
+    (title, blocks) de una página descargada; blocks es None si no hay contenedor principal.
+    """
+    with profiler.stage("extract_html", doc=url):
+        return extract_html_blocks(html, html_backend)
 
-    main_container = soup.find("main") or soup.find("article") or soup.body
 
-    if not main_container:
+def page_text(title: str, blocks: list, boilerplate: BoilerplateDetector = None) -> str:
+    """
+    Une los bloques de la página, sin los repetidos en todo el sitio si hay detector.
+    """
+    if blocks is None:
         print("  ⚠️  No se encontró <main>, <article> ni <body> útil.")
-        return title, ""
-
-    text_parts = []
-    for tag in main_container.find_all(["h1", "h2", "h3", "h4", "p", "li"]):
-        txt = tag.get_text(strip=True)
-        if txt:
-            text_parts.append(txt)
+        return ""
 
-    full_text = " ".join(text_parts)
+    if boilerplate is not None:
+        blocks = boilerplate.filter(blocks, budget=PROMPT_CHAR_BUDGET)
+    full_text = " ".join(blocks)
 
     print(f"  → Título detectado: '{title}'")
     print(f"  → Longitud de texto extraído: {len(full_text)} caracteres")
 
-    return title, full_text
+    return full_text
+
+
+def extract_html_content_from_url(url: str, html: str = None, html_backend: str = HTML_BACKEND,
+                                  boilerplate: BoilerplateDetector = None) -> tuple:
+    if html is None:
+        html = fetch_html(url)
+    if not html:
+        return "", ""
+
+    title, blocks = extract_page_blocks(url, html, html_backend)
+    return title, page_text(title, blocks, boilerplate)
+
+
+def build_boilerplate_detector(extracted: dict, urls: list) -> BoilerplateDetector:
+    """
+    Detector con las huellas de la ejecución anterior más las páginas extraídas ahora.
+    Se conservan las huellas de las páginas no descargadas (lastmod sin cambios); main()
+    lo guarda al terminar, junto con lo que se ahorró.
+    """
+    detector = BoilerplateDetector()
+    cache_path = boilerplate_path_for(OUTPUT_CSV)
+    cached = detector.load(cache_path)
+    with profiler.stage("boilerplate"):
+        for url, (_, blocks) in extracted.items():
+            detector.add_page(url, blocks)
+        detector.prune(urls)
+        detector.compute()
+    print(f"🧹 Boilerplate: {len(detector.fingerprints)} bloques repetidos en {len(detector.documents)} páginas"
+          f"{f' ({cached} de la ejecución anterior)' if cached else ''}")
+    for pages, sample in detector.top_blocks():
+        print(f"   {pages:>4} páginas: {sample[:80]}")
+    return detector
 
 
 # ==========================
 # MAIN
 # ==========================
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera la base de conocimientos desde las URLs de deseguridad.net.")
+    parser.add_argument(
+        "--url", action="append", default=[], metavar="URL",
+        help="URL a procesar (repetible); sustituye a la lista URLS / \"urls\" de la configuración",
+    )
+    parser.add_argument(
+        "--output",
+        help=f"CSV de salida (por defecto \"output_csv\" de la configuración o {OUTPUT_CSV})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=LLM_MAX_WORKERS,
+        help=f"Peticiones simultáneas al LLM por página (por defecto {LLM_MAX_WORKERS}; 1 = secuencial)",
+    )
+    parser.add_argument(
+        "--batch", action=argparse.BooleanOptionalAction, default=LLM_BATCH_MODE,
+        help="Una sola llamada al LLM por página con todas sus preguntas (respuesta en JSON)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="No leer ni escribir la caché de respuestas del LLM",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Ignorar las respuestas guardadas en caché y volver a pedirlas (se actualiza la caché)",
+    )
+    parser.add_argument(
+        "--cache-path", default=LLM_CACHE_PATH,
+        help=f"Archivo SQLite de la caché del LLM (por defecto {LLM_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--fetch-workers", type=int, default=HTTP_MAX_WORKERS,
+        help=f"Descargas HTTP simultáneas (por defecto {HTTP_MAX_WORKERS}; máximo {HTTP_PER_HOST} por host)",
+    )
+    parser.add_argument(
+        "--no-http-cache", action="store_true",
+        help="Descargar siempre las páginas completas (sin GET condicional ETag/Last-Modified)",
+    )
+    parser.add_argument(
+        "--html-backend", default=HTML_BACKEND, choices=["auto"] + available_backends(),
+        help="Parser HTML: lxml (rápido), bs4 (html.parser) o auto (lxml si está instalado)",
+    )
+    parser.add_argument(
+        "--boilerplate", action=argparse.BooleanOptionalAction, default=BOILERPLATE_FILTER,
+        help="Quitar los bloques de texto repetidos en muchas páginas antes del prompt (--no-boilerplate para desactivarlo)",
+    )
+    parser.add_argument(
+        "--search-columns", action=argparse.BooleanOptionalAction, default=SEARCH_COLUMNS,
+        help="Añadir al CSV las columnas search_* (texto normalizado, raíces y frecuencias) tras las cinco del plugin",
+    )
+    parser.add_argument(
+        "--context", default=CONTEXT_MODE, choices=CONTEXT_MODES,
+        help=f"Contenido del prompt: prefix (primeros {PROMPT_CHAR_BUDGET} caracteres) o chunks (pasajes relevantes por pregunta)",
+    )
+    parser.add_argument(
+        "--crawl", action="store_true",
+        help="Rastrear el sitio (sitemap + enlaces internos) en lugar de usar la lista URLS",
+    )
+    parser.add_argument(
+        "--sitemap", action="append", default=[], metavar="URL",
+        help=f"Sitemap a leer en modo --crawl (repetible; por defecto {SITE_ROOT}sitemap.xml o los de robots.txt)",
+    )
+    parser.add_argument(
+        "--start", action="append", default=[], metavar="URL",
+        help=f"URL de inicio del rastreo (repetible; por defecto {SITE_ROOT})",
+    )
+    parser.add_argument(
+        "--max-pages", type=int, default=CRAWL_MAX_PAGES,
+        help=f"Máximo de páginas del rastreo (por defecto {CRAWL_MAX_PAGES})",
+    )
+    parser.add_argument(
+        "--max-depth", type=int, default=CRAWL_MAX_DEPTH,
+        help=f"Profundidad máxima de enlaces desde las semillas (por defecto {CRAWL_MAX_DEPTH})",
+    )
+    parser.add_argument(
+        "--service-slugs", metavar="ARCHIVO",
+        help="Archivo con los slugs de las páginas de servicio (uno por línea) en lugar de SERVICE_SLUGS",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Reconstruir todo el CSV ignorando el manifiesto incremental",
+    )
+    parser.add_argument(
+        "--llm-rate", type=float, default=LLM_RATE,
+        help=f"Peticiones por segundo al LLM al empezar; se ajusta solo ante 429 (por defecto {LLM_RATE}, máximo {LLM_MAX_RATE})",
+    )
+    parser.add_argument(
+        "--config", default=LLM_CONFIG_PATH,
+        help="Archivo JSON de configuración: LLM y sección \"site\" (por defecto kb_config.json o $RAGKB_CONFIG)",
+    )
+    parser.add_argument(
+        "--llm-metrics",
+        help="JSON con la telemetría de cada llamada al LLM (por defecto <salida>.llm_metrics.json)",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Medir el pico de memoria con tracemalloc (más lento)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Guardar cProfile (.profile.prof) y pilas muestreadas para flamegraph (.profile.folded); implica --trace-memory",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Reanudar una ejecución interrumpida reutilizando las respuestas de su diario (.journal.jsonl)",
+    )
+    return parser.parse_args()
+
+
 def main():
-    knowledge_base = []
+    args = parse_args()
+    configure(args.config, args.url, args.output)
+    args.llm_metrics = args.llm_metrics or metrics_path_for(OUTPUT_CSV)
+    profiler.start(trace_memory=args.trace_memory, profile=args.profile)
 
     print("Procesando URLs del sitio con LLM (versión mejorada por tipo de página)...\n")
-    print(f"Salida: {OUTPUT_CSV}\n")
+    print(f"Salida: {OUTPUT_CSV}")
+    print(f"Peticiones simultáneas al LLM: {args.workers}")
+    print(f"Modo por lotes: {'sí' if args.batch else 'no'}")
+    print(f"Contexto del prompt: {args.context}")
+
+    global SERVICE_SLUGS
+    if args.service_slugs:
+        SERVICE_SLUGS = load_service_slugs(args.service_slugs)
+        print(f"Slugs de servicio: {len(SERVICE_SLUGS)} desde {args.service_slugs}")
+
+    global llm_cache
+    if args.no_cache:
+        print("Caché LLM: desactivada\n")
+    else:
+        llm_cache = LLMCache(
+            args.cache_path,
+            max_age_days=LLM_CACHE_MAX_AGE_DAYS,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            refresh=args.refresh,
+        )
+        print(f"Caché LLM: {args.cache_path}{' (refresh)' if args.refresh else ''}\n")
+
+    # Manifiesto incremental: solo se regeneran las páginas que cambiaron
+    manifest_path = manifest_path_for(OUTPUT_CSV)
+    previous_manifest = {} if args.full else load_manifest(manifest_path)
+    previous_rows = {} if args.full else load_previous_rows(OUTPUT_CSV)
+    manifest = {}
+    reused_pages = 0
+    regenerated_pages = 0
+
+    # Las filas se escriben en OUTPUT_CSV.partial a medida que se generan y cada respuesta
+    # queda en el diario: si la ejecución se corta, --resume retoma donde se quedó.
+    journal_path = journal_path_for(OUTPUT_CSV)
+    if not args.resume and os.path.exists(journal_path) and os.path.getsize(journal_path):
+        print(f"⚠️  Hay un diario de una ejecución interrumpida ({journal_path}); se descarta. Usa --resume para reanudarla.")
+    journal = ResumeJournal(journal_path, resume=args.resume)
+    if args.resume:
+        print(f"⏯️  Reanudando: {len(journal.done)} respuestas en el diario")
+    writer = KBStreamWriter(OUTPUT_CSV, search_columns=args.search_columns)
+    failed_log = FailedItemsLog(failed_path_for(OUTPUT_CSV))
+    client = get_llm_client(args.llm_rate, args.config)
+
+    # Fase de descarga: todas las URLs en paralelo antes de generar
+    global fetcher
+    fetcher = Fetcher(
+        max_workers=args.fetch_workers,
+        per_host=HTTP_PER_HOST,
+        min_delay=HTTP_MIN_DELAY,
+        timeout=HTTP_TIMEOUT,
+        cache_path=None if args.no_http_cache else HTTP_CACHE_PATH,
+    )
+    if args.crawl:
+        start_urls = args.start or [SITE_ROOT]
+        # Sin --sitemap: se usan los "Sitemap:" de robots.txt (o solo los enlaces si no hay)
+        print(f"🕷️  Rastreando desde {', '.join(start_urls)}...")
+        # lastmod de la ejecución anterior: solo cuentan las páginas cuyas filas siguen en el CSV
+        known_lastmod = {
+            url: entry["lastmod"]
+            for url, entry in previous_manifest.items()
+            if entry.get("lastmod") and previous_rows.get(entry.get("source_url", url))
+        }
+        # Las páginas sin cambios no se descargan y sus enlaces no se siguen: las URLs de la
+        # ejecución anterior se añaden como semillas para no perder las que solo se alcanzaban así.
+        # Las que ya no existen (404/410) o pasaron a noindex se eliminan más abajo.
+        seeds = start_urls + [url for url in previous_manifest if url not in known_lastmod]
+        urls, pages, lastmods, unchanged_urls, transient_urls = crawl_site(
+            seeds, args.sitemap, known_lastmod, args.max_pages, args.max_depth
+        )
+    else:
+        urls, lastmods, unchanged_urls = URLS, {}, set()
+        print(f"⬇️  Descargando {len(urls)} URLs...")
+        pages, transient_urls = fetch_all_html(urls)
+    print(f"  → {fetcher.summary()}\n")
+
+    # Fase de extracción: todas las páginas antes de generar, para detectar el boilerplate
+    extracted = {
+        url: extract_page_blocks(url, html, args.html_backend)
+        for url, html in pages.items() if html
+    }
+    boilerplate = build_boilerplate_detector(extracted, urls) if args.boilerplate else None
+    if boilerplate is not None:
+        print()
 
-    for url in URLS:
+    for url in urls:
         print(f"🌐 Procesando URL: {url}")
 
         category, source_url = get_category_and_url(url)
         page_type = classify_page_type(url, category)
         print(f"  → Tipo de página detectado: {page_type} | Categoría: {category}")
 
-        title, text = extract_html_content_from_url(url)
+        if url in unchanged_urls:
+            print(f"  ♻️  Sin cambios según el sitemap (lastmod {lastmods[url]}): se reutilizan {len(previous_rows[source_url])} respuestas anteriores.\n")
+            manifest[url] = previous_manifest[url]
+            with profiler.stage("write"):
+                writer.write_rows(previous_rows[source_url])
+            reused_pages += 1
+            continue
+
+        title, text = "", ""
+        if url in extracted:
+            title, blocks = extracted[url]
+            text = page_text(title, blocks, boilerplate)
         source = "Web (HTML)"
 
         if not text:
-            print("  ⚠️  Texto vacío después de limpiar header/footer. Se omite.\n")
+            if url in transient_urls and url in previous_manifest and previous_rows.get(source_url):
+                # Fallo temporal de descarga (red, 429, 5xx): se conservan las filas anteriores
+                print("  ⚠️  Error temporal de descarga; se conservan las respuestas de la ejecución anterior.\n")
+                manifest[url] = previous_manifest[url]
+                with profiler.stage("write"):
+                    writer.write_rows(previous_rows[source_url])
+                reused_pages += 1
+            elif url in previous_manifest:
+                # 404/410 o página sin contenido: sale del manifiesto y sus filas se eliminan
+                print("  🗑️  La página ya no existe o no tiene contenido; se eliminan sus respuestas anteriores.\n")
+            else:
+                print("  ⚠️  Texto vacío después de limpiar header/footer. Se omite.\n")
             continue
 
         preguntas = generate_questions_by_type(page_type, title)
-        print(f"  → Generando {len(preguntas)} respuestas con LLM...")
+        entry = make_entry(text, preguntas, client.model, source_url, args.context)
+        if url in lastmods:
+            # No interviene en is_unchanged(): solo decide si el próximo rastreo descarga la página
+            entry["lastmod"] = lastmods[url]
+
+        if is_unchanged(previous_manifest.get(url), entry) and previous_rows.get(source_url):
+            print(f"  ♻️  Sin cambios: se reutilizan {len(previous_rows[source_url])} respuestas anteriores.\n")
+            # La entrada nueva lleva el lastmod actual del sitemap
+            manifest[url] = entry
+            with profiler.stage("write"):
+                writer.write_rows(previous_rows[source_url])
+            reused_pages += 1
+            continue
 
-        for pregunta in preguntas:
-            respuesta = generate_answer_with_llm(pregunta, text, title, page_type)
+        fingerprint = entry_fingerprint(entry)
+        page_rows = [journal.get(url, fingerprint, pregunta) for pregunta in preguntas]
+        pendientes = [pregunta for pregunta, row in zip(preguntas, page_rows) if row is None]
+
+        if len(pendientes) < len(preguntas):
+            print(f"  ⏯️  {len(preguntas) - len(pendientes)} respuestas recuperadas del diario")
+        if pendientes:
+            print(f"  → Generando {len(pendientes)} respuestas con LLM...")
+
+        answer_fn = lambda pregunta: generate_answer_with_llm(pregunta, text, title, page_type, args.context)
+
+        with profiler.stage("llm", doc=url):
+            if not pendientes:
+                respuestas = []
+            elif args.batch:
+                respuestas = generate_answers_batched(
+                    pendientes,
+                    lambda lote: generate_batch_answers_with_llm(lote, text, title, page_type, args.context),
+                    answer_fn,
+                    max_workers=args.workers,
+                )
+            else:
+                respuestas = generate_answers_concurrently(
+                    pendientes, answer_fn, max_workers=args.workers
+                )
+
+        nuevas = {}
+        fallidas = 0
+        with profiler.stage("journal"):
+            for pregunta, respuesta in zip(pendientes, respuestas):
+                if respuesta is None:
+                    # Sin respuesta del LLM: se registra para reintentarla, no se escribe en el CSV
+                    failed_log.record(url, pregunta, source_url)
+                    fallidas += 1
+                    continue
+                nuevas[pregunta] = {
+                    "question": pregunta,
+                    "answer": respuesta,
+                    "category": category,
+                    "source": source,
+                    "source_url": source_url
+                }
+                journal.record(url, fingerprint, nuevas[pregunta])
+
+        with profiler.stage("write"):
+            writer.write_rows([
+                row or nuevas[pregunta]
+                for pregunta, row in zip(preguntas, page_rows)
+                if row or pregunta in nuevas
+            ])
 
-            knowledge_base.append({
-                "question": pregunta,
-                "answer": respuesta,
-                "category": category,
-                "source": source,
-                "source_url": source_url
-            })
+        if fallidas:
+            # La página queda fuera del manifiesto: se completará en la próxima ejecución
+            print(f"  ⚠️  {fallidas} preguntas sin respuesta del LLM (se reintentarán).\n")
+            continue
 
+        manifest[url] = entry
+        regenerated_pages += 1
         print(f"  ✅ {len(preguntas)} preguntas generadas para esta página.\n")
 
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f, delimiter=";")
-        writer.writerow(["question", "answer", "category", "source", "source_url"])
-
-        for item in knowledge_base:
-            writer.writerow([
-                item["question"],
-                item["answer"],
-                item["category"],
-                item["source"],
-                item["source_url"],
-            ])
-
-    print(f"\n✅ Base de conocimientos creada con {len(knowledge_base)} registros.")
+    with profiler.stage("write"):
+        writer.commit()
+        save_manifest(manifest_path, manifest)
+    failed_log.close()
+    if failed_log.count:
+        # Se conserva el diario para reanudar solo lo que falta
+        journal.close()
+    else:
+        journal.finish()
+    pruned_pages = len(set(previous_manifest) - set(manifest))
+
+    print(f"\n✅ Base de conocimientos creada con {writer.rows_written} registros.")
+    print(f"♻️  Páginas reutilizadas: {reused_pages} | regeneradas: {regenerated_pages} | eliminadas: {pruned_pages}")
+    if boilerplate is not None:
+        boilerplate.save(boilerplate_path_for(OUTPUT_CSV))
+        print(f"🧹 {boilerplate.summary()}")
+    print(f"🤖 {client.summary()}")
+    for line in client.telemetry.report_lines():
+        print(f"   {line}")
+    client.telemetry.save(args.llm_metrics, {
+        "script": os.path.basename(__file__),
+        "batch": args.batch,
+        "workers": args.workers,
+        "context": args.context,
+        "rows": writer.rows_written,
+        "failed": failed_log.count,
+    })
+    print(f"📊 Telemetría del LLM: {args.llm_metrics}")
+    client.close()
+
+    report = profiler.stop()
+    print("⏱️  Tiempos por etapa:")
+    for line in profiler.report_lines(report):
+        print(f"   {line}")
+    for path in profiler.save(profile_paths_for(OUTPUT_CSV), report, {"script": os.path.basename(__file__)}):
+        print(f"📊 Perfil: {path}")
+    if llm_cache is not None:
+        print(f"💾 {llm_cache.summary()}")
+        llm_cache.close()
+    fetcher.close()
+    if failed_log.count:
+        print(f"⚠️  {failed_log.count} preguntas sin respuesta en {failed_log.path}.")
+        print("   Vuelve a ejecutar con --resume para pedir solo las que faltan.")
     print(f"📄 Archivo generado: {OUTPUT_CSV}")
     print("\nPróximo paso:")
     print("  1. Abre el admin de WordPress → RAG Chatbot → Base de Conocimientos")
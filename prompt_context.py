@@ -0,0 +1,221 @@
+"""
+Selección del contenido que se envía al LLM.
+
+En lugar de truncar la página a los primeros 3000 caracteres:
+- se divide el texto en pasajes solapados (~PASSAGE_CHARS caracteres),
+- para cada pregunta se puntúan los pasajes con BM25 (términos normalizados, sin stopwords,
+  con stemming ligero y algunos sinónimos de precio/tiempo/licencia),
+- se eligen los mejores hasta llenar un presupuesto de tokens y se devuelven en el orden
+  original de la página (los pasajes contiguos se fusionan sin repetir el solape).
+
+Modos (CONTEXT_MODE en los scripts):
+- "prefix": comportamiento anterior, full_text[:3000].
+- "chunks": pasajes seleccionados por relevancia.
+"""
+
+import math
+from collections import Counter
+from functools import lru_cache
+
+from kb_text import content_terms, light_stem
+
+PASSAGE_CHARS = 600
+PASSAGE_OVERLAP = 150
+
+# Presupuesto por pregunta y para el modo por lotes (todas las preguntas de la página)
+CONTEXT_TOKEN_BUDGET = 300
+BATCH_CONTEXT_TOKEN_BUDGET = 750
+
+# Aproximación habitual: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Las plantillas preguntan por precios, tiempos o licencias con palabras que la página
+# no siempre usa; se amplía la consulta con equivalentes habituales.
+_EXPANSIONS = {
+    "precio": ["costo", "valor", "tarifa", "inversion", "cotizacion", "cotizar"],
+    "inversion": ["precio", "costo", "valor", "tarifa"],
+    "tiempo": ["duracion", "dias", "semanas", "horas", "plazo", "demora", "tarda"],
+    "demora": ["tiempo", "duracion", "dias", "plazo"],
+    "tardar": ["tiempo", "duracion", "dias", "plazo"],
+    "licencia": ["licencias", "certificado", "certificacion", "habilitacion", "resolucion", "acreditacion"],
+    "contratar": ["cotizar", "cotizacion", "contacto", "whatsapp", "solicitar", "escribenos"],
+    "incluye": ["incluimos", "entregables", "informe", "alcance"],
+    "donde": ["ciudad", "ciudades", "colombia", "sede", "modalidad", "virtual", "presencial"],
+}
+QUERY_EXPANSIONS = {
+    light_stem(word): sorted({light_stem(extra) for extra in extras})
+    for word, extras in _EXPANSIONS.items()
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_passages(text: str, size: int = PASSAGE_CHARS, overlap: int = PASSAGE_OVERLAP) -> tuple:
+    """
+    Divide el texto en pasajes de ~size caracteres que se solapan ~overlap caracteres,
+    sin cortar palabras. Devuelve (palabras, [(inicio, fin) en índices de palabra]).
+    """
+    words = text.split()
+    spans = []
+    start = 0
+
+    while start < len(words):
+        end = start
+        length = 0
+        while end < len(words) and (length < size or end == start):
+            length += len(words[end]) + 1
+            end += 1
+        spans.append((start, end))
+
+        if end >= len(words):
+            break
+
+        # Retroceder hasta cubrir ~overlap caracteres del pasaje anterior
+        next_start = end
+        covered = 0
+        while next_start > start + 1 and covered < overlap:
+            next_start -= 1
+            covered += len(words[next_start]) + 1
+        start = next_start
+
+    return words, spans
+
+
+class PassageIndex:
+    """
+    Pasajes de una página con sus términos, listos para puntuar con BM25.
+    """
+
+    def __init__(self, text: str, size: int = PASSAGE_CHARS, overlap: int = PASSAGE_OVERLAP):
+        self.text = text
+        self.words, self.spans = split_passages(text, size, overlap)
+        self.term_counts = [
+            Counter(content_terms(" ".join(self.words[start:end])))
+            for start, end in self.spans
+        ]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for counts in self.term_counts:
+            doc_freq.update(counts.keys())
+        total = len(self.spans)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def query_weights(self, question: str) -> dict:
+        """
+        Términos de la pregunta con su peso (los sinónimos añadidos pesan la mitad).
+        """
+        weights = {}
+        for term in content_terms(question):
+            weights[term] = 1.0
+        for term in list(weights):
+            for extra in QUERY_EXPANSIONS.get(term, []):
+                weights.setdefault(extra, 0.5)
+        return weights
+
+    def scores(self, question: str) -> list:
+        weights = self.query_weights(question)
+        result = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * (length / self.avg_length if self.avg_length else 0))
+            for term, weight in weights.items():
+                tf = counts.get(term)
+                if tf:
+                    score += weight * self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            result.append(score)
+        return result
+
+    def select(self, scores: list, budget_tokens: int) -> str:
+        """
+        Elige los pasajes con mejor puntuación hasta llenar el presupuesto y los devuelve
+        en el orden de la página. Sin coincidencias, se usan los primeros pasajes.
+        """
+        budget_chars = budget_tokens * CHARS_PER_TOKEN
+        if len(self.text) <= budget_chars:
+            return self.text
+
+        # Mejor puntuación primero; a igualdad, el pasaje que aparece antes
+        order = sorted(range(len(self.spans)), key=lambda i: (-scores[i], i))
+
+        covered = set()
+        used = 0
+        for i in order:
+            start, end = self.spans[i]
+            new_words = [w for w in range(start, end) if w not in covered]
+            cost = sum(len(self.words[w]) + 1 for w in new_words)
+            if used and used + cost > budget_chars:
+                continue
+            covered.update(new_words)
+            used += cost
+            if used >= budget_chars:
+                break
+
+        # Reconstruir en orden, marcando los saltos entre tramos no contiguos
+        pieces = []
+        current = []
+        previous = None
+        for w in sorted(covered):
+            if previous is not None and w != previous + 1:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(self.words[w])
+            previous = w
+        if current:
+            pieces.append(" ".join(current))
+
+        return " [...] ".join(pieces)
+
+    def context_for(self, question: str, budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> str:
+        return self.select(self.scores(question), budget_tokens)
+
+    def context_for_many(self, questions: list, budget_tokens: int = BATCH_CONTEXT_TOKEN_BUDGET) -> str:
+        """
+        Contexto común para varias preguntas (modo por lotes): se suma la puntuación
+        normalizada de cada pregunta, para que todas aporten sus pasajes.
+        """
+        combined = [0.0] * len(self.spans)
+        for question in questions:
+            scores = self.scores(question)
+            best = max(scores) if scores else 0.0
+            if best > 0:
+                for i, score in enumerate(scores):
+                    combined[i] += score / best
+        return self.select(combined, budget_tokens)
+
+
+@lru_cache(maxsize=32)
+def get_passage_index(text: str) -> PassageIndex:
+    """
+    Índice de pasajes por página (las preguntas de una misma página lo comparten).
+    """
+    return PassageIndex(text)
+
+
+def build_context(question: str, full_text: str, mode: str = "prefix", prefix_chars: int = 3000,
+                  budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Contenido para el prompt de una pregunta según el modo.
+    """
+    if mode == "chunks":
+        return get_passage_index(full_text).context_for(question, budget_tokens)
+    return full_text[:prefix_chars]
+
+
+def build_batch_context(questions: list, full_text: str, mode: str = "prefix", prefix_chars: int = 3000,
+                        budget_tokens: int = BATCH_CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Contenido para el prompt por lotes (todas las preguntas de la página).
+    """
+    if mode == "chunks":
+        return get_passage_index(full_text).context_for_many(questions, budget_tokens)
+    return full_text[:prefix_chars]
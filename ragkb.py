@@ -0,0 +1,195 @@
+"""
+CLI única de las herramientas de la base de conocimientos.
+
+Cada subcomando importa su script solo al ejecutarse (`ragkb --help` no carga requests,
+bs4, numpy...) y le pasa el resto de argumentos tal cual: `ragkb dedup --help` muestra
+la ayuda de kb_dedup.py.
+
+    ragkb [--config kb_config.json] <comando> [argumentos del comando]
+
+    crawl                       process_site.py --crawl (sitemap + enlaces internos)
+    extract                     texto de HTML/PDF/DOCX sin LLM, en JSONL
+    generate docs|site          process_docs.py / process_site.py
+    dedup                       kb_dedup.py
+    index                       kb_index.py (build / query)
+    bench retrieval|pipeline|html
+                                bench_retrieval.py / bench_pipeline.py / bench_html_extract.py
+    store / sql / hot           kb_store.py / kb_sql_export.py / hot_queries.py
+    config                      configuración efectiva (archivo + entorno)
+
+--config se propaga a todos los scripts a través de RAGKB_CONFIG (ver kb_config.py).
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+# Comando -> (módulo, argumentos fijos, ayuda)
+COMMANDS = {
+    "crawl": ("process_site", ["--crawl"], "Rastrear el sitio y generar la KB (process_site.py --crawl)"),
+    "dedup": ("kb_dedup", [], "Detectar o colapsar preguntas casi duplicadas (kb_dedup.py)"),
+    "index": ("kb_index", [], "Índice BM25F offline: build / query (kb_index.py)"),
+    "store": ("kb_store", [], "Almacén binario .rkb: convert / info / show (kb_store.py)"),
+    "sql": ("kb_sql_export", [], "Script SQL para la carga masiva (kb_sql_export.py)"),
+    "hot": ("hot_queries", [], "Caché de consultas frecuentes: build / lookup (hot_queries.py)"),
+}
+
+# Comandos con destino: ragkb generate docs ...
+TARGET_COMMANDS = {
+    "generate": ({"docs": "process_docs", "site": "process_site"}, "Generar la KB con el LLM desde archivos (docs) o URLs (site)"),
+    "bench": (
+        {"retrieval": "bench_retrieval", "pipeline": "bench_pipeline", "html": "bench_html_extract"},
+        "Benchmarks: recuperación, pipeline completo o extracción HTML",
+    ),
+}
+
+LOCAL_COMMANDS = {
+    "extract": "Extraer el texto de HTML/PDF/DOCX sin llamar al LLM (JSONL)",
+    "config": "Mostrar la configuración efectiva (archivo + variables RAGKB_*)",
+}
+
+
+def run_module(module_name: str, argv: list, prog: str) -> None:
+    """
+    Ejecuta main() del script con `argv` como si se hubiera lanzado desde la línea de comandos.
+    """
+    module = importlib.import_module(module_name)
+    saved_argv = sys.argv
+    sys.argv = [prog] + argv
+    try:
+        module.main()
+    finally:
+        sys.argv = saved_argv
+
+
+# ==========================
+# COMANDOS PROPIOS
+# ==========================
+
+def cmd_extract(argv: list) -> None:
+    import process_docs
+    from html_extract import DEFAULT_BACKEND, available_backends
+
+    parser = argparse.ArgumentParser(
+        prog="ragkb extract",
+        description="Extrae título y texto de los archivos soportados (extractors.py) sin llamar al LLM.",
+    )
+    parser.add_argument("--root-dir", help="Carpeta con los archivos (por defecto la de la configuración \"docs\")")
+    parser.add_argument("--base-url", help="URL base para source_url")
+    parser.add_argument("-o", "--output", default="-", help="JSONL de salida (por defecto la salida estándar)")
+    parser.add_argument("--extract-workers", type=int, default=1,
+                        help="Procesos de extracción (por defecto 1: sin pool, arranque inmediato)")
+    parser.add_argument("--html-backend", default=DEFAULT_BACKEND, choices=["auto"] + available_backends())
+    parser.add_argument("--full-extract", action="store_true", help="Extraer PDF/DOCX completos")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    process_docs.configure(root_dir=args.root_dir, base_url=args.base_url)
+    file_paths = process_docs.discover_files(process_docs.ROOT_DIR)
+    max_chars = None if args.full_extract else process_docs.EXTRACT_CHAR_BUDGET
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    extracted = chars = 0
+    try:
+        for _, file_path, title, text in process_docs.iter_extracted_files(
+            file_paths, args.extract_workers, 0, max_chars, args.html_backend
+        ):
+            category, source_url = process_docs.get_category_and_url(file_path)
+            record = {
+                "path": os.path.relpath(file_path, process_docs.ROOT_DIR).replace(os.sep, "/"),
+                "title": title,
+                "category": category,
+                "source": process_docs.source_label(os.path.splitext(file_path)[1]),
+                "source_url": source_url,
+                "text": text,
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            extracted += 1 if text else 0
+            chars += len(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"📄 {len(file_paths)} archivos en {process_docs.ROOT_DIR} | {extracted} con texto | "
+          f"{chars} caracteres | {elapsed * 1000:.0f} ms", file=sys.stderr)
+
+
+def cmd_config(argv: list) -> None:
+    parser = argparse.ArgumentParser(prog="ragkb config", description="Configuración efectiva de los scripts.")
+    parser.add_argument("--show-key", action="store_true", help="Mostrar la API key completa")
+    args = parser.parse_args(argv)
+
+    import process_docs
+    import process_site
+    from kb_config import load_llm_config
+
+    llm = load_llm_config()
+    if llm["api_key"] and not args.show_key:
+        llm["api_key"] = llm["api_key"][:4] + "…"
+    docs = process_docs.configure()
+    site = process_site.configure()
+    config = {"llm": llm, "docs": docs, "site": site}
+    print(json.dumps(config, ensure_ascii=False, indent=2))
+
+
+# ==========================
+# CLI
+# ==========================
+
+def build_parser() -> argparse.ArgumentParser:
+    lines = []
+    for name, (_, _, help_text) in COMMANDS.items():
+        lines.append(f"  {name:<10} {help_text}")
+    for name, (targets, help_text) in TARGET_COMMANDS.items():
+        lines.append(f"  {name:<10} {help_text} [{'|'.join(targets)}]")
+    for name, help_text in LOCAL_COMMANDS.items():
+        lines.append(f"  {name:<10} {help_text}")
+
+    parser = argparse.ArgumentParser(
+        prog="ragkb",
+        usage="ragkb [--config ARCHIVO] <comando> [argumentos del comando]",
+        description="Herramientas de la base de conocimientos del RAG Chatbot.",
+        epilog="comandos:\n" + "\n".join(sorted(lines)) + "\n\n`ragkb <comando> --help` muestra las opciones de cada uno.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--config", metavar="ARCHIVO",
+        help="Archivo JSON de configuración para todos los comandos (por defecto kb_config.json o $RAGKB_CONFIG)",
+    )
+    parser.add_argument(
+        "command", metavar="comando", help="uno de los comandos de la lista de abajo",
+        choices=sorted(list(COMMANDS) + list(TARGET_COMMANDS) + list(LOCAL_COMMANDS)),
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: list = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.config:
+        os.environ["RAGKB_CONFIG"] = args.config
+
+    if args.command in LOCAL_COMMANDS:
+        globals()["cmd_" + args.command](args.args)
+        return
+
+    if args.command in TARGET_COMMANDS:
+        targets = TARGET_COMMANDS[args.command][0]
+        if not args.args or args.args[0] not in targets:
+            parser.error(f"uso: ragkb {args.command} {{{','.join(targets)}}} [argumentos]")
+        target, rest = args.args[0], args.args[1:]
+        run_module(targets[target], rest, f"ragkb {args.command} {target}")
+        return
+
+    module_name, fixed_args, _ = COMMANDS[args.command]
+    run_module(module_name, fixed_args + args.args, f"ragkb {args.command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Rastreador del sitio para process_site.py (--crawl): sustituye a la lista fija de URLS.
+
+- Semillas: sitemap.xml (también índices de sitemaps y los "Sitemap:" de robots.txt)
+  y/o URLs de inicio desde las que se siguen los enlaces internos hasta `max_depth`.
+- URLs canónicas: esquema y host en minúsculas, sin puerto por defecto, sin fragmento, sin
+  parámetros de seguimiento (utm_*, fbclid...) y con la query ordenada. Se respeta
+  <link rel="canonical"> y <meta name="robots" content="noindex/nofollow">.
+- Frontera acotada (`frontier_limit`) y sin duplicados; como mucho `max_pages` páginas.
+- robots.txt por host (Disallow y Crawl-delay). Las descargas pasan por http_fetch.Fetcher,
+  que limita la concurrencia por host y aplica GET condicional.
+- lastmod del sitemap: las URLs cuyo lastmod coincide con el de la ejecución anterior no se
+  descargan (CrawledPage.unchanged); process_site.py reutiliza sus filas.
+
+Funciona igual contra un servidor estático local (http://127.0.0.1:PUERTO/), útil para pruebas.
+"""
+
+import re
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+from http_fetch import USER_AGENT
+
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_FRONTIER_LIMIT = 5000
+MAX_SITEMAPS = 50
+
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "replytocom", "_ga"}
+
+# Recursos que no son páginas de contenido
+EXCLUDED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".css", ".js", ".json", ".xml",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".zip", ".rar", ".mp3", ".mp4", ".avi", ".woff", ".woff2",
+}
+
+# Rutas de WordPress sin contenido útil para la KB
+EXCLUDED_PATH_PATTERNS = [
+    r"^/wp-(admin|json|login|content|includes)",
+    r"/feed/?$",
+    r"/(tag|author|attachment)/",
+    r"/page/\d+/?$",
+    r"/comments?/",
+    r"/xmlrpc\.php",
+]
+_EXCLUDED_PATH_RE = re.compile("|".join(EXCLUDED_PATH_PATTERNS))
+
+
+def canonicalize_url(url: str, base: str = None):
+    """
+    Forma canónica de una URL http(s), o None si no es rastreable (mailto:, javascript:...).
+    """
+    url = (url or "").strip()
+    if base:
+        url = urljoin(base, url)
+
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in ("http", "https") or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower()
+    if parsed.port and not (scheme == "http" and parsed.port == 80 or scheme == "https" and parsed.port == 443):
+        host = f"{host}:{parsed.port}"
+
+    path = re.sub(r"/{2,}", "/", parsed.path or "/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+def is_excluded(url: str) -> bool:
+    path = urlparse(url).path.lower()
+    extension = path.rsplit(".", 1)[-1] if "." in path.rsplit("/", 1)[-1] else ""
+    return ("." + extension) in EXCLUDED_EXTENSIONS or bool(_EXCLUDED_PATH_RE.search(path))
+
+
+class _PageLinks(HTMLParser):
+    """
+    Enlaces <a href>, <link rel="canonical"> y <meta name="robots"> de una página.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.canonical = None
+        self.base = None
+        self.noindex = False
+        self.nofollow = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href"):
+            if "nofollow" not in (attrs.get("rel") or "").lower():
+                self.links.append(attrs["href"])
+        elif tag == "link" and "canonical" in (attrs.get("rel") or "").lower() and attrs.get("href"):
+            self.canonical = attrs["href"]
+        elif tag == "base" and attrs.get("href"):
+            self.base = attrs["href"]
+        elif tag == "meta" and (attrs.get("name") or "").lower() == "robots":
+            content = (attrs.get("content") or "").lower()
+            self.noindex = "noindex" in content or "none" in content
+            self.nofollow = "nofollow" in content or "none" in content
+
+
+def parse_page_links(html: str) -> _PageLinks:
+    parser = _PageLinks()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # HTML roto: se usa lo que se haya leído
+    return parser
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(xml_text: str) -> tuple:
+    """
+    Devuelve ("urlset", [(loc, lastmod)]) o ("sitemapindex", [(loc, lastmod)]).
+    """
+    root = ElementTree.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    kind = _local_name(root.tag)
+    entries = []
+    for child in root:
+        values = {_local_name(item.tag): (item.text or "").strip() for item in child}
+        if values.get("loc"):
+            entries.append((values["loc"], values.get("lastmod") or None))
+    return kind, entries
+
+
+class CrawledPage:
+    """
+    Página rastreada.
+    - html: cuerpo descargado ("" si hubo error; None si no se descargó por lastmod)
+    - lastmod: del sitemap, si lo había
+    - unchanged: True si se omitió la descarga porque el lastmod no cambió
+    - status / transient: código HTTP de la descarga y si el error puede ser pasajero
+      (FetchResult.transient); process_site.py solo conserva las filas anteriores en ese caso
+    """
+
+    def __init__(self, url: str, html: str = None, lastmod: str = None, depth: int = 0,
+                 unchanged: bool = False, error: str = "", status: int = 0, transient: bool = False):
+        self.url = url
+        self.html = html
+        self.lastmod = lastmod
+        self.depth = depth
+        self.unchanged = unchanged
+        self.error = error
+        self.status = status
+        self.transient = transient
+
+
+class RobotsCache:
+    """
+    robots.txt por host (descargado una sola vez).
+    """
+
+    def __init__(self, fetcher, user_agent: str = USER_AGENT):
+        self.fetcher = fetcher
+        self.user_agent = user_agent
+        self._parsers = {}
+
+    def _parser_for(self, url: str) -> RobotFileParser:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin in self._parsers:
+            return self._parsers[origin]
+
+        parser = RobotFileParser(origin + "/robots.txt")
+        result = self.fetcher.fetch(origin + "/robots.txt")
+        if result.status in (401, 403):
+            parser.disallow_all = True
+        elif result.ok:
+            parser.parse(result.text.splitlines())
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                self.fetcher.set_host_delay(parsed.netloc.lower(), float(delay))
+        else:
+            # Sin robots.txt (404) o inaccesible: todo permitido
+            parser.allow_all = True
+        # can_fetch() lo niega todo mientras no conste que robots.txt se leyó
+        parser.modified()
+        self._parsers[origin] = parser
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        return self._parser_for(url).can_fetch(self.user_agent, url)
+
+    def sitemaps(self, url: str) -> list:
+        return self._parser_for(url).site_maps() or []
+
+
+class SiteCrawler:
+    """
+    Rastreo en anchura con frontera acotada sobre un Fetcher compartido.
+    """
+
+    def __init__(self, fetcher, max_pages: int = DEFAULT_MAX_PAGES, max_depth: int = DEFAULT_MAX_DEPTH,
+                 frontier_limit: int = DEFAULT_FRONTIER_LIMIT, respect_robots: bool = True,
+                 allowed_hosts: set = None):
+        self.fetcher = fetcher
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.frontier_limit = frontier_limit
+        self.robots = RobotsCache(fetcher) if respect_robots else None
+        self.allowed_hosts = set(allowed_hosts or ())
+
+        self.stats = {
+            "sitemap_urls": 0, "fetched": 0, "unchanged": 0, "errors": 0,
+            "robots_blocked": 0, "excluded": 0, "duplicates": 0, "dropped": 0, "noindex": 0,
+        }
+
+    # ------------------------------
+    # Filtros
+    # ------------------------------
+
+    def _accept(self, url: str) -> bool:
+        if urlparse(url).netloc not in self.allowed_hosts:
+            return False
+        if is_excluded(url):
+            self.stats["excluded"] += 1
+            return False
+        if self.robots is not None and not self.robots.allowed(url):
+            self.stats["robots_blocked"] += 1
+            return False
+        return True
+
+    # ------------------------------
+    # Sitemaps
+    # ------------------------------
+
+    def read_sitemaps(self, sitemap_urls: list) -> dict:
+        """
+        {url canónica: lastmod} de los sitemaps (se siguen los índices de sitemaps).
+        """
+        found = {}
+        pending = deque(sitemap_urls)
+        visited = set()
+
+        while pending and len(visited) < MAX_SITEMAPS:
+            sitemap_url = pending.popleft()
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+
+            if sitemap_url.endswith(".gz"):
+                print(f"  ⚠️  Sitemap comprimido no soportado: {sitemap_url}")
+                continue
+
+            result = self.fetcher.fetch(sitemap_url)
+            if not result.ok:
+                print(f"  ⚠️  No se pudo leer el sitemap {sitemap_url}: {result.error or result.status}")
+                continue
+            try:
+                kind, entries = parse_sitemap(result.text)
+            except ElementTree.ParseError as e:
+                print(f"  ⚠️  Sitemap no válido {sitemap_url}: {e}")
+                continue
+
+            for loc, lastmod in entries:
+                if kind == "sitemapindex":
+                    pending.append(loc)
+                    continue
+                url = canonicalize_url(loc)
+                if url and url not in found:
+                    found[url] = lastmod
+
+        self.stats["sitemap_urls"] = len(found)
+        return found
+
+    # ------------------------------
+    # Rastreo
+    # ------------------------------
+
+    def crawl(self, start_urls: list = (), sitemap_urls: list = (), known_lastmod: dict = None,
+              use_robots_sitemaps: bool = False) -> list:
+        """
+        Devuelve las páginas rastreadas (CrawledPage) en orden de descubrimiento:
+        primero las del sitemap, luego las encontradas siguiendo enlaces.
+
+        `known_lastmod` = {url: lastmod} de la ejecución anterior: si el sitemap trae el mismo
+        lastmod, la página no se descarga y se devuelve con unchanged=True.
+        """
+        known_lastmod = known_lastmod or {}
+        seeds = [url for url in (canonicalize_url(u) for u in start_urls) if url]
+        sitemap_urls = list(sitemap_urls)
+
+        if not self.allowed_hosts:
+            # Solo se rastrean los hosts de las semillas
+            origins = seeds + [url for url in (canonicalize_url(u) for u in sitemap_urls) if url]
+            self.allowed_hosts = {urlparse(url).netloc for url in origins}
+        if use_robots_sitemaps and self.robots is not None:
+            for url in seeds:
+                sitemap_urls.extend(sm for sm in self.robots.sitemaps(url) if sm not in sitemap_urls)
+
+        lastmods = self.read_sitemaps(sitemap_urls) if sitemap_urls else {}
+
+        seen = set()
+        frontier = deque()
+        pages = []
+
+        def enqueue(url: str, depth: int) -> None:
+            if url in seen:
+                return
+            if len(frontier) >= self.frontier_limit:
+                self.stats["dropped"] += 1
+                return
+            seen.add(url)
+            frontier.append((url, depth))
+
+        for url in lastmods:
+            if self._accept(url):
+                enqueue(url, 0)
+        for url in seeds:
+            if self._accept(url):
+                enqueue(url, 0)
+
+        batch_size = max(1, self.fetcher.max_workers * 2)
+        while frontier and len(pages) < self.max_pages:
+            batch = []
+            while frontier and len(batch) < min(batch_size, self.max_pages - len(pages)):
+                url, depth = frontier.popleft()
+                lastmod = lastmods.get(url)
+                if lastmod and known_lastmod.get(url) == lastmod:
+                    # Sin cambios según el sitemap: no se descarga (ni se siguen sus enlaces)
+                    pages.append(CrawledPage(url, None, lastmod, depth, unchanged=True))
+                    self.stats["unchanged"] += 1
+                    continue
+                batch.append((url, depth))
+
+            results = self.fetcher.fetch_many([url for url, _ in batch])
+            for (url, depth), result in zip(batch, results):
+                if len(pages) >= self.max_pages:
+                    break
+                if not result.ok:
+                    self.stats["errors"] += 1
+                    pages.append(CrawledPage(
+                        url, "", lastmods.get(url), depth, error=result.error or f"HTTP {result.status} sin contenido",
+                        status=result.status, transient=result.transient,
+                    ))
+                    continue
+                self.stats["fetched"] += 1
+
+                info = parse_page_links(result.text)
+                page_url = url
+                if info.canonical:
+                    canonical = canonicalize_url(info.canonical, url)
+                    if canonical and canonical != url and urlparse(canonical).netloc in self.allowed_hosts:
+                        if canonical in seen:
+                            # Otra URL de una página ya vista o en la frontera: se omite
+                            self.stats["duplicates"] += 1
+                            continue
+                        seen.add(canonical)
+                        page_url = canonical
+
+                if depth < self.max_depth and not info.nofollow:
+                    base = urljoin(url, info.base) if info.base else url
+                    for href in info.links:
+                        link = canonicalize_url(href, base)
+                        if link and link not in seen and self._accept(link):
+                            enqueue(link, depth + 1)
+
+                if info.noindex:
+                    # No se devuelve: si venía de la ejecución anterior, process_site.py la elimina
+                    self.stats["noindex"] += 1
+                    continue
+                pages.append(CrawledPage(page_url, result.text, lastmods.get(url), depth, status=result.status))
+
+        return pages
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"rastreo: {s['sitemap_urls']} URLs en sitemaps, {s['fetched']} descargadas, "
+            f"{s['unchanged']} sin cambios (lastmod), {s['errors']} errores, {s['robots_blocked']} bloqueadas por robots.txt, "
+            f"{s['excluded']} excluidas, {s['duplicates']} duplicadas (canonical), {s['dropped']} descartadas (frontera llena)"
+        )
@@ -0,0 +1,92 @@
+"""
+Clústeres de kb_dedup.py: ninguna fila se marca como duplicada de una canónica con la que no
+supera el umbral, aunque el union-find la haya encadenado (A~B, B~C, pero no A~C).
+
+Uso: python -m pytest -q test_kb_dedup.py
+"""
+
+import os
+import sys
+
+import pytest
+
+import kb_dedup
+from kb_dedup import choose_bands, find_duplicates, jaccard, shingles
+from kb_io import load_kb_rows, write_kb_csv
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_KB_FILES = [
+    os.path.join(REPO_DIR, "deseguridad_knowledge_base_servicios.csv"),
+    os.path.join(REPO_DIR, "deseguridad_knowledge_base_otros.csv"),
+]
+
+WORDS = (
+    "extintor camilla botiquin arnes casco guante overol gafas tapabocas linterna "
+    "senal alarma brigada simulacro ruta salida camara sensor"
+).split()
+THRESHOLD = 0.6
+
+
+def _row(question: str, answer: str) -> dict:
+    return {"question": question, "answer": answer, "category": "c", "source": "s", "source_url": "u"}
+
+
+def chained_rows() -> list:
+    """
+    A ~ B (0.67) y B ~ C (0.67), pero A ~ C (0.43) queda por debajo de THRESHOLD.
+    A tiene la respuesta más completa, así que es la canónica del componente.
+    E es una copia exacta de A y D no se parece a nada.
+    """
+    return [
+        _row(" ".join(WORDS[0:12]), "respuesta larga " * 10),   # A
+        _row(" ".join(WORDS[2:14]), "respuesta"),               # B
+        _row(" ".join(WORDS[4:16]), "respuesta"),               # C
+        _row("pregunta sin ninguna relacion con las demas filas", "respuesta"),  # D
+        _row(" ".join(WORDS[0:12]), "corta"),                   # E
+    ]
+
+
+def test_fixture_is_chained():
+    sets = [shingles(row["question"]) for row in chained_rows()]
+    assert jaccard(sets[0], sets[1]) >= THRESHOLD
+    assert jaccard(sets[1], sets[2]) >= THRESHOLD
+    assert jaccard(sets[0], sets[2]) < THRESHOLD
+
+
+def test_chained_row_is_not_a_duplicate_of_the_canonical():
+    clusters, _, stats = find_duplicates(chained_rows(), THRESHOLD, "question")
+    assert clusters == [[0, 1, 4]]
+    assert stats["chained_rows"] == 1
+
+
+def test_collapse_keeps_rows_below_threshold(tmp_path, monkeypatch):
+    input_csv = str(tmp_path / "kb.csv")
+    output_csv = str(tmp_path / "dedup.csv")
+    rows = chained_rows()
+    write_kb_csv(input_csv, rows)
+
+    monkeypatch.setattr(sys, "argv", [
+        "kb_dedup.py", input_csv, "--field", "question", "--threshold", str(THRESHOLD),
+        "--mode", "collapse", "-o", output_csv, "--report", str(tmp_path / "report.json"), "--show", "0",
+    ])
+    kb_dedup.main()
+
+    kept = [row["question"] for row in load_kb_rows(output_csv)]
+    assert kept == [rows[0]["question"], rows[2]["question"], rows[3]["question"]]
+
+
+@pytest.mark.parametrize("threshold", [0.2, 0.3, 0.5, 0.7, 0.8, 0.9])
+def test_band_midpoint_is_not_above_threshold(threshold):
+    bands, rows_per_band = choose_bands(threshold)
+    assert bands * rows_per_band == kb_dedup.NUM_PERM
+    assert (1 / bands) ** (1 / rows_per_band) <= threshold
+
+
+@pytest.mark.parametrize("field,threshold", [("question", 0.5), ("question", 0.3), ("qa", 0.7)])
+def test_repo_kb_clusters_stay_above_threshold(field, threshold):
+    rows = [row for path in REPO_KB_FILES for row in load_kb_rows(path)]
+    clusters, shingle_sets, _ = find_duplicates(rows, threshold, field)
+    for members in clusters:
+        canonical = members[0]
+        for i in members[1:]:
+            assert jaccard(shingle_sets[canonical], shingle_sets[i]) >= threshold
@@ -0,0 +1,182 @@
+"""
+Modo por lotes de kb_generation.py: interpretación del JSON del LLM, reparto entre el lote y
+las llamadas por pregunta, y qué respuestas llegan a la caché del LLM (llm_cache.py).
+
+Uso: python -m pytest -q test_kb_generation.py
+"""
+
+import threading
+
+import pytest
+
+import process_docs
+import process_site
+from kb_generation import batch_is_complete, generate_answers_batched, parse_batch_answers
+from llm_cache import LLMCache
+
+# (respuesta cruda del LLM, total de preguntas, {índice base 0: respuesta})
+PARSE_CASES = [
+    ('{"respuestas": [{"id": 1, "respuesta": "uno"}, {"id": 2, "respuesta": "dos"}]}', 2, {0: "uno", 1: "dos"}),
+    # Bloque ```json ... ``` y texto alrededor
+    ('Claro:\n```json\n{"respuestas": [{"id": 1, "respuesta": "uno"}]}\n```\nSaludos', 1, {0: "uno"}),
+    ('```\n[{"id": 1, "respuesta": "uno"}]\n```', 1, {0: "uno"}),
+    # Lista directa: de objetos, o de cadenas en orden
+    ('[{"id": 2, "respuesta": "dos"}, {"id": 1, "respuesta": "uno"}]', 2, {0: "uno", 1: "dos"}),
+    ('["uno", "dos", "tres"]', 3, {0: "uno", 1: "dos", 2: "tres"}),
+    # Objeto con el índice como clave
+    ('{"1": "uno", "3": "tres"}', 3, {0: "uno", 2: "tres"}),
+    # Clave "answer" en lugar de "respuesta" e id como texto
+    ('{"respuestas": [{"id": "1", "answer": " uno "}]}', 1, {0: "uno"}),
+    # Respuestas que faltan, vacías o que no son texto
+    ('{"respuestas": [{"id": 1, "respuesta": "uno"}, {"id": 2, "respuesta": "  "}, {"id": 3, "respuesta": 7}]}', 3, {0: "uno"}),
+    # Ids de más, fuera de rango, no numéricos o repetidos (gana el primero)
+    ('{"respuestas": [{"id": 1, "respuesta": "uno"}, {"id": 1, "respuesta": "otra"}, {"id": 5, "respuesta": "x"}, '
+     '{"id": 0, "respuesta": "x"}, {"id": "dos", "respuesta": "x"}, {"id": 2, "respuesta": "dos"}]}', 2, {0: "uno", 1: "dos"}),
+    # Lo que no es JSON (o no tiene la forma esperada) no da ninguna respuesta
+    ("", 2, {}),
+    (None, 2, {}),
+    ("Lo siento, no puedo responder.", 2, {}),
+    ('{"respuestas": [{"id": 1, "respuesta": "uno"}', 2, {}),
+    ('"solo una cadena"', 1, {}),
+    ("42", 1, {}),
+]
+
+
+@pytest.mark.parametrize("raw,total,expected", PARSE_CASES)
+def test_parse_batch_answers(raw, total, expected):
+    assert parse_batch_answers(raw, total) == expected
+
+
+@pytest.mark.parametrize("raw,total,expected", PARSE_CASES)
+def test_batch_is_complete(raw, total, expected):
+    assert batch_is_complete(raw, total) == (len(expected) == total)
+
+
+# ==========================
+# Reparto lote / por pregunta
+# ==========================
+
+class Recorder:
+    """
+    answer_fn que registra las preguntas que recibe (desde varios hilos).
+    """
+
+    def __init__(self, fail: set = ()):
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, pregunta: str) -> str:
+        with self._lock:
+            self.calls.append(pregunta)
+        if pregunta in self.fail:
+            raise RuntimeError("fallo simulado")
+        return "individual " + pregunta
+
+
+PREGUNTAS = ["p1", "p2", "p3", "p4"]
+
+
+@pytest.mark.parametrize("raw,fallback", [
+    ('{"respuestas": [{"id": 1, "respuesta": "a1"}, {"id": 2, "respuesta": "a2"}, '
+     '{"id": 3, "respuesta": "a3"}, {"id": 4, "respuesta": "a4"}]}', []),
+    ('{"respuestas": [{"id": 1, "respuesta": "a1"}, {"id": 3, "respuesta": "a3"}]}', ["p2", "p4"]),
+    ('{"respuestas": [{"id": 2, "respuesta": ""}, {"id": 1, "respuesta": "a1"}, {"id": 3, "respuesta": "a3"}, '
+     '{"id": 4, "respuesta": "a4"}, {"id": 9, "respuesta": "extra"}]}', ["p2"]),
+    ("no es JSON", PREGUNTAS),
+])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_only_missing_questions_fall_back(raw, fallback, workers):
+    answer_fn = Recorder()
+    answers = generate_answers_batched(PREGUNTAS, lambda lote: raw, answer_fn, max_workers=workers)
+
+    assert sorted(answer_fn.calls) == fallback
+    expected = parse_batch_answers(raw, len(PREGUNTAS))
+    for i, pregunta in enumerate(PREGUNTAS):
+        assert answers[i] == expected.get(i, "individual " + pregunta)
+
+
+def test_batch_error_falls_back_and_keeps_failures_as_none():
+    def batch_fn(lote):
+        raise RuntimeError("caída del LLM")
+
+    answer_fn = Recorder(fail={"p3"})
+    answers = generate_answers_batched(PREGUNTAS, batch_fn, answer_fn, max_workers=2)
+
+    assert sorted(answer_fn.calls) == PREGUNTAS
+    assert answers == ["individual p1", "individual p2", None, "individual p4"]
+
+
+def test_empty_batch_makes_no_calls():
+    def batch_fn(lote):
+        raise AssertionError("no debería llamarse")
+
+    assert generate_answers_batched([], batch_fn, Recorder()) == []
+
+
+# ==========================
+# Caché del LLM
+# ==========================
+
+COMPLETE = '{"respuestas": [{"id": 1, "respuesta": "uno"}, {"id": 2, "respuesta": "dos"}]}'
+INCOMPLETE = '{"respuestas": [{"id": 1, "respuesta": "uno"}]}'
+
+
+@pytest.fixture
+def llm_env(monkeypatch, tmp_path):
+    config_path = tmp_path / "kb_config.json"
+    config_path.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("RAGKB_CONFIG", str(config_path))
+    monkeypatch.setenv("RAGKB_LLM_API_KEY", "test")
+    return tmp_path
+
+
+def _cached_batch(module, monkeypatch, cache, replies: list) -> tuple:
+    """
+    Pide tres veces el mismo lote con request_llm simulado; devuelve (respuestas, llamadas).
+    """
+    calls = []
+    replies = iter(replies)
+
+    def request_llm(prompt):
+        calls.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(module, "llm_client", None)
+    monkeypatch.setattr(module, "llm_cache", cache)
+    monkeypatch.setattr(module, "request_llm", request_llm)
+
+    if module is process_site:
+        ask = lambda: module.generate_batch_answers_with_llm(["q1", "q2"], "texto", "Título", "otros")
+    else:
+        ask = lambda: module.generate_batch_answers_with_llm(["q1", "q2"], "texto", "Título")
+    return [ask() for _ in range(3)], calls
+
+
+@pytest.mark.parametrize("module", [process_docs, process_site])
+def test_only_complete_batches_are_cached(module, monkeypatch, llm_env):
+    cache = LLMCache(str(llm_env / "llm_cache.sqlite"))
+    answers, calls = _cached_batch(module, monkeypatch, cache, ["no es JSON", INCOMPLETE, COMPLETE, "sobra"])
+
+    # Las dos primeras no se guardan: cada ejecución vuelve a pedir el lote
+    assert answers == ["no es JSON", INCOMPLETE, COMPLETE]
+    assert len(calls) == 3
+
+    client = module.get_llm_client()
+    assert cache.get(client.model, client.api_url, calls[0]) == COMPLETE
+    cache.close()
+
+
+@pytest.mark.parametrize("module", [process_docs, process_site])
+def test_incomplete_cached_batch_is_not_replayed(module, monkeypatch, llm_env):
+    cache = LLMCache(str(llm_env / "llm_cache.sqlite"))
+    # Entrada rota de antes del arreglo: se ignora y se sustituye por la respuesta completa
+    _, calls = _cached_batch(module, monkeypatch, cache, [COMPLETE])
+    client = module.get_llm_client()
+    cache.set(client.model, client.api_url, calls[0], INCOMPLETE)
+
+    answers, calls = _cached_batch(module, monkeypatch, cache, [COMPLETE])
+    assert answers == [COMPLETE] * 3
+    assert len(calls) == 1
+    assert cache.get(client.model, client.api_url, calls[0]) == COMPLETE
+    cache.close()
@@ -0,0 +1,132 @@
+"""
+Almacén .rkb de kb_store.py: un CSV convertido devuelve exactamente las mismas filas, con acceso
+por índice (también negativo), cortes, get/values/select, y open_kb_store lo regenera cuando
+cambia el archivo de origen.
+
+Uso: python -m pytest -q test_kb_store.py
+"""
+
+import os
+
+import pytest
+
+from kb_io import KB_FIELDS, load_kb_rows, write_kb_csv
+from kb_store import KBStore, convert_to_store, open_kb_store, store_path_for
+
+
+def _row(question: str, answer: str, category: str, source: str = "Servicios", url: str = "") -> dict:
+    return {"question": question, "answer": answer, "category": category, "source": source, "source_url": url}
+
+
+ROWS = [
+    _row("¿Qué es un extintor ABC?", "Un extintor multipropósito.", "Extintores", url="https://ejemplo.co/a"),
+    _row("¿Cada cuánto se recarga?", "Una vez al año; antes si se usó.", "Extintores", url="https://ejemplo.co/a"),
+    _row("¿Qué incluye la capacitación?", "", "Capacitación", source="Otros"),
+    _row("¿Atienden en Medellín y Bogotá?", "Sí, con señalización 🚒 y «brigadas».", "Cobertura",
+         url="https://ejemplo.co/b"),
+    _row("Pregunta con\nsalto de línea", "Respuesta con ; y \"comillas\"", "Extintores", source="Otros"),
+]
+
+
+@pytest.fixture
+def kb_csv(tmp_path):
+    path = str(tmp_path / "kb.csv")
+    write_kb_csv(path, ROWS)
+    return path
+
+
+@pytest.fixture
+def store(kb_csv, tmp_path):
+    output = str(tmp_path / "kb.rkb")
+    assert convert_to_store([kb_csv], output) == len(ROWS)
+    with KBStore(output) as kb_store:
+        yield kb_store
+
+
+def test_round_trip(store, kb_csv):
+    expected = load_kb_rows(kb_csv)
+    assert expected == ROWS
+    assert len(store) == len(ROWS)
+    for i, row in enumerate(ROWS):
+        assert store[i] == row
+    assert list(store) == ROWS
+
+
+def test_negative_index_and_out_of_range(store):
+    assert store[-1] == ROWS[-1]
+    assert store[-len(ROWS)] == ROWS[0]
+    assert store.get(-2, "answer") == ROWS[-2]["answer"]
+    for index in (len(ROWS), -len(ROWS) - 1):
+        with pytest.raises(IndexError):
+            store[index]
+        with pytest.raises(IndexError):
+            store.get(index, "question")
+
+
+@pytest.mark.parametrize("index", [slice(None), slice(1, 3), slice(-2, None), slice(None, None, -2), slice(10, 20)])
+def test_slices(store, index):
+    assert store[index] == ROWS[index]
+
+
+@pytest.mark.parametrize("field", KB_FIELDS)
+def test_get_single_field(store, field):
+    assert [store.get(i, field) for i in range(len(ROWS))] == [row[field] for row in ROWS]
+
+
+@pytest.mark.parametrize("field", ["category", "source", "source_url"])
+def test_values_and_select(store, field):
+    distinct = list(dict.fromkeys(row[field] for row in ROWS))
+    assert sorted(store.values(field)) == sorted(distinct)
+    for value in distinct:
+        assert store.select(field, value) == [i for i, row in enumerate(ROWS) if row[field] == value]
+    assert store.select(field, "no existe") == []
+
+
+def test_load_kb_rows_opens_rkb(store):
+    rows = load_kb_rows(store.path)
+    try:
+        assert isinstance(rows, KBStore)
+        assert rows[:] == ROWS
+    finally:
+        rows.close()
+
+
+def test_open_kb_store_converts_once_and_rebuilds_when_source_changes(kb_csv):
+    store_path = store_path_for(kb_csv)
+    assert not os.path.exists(store_path)
+
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store.path == store_path
+        assert kb_store[:] == ROWS
+    built = os.stat(store_path).st_mtime_ns
+
+    # Sin cambios: se reutiliza el mismo .rkb
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store[:] == ROWS
+    assert os.stat(store_path).st_mtime_ns == built
+
+    changed = ROWS[:2] + [_row("¿Pregunta nueva?", "Respuesta nueva.", "Nueva", source="Otros")]
+    write_kb_csv(kb_csv, changed)
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store[:] == changed
+        assert kb_store.select("category", "Nueva") == [2]
+
+
+def test_open_kb_store_rebuilds_same_size_edit(kb_csv):
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store[0]["answer"] == ROWS[0]["answer"]
+
+    # Mismo tamaño, otro mtime
+    edited = [dict(ROWS[0], answer=ROWS[0]["answer"].upper())] + ROWS[1:]
+    write_kb_csv(kb_csv, edited)
+    stat = os.stat(kb_csv)
+    os.utime(kb_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store[0]["answer"] == edited[0]["answer"]
+
+
+def test_open_kb_store_replaces_corrupt_store(kb_csv):
+    with open(store_path_for(kb_csv), "wb") as f:
+        f.write(b"no es un rkb")
+    with open_kb_store(kb_csv) as kb_store:
+        assert kb_store[:] == ROWS
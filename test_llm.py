@@ -1,41 +1,37 @@
-import requests
-import json
+import sys
 
-LLM_API_URL = "https://routellm.abacus.ai/v1/chat/completions"
-LLM_API_KEY = "s2_b4609507478b48fb87e345e6019e2b3d"  # pon aquí tu key real
-LLM_MODEL = "gpt-4o-mini"        # o el modelo que tengas configurado
+from kb_config import load_llm_config
+from llm_client import LLMClient, LLMError
 
-def test_llm():
-    headers = {
-        "Authorization": f"Bearer {LLM_API_KEY}",
-        "Content-Type": "application/json",
-    }
+# Configuración en kb_config.json o variables RAGKB_LLM_* (ver kb_config.py).
+# Uso: python test_llm.py [kb_config.json]
+# Es una prueba manual contra el endpoint real: la función no empieza por "test_"
+# para que pytest no la recoja.
 
-    payload = {
-        "model": LLM_MODEL,
-        "messages": [
-            {"role": "user", "content": "Di una frase corta y simpática sobre seguridad en el trabajo en Colombia."}
-        ]
-    }
 
-    try:
-        resp = requests.post(LLM_API_URL, headers=headers, json=payload, timeout=30)
-        print("Status code:", resp.status_code)
-        print("Raw body:", resp.text)
-
-        resp.raise_for_status()
-        data = resp.json()
-        print("\nJSON parseado:")
-        print(json.dumps(data, indent=2, ensure_ascii=False))
+def check_llm(config_path: str = None):
+    config = load_llm_config(config_path)
+    print("Endpoint:", config["api_url"])
+    print("Modelo:", config["model"])
+    if not config["api_key"]:
+        print("⚠️ Falta la API key: define RAGKB_LLM_API_KEY o \"api_key\" en kb_config.json.")
+        return
 
-        if "choices" in data and len(data["choices"]) > 0:
-            content = data["choices"][0]["message"]["content"]
-            print("\n💬 Respuesta del modelo:")
-            print(content)
-        else:
-            print("\n⚠️ No se encontró 'choices[0].message.content' en la respuesta.")
-    except Exception as e:
+    client = LLMClient.from_config(config, max_retries=0)
+    try:
+        content = client.complete("Di una frase corta y simpática sobre seguridad en el trabajo en Colombia.")
+        print("\n💬 Respuesta del modelo:")
+        print(content)
+    except LLMError as e:
         print("Error en la llamada al LLM:", e)
+        if e.status:
+            print("Status code:", e.status)
+    finally:
+        print()
+        for line in client.telemetry.report_lines():
+            print(line)
+        client.close()
+
 
 if __name__ == "__main__":
-    test_llm()
\ No newline at end of file
+    check_llm(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,271 @@
+"""
+Circuit breaker y limitador adaptativo de llm_client.py.
+
+- Pruebas deterministas con un reloj falso (CircuitBreaker(clock=...), AdaptiveRateLimiter(clock=,
+  sleep=...)): los 429 no reinician ni suman fallos seguidos, el circuito se abre tras N fallos,
+  solo pasa una sonda en half-open y tras max_outage las llamadas lanzan CircuitOpenError.
+- El ritmo baja a la mitad ante un 429, respeta Retry-After y se recupera de forma aditiva.
+- Integración con mock_llm_server.py (429 y 503 inyectados) contra LLMClient.
+
+Uso: python -m pytest -q test_llm_client.py
+"""
+
+import threading
+
+import pytest
+
+from llm_client import AdaptiveRateLimiter, CircuitBreaker, CircuitOpenError, LLMClient, LLMError
+from mock_llm_server import MockLLMServer
+
+
+class FakeClock:
+    """
+    Reloj monotónico falso; sleep() avanza el tiempo y queda registrado.
+    """
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def breaker(threshold: int = 3, cooldown: float = 30.0, max_outage: float = 900.0):
+    clock = FakeClock()
+    return CircuitBreaker(failure_threshold=threshold, cooldown=cooldown, max_cooldown=300.0,
+                          max_outage=max_outage, clock=clock), clock
+
+
+def run_events(circuit: CircuitBreaker, events: str) -> None:
+    """
+    f = fallo, n = 429 / petición inválida (neutral), s = éxito.
+    """
+    actions = {"f": circuit.record_failure, "n": circuit.record_neutral, "s": circuit.record_success}
+    for event in events:
+        circuit.before_call()
+        actions[event]()
+
+
+def blocked_call(circuit: CircuitBreaker) -> threading.Thread:
+    """
+    before_call() en otro hilo; sigue vivo mientras el circuito no le deje pasar.
+    """
+    thread = threading.Thread(target=circuit.before_call, daemon=True)
+    thread.start()
+    thread.join(0.2)
+    return thread
+
+
+# ==========================
+# CircuitBreaker
+# ==========================
+
+@pytest.mark.parametrize("events,failures,state", [
+    ("fnfn", 2, "closed"),
+    ("fnfnf", 3, "open"),
+    ("nnnnnnnn", 0, "closed"),
+    ("ffsf", 1, "closed"),
+    ("ffnnnnsf", 1, "closed"),
+])
+def test_429_does_not_reset_failure_count(events, failures, state):
+    circuit, _ = breaker(threshold=3)
+    run_events(circuit, events)
+    assert circuit.failures == failures
+    assert circuit.state == state
+
+
+@pytest.mark.parametrize("threshold", [1, 3, 5])
+def test_opens_after_threshold_failures(threshold):
+    circuit, clock = breaker(threshold=threshold, cooldown=30.0)
+    run_events(circuit, "f" * (threshold - 1))
+    assert circuit.state == "closed"
+
+    run_events(circuit, "f")
+    assert circuit.state == "open"
+    assert circuit.opened == 1
+    assert circuit._open_until == clock.now + 30.0
+
+
+def test_half_open_allows_a_single_probe():
+    circuit, clock = breaker(threshold=2, cooldown=30.0)
+    run_events(circuit, "ff")
+
+    # Abierto: nadie pasa antes del enfriamiento
+    waiting = blocked_call(circuit)
+    assert waiting.is_alive()
+
+    clock.advance(30.0)
+    circuit.before_call()  # la sonda
+    assert circuit.state == "half-open"
+    assert blocked_call(circuit).is_alive()
+
+    circuit.record_success()
+    waiting.join(2.0)
+    assert not waiting.is_alive()
+    assert circuit.state == "closed" and circuit.failures == 0
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    circuit, clock = breaker(threshold=2, cooldown=30.0)
+    run_events(circuit, "ff")
+    clock.advance(30.0)
+
+    circuit.before_call()
+    circuit.record_failure()
+    assert circuit.state == "open"
+    assert circuit.opened == 2
+    assert circuit._open_until == clock.now + 60.0
+
+
+def test_throttled_probe_releases_the_probe_without_closing():
+    circuit, clock = breaker(threshold=2, cooldown=30.0)
+    run_events(circuit, "ff")
+    clock.advance(30.0)
+
+    circuit.before_call()
+    circuit.record_neutral()
+    assert circuit.state == "half-open" and circuit.failures == 2
+
+    # Otra sonda puede pasar enseguida
+    probe = blocked_call(circuit)
+    assert not probe.is_alive()
+    circuit.record_failure()
+    assert circuit.state == "open"
+
+
+def test_circuit_open_error_after_max_outage():
+    circuit, clock = breaker(threshold=1, cooldown=30.0, max_outage=100.0)
+    run_events(circuit, "f")
+
+    # Sondas fallidas: la caída se cuenta desde la primera apertura
+    clock.advance(30.0)
+    circuit.before_call()
+    circuit.record_failure()
+    clock.advance(60.0)
+    circuit.before_call()
+    circuit.record_failure()
+
+    clock.advance(11.0)
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+
+
+# ==========================
+# AdaptiveRateLimiter
+# ==========================
+
+def limiter(rate: float = 4.0, burst: int = 2, max_rate: float = 10.0, min_rate: float = 0.5):
+    clock = FakeClock()
+    return AdaptiveRateLimiter(rate=rate, burst=burst, min_rate=min_rate, max_rate=max_rate,
+                               increase=0.5, decrease=0.5, clock=clock, sleep=clock.sleep), clock
+
+
+def test_token_bucket_waits_for_the_next_token():
+    bucket, clock = limiter(rate=2.0, burst=2)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_rate_halves_on_429_once_per_burst_of_responses():
+    bucket, clock = limiter(rate=4.0)
+    bucket.on_throttle()
+    assert bucket.rate == 2.0
+
+    # Otros 429 de peticiones que ya estaban en vuelo no vuelven a bajarlo
+    bucket.on_throttle()
+    assert bucket.rate == 2.0
+
+    clock.advance(1.0)
+    bucket.on_throttle()
+    assert bucket.rate == 1.0
+
+    for _ in range(5):
+        clock.advance(10.0)
+        bucket.on_throttle()
+    assert bucket.rate == 0.5  # min_rate
+
+
+def test_retry_after_pauses_requests():
+    bucket, clock = limiter(rate=4.0, burst=2)
+    bucket.on_throttle(retry_after=5.0)
+    bucket.acquire()
+    assert clock.sleeps[0] == pytest.approx(5.0)
+    assert sum(clock.sleeps) == pytest.approx(5.0)
+
+
+def test_rate_recovers_additively_up_to_max():
+    bucket, _ = limiter(rate=4.0, max_rate=5.0)
+    bucket.on_throttle()
+    for expected in (2.5, 3.0, 3.5):
+        bucket.on_success()
+        assert bucket.rate == pytest.approx(expected)
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 5.0
+
+
+# ==========================
+# LLMClient contra el LLM simulado
+# ==========================
+
+@pytest.fixture
+def mock_llm():
+    servers = []
+
+    def start(**kwargs):
+        server = MockLLMServer(latency="fixed:0", retry_after=0.01, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def client_for(server: MockLLMServer, **kwargs) -> LLMClient:
+    options = dict(rate=1000.0, max_rate=1000.0, backoff_base=0.001, backoff_max=0.002, timeout=5)
+    options.update(kwargs)
+    return LLMClient(server.url, "mock", "mock-model", **options)
+
+
+def test_client_succeeds_through_the_mock(mock_llm):
+    client = client_for(mock_llm())
+    assert client.complete("Hola")
+    assert client.breaker.state == "closed"
+    client.close()
+
+
+def test_interleaved_429_and_503_still_open_the_circuit(mock_llm):
+    server = mock_llm(throttle_rate=0.5, error_rate=0.5)
+    client = client_for(server, max_retries=50, failure_threshold=3, cooldown=0.05, max_outage=0.01)
+
+    with pytest.raises(CircuitOpenError):
+        client.complete("Hola")
+
+    assert client.breaker.opened == 1
+    assert server.stats["errors"] >= 3
+    assert server.stats["ok"] == 0
+    client.close()
+
+
+def test_429_only_never_opens_the_circuit(mock_llm):
+    server = mock_llm(throttle_rate=1.0)
+    client = client_for(server, rate=50.0, max_retries=6, failure_threshold=2)
+
+    with pytest.raises(LLMError) as error:
+        client.complete("Hola")
+
+    assert error.value.status == 429
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+    assert client.limiter.rate < 50.0
+    assert client.stats["throttled"] == 7
+    client.close()
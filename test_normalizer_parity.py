@@ -0,0 +1,208 @@
+"""
+Paridad entre la normalización de Python (kb_text.py) y la del plugin (includes/class-database.php).
+
+- El mapa de tildes y las stopwords se leen del propio código PHP y se comparan con kb_text.
+- Casos fijos con el resultado que da PHP (strlen en bytes, array_unique, puntuación pegada,
+  preg_split solo con espacios ASCII...).
+- Si hay un `php` en el PATH, los mismos casos se ejecutan también contra la clase real.
+- Las columnas search_* dan el mismo score que calculate_relevance_score.
+
+Uso: python -m pytest -q test_normalizer_parity.py
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from kb_baseline import calculate_relevance_score, prepared_relevance_score
+from kb_io import KB_FIELDS, load_kb_rows
+from kb_journal import KBStreamWriter
+from kb_text import (
+    ACCENT_MAP,
+    SEARCH_FIELDS,
+    STOPWORDS,
+    extract_key_terms,
+    normalize_text,
+    search_columns,
+)
+
+PHP_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "includes", "class-database.php")
+
+# (texto, normalize_text en PHP)
+NORMALIZE_CASES = [
+    ("¿Cuánto CUESTA la Evaluación?", "¿cuanto cuesta la evaluacion?"),
+    ("ÑANDÚ Pingüino PINGÜINO", "nandu pinguino pinguino"),
+    ("Á É Í Ó Ú á é í ó ú", "a e i o u a e i o u"),
+    ("Àlex Çedilla", "àlex çedilla"),           # fuera del mapa: solo minúsculas
+    ("SG-SST: Decreto 1072/2015", "sg-sst: decreto 1072/2015"),
+    ("", ""),
+]
+
+# (consulta, extract_key_terms en PHP, con array_values)
+KEY_TERM_CASES = [
+    # puntuación pegada: "¿cuanto" y "alturas?" no son stopwords; "¿cuanto?" es otro término
+    ("¿Cuánto cuesta la capacitación en alturas? ¿Cuánto?",
+     ["¿cuanto", "cuesta", "capacitacion", "alturas?", "¿cuanto?"]),
+    # array_unique conserva la primera aparición
+    ("extintor Extintores EXTINTOR extintores", ["extintor", "extintores"]),
+    # stopwords después de normalizar ("Información", "Cómo")
+    ("Información sobre Cómo hacer el curso", ["hacer", "curso"]),
+    # strlen cuenta bytes: "ça" (3 bytes) pasa, "ñu" -> "nu" (2) no
+    ("ça ñu va", ["ça"]),
+    # preg_split('/\s+/') sin /u: tabuladores y saltos separan, el espacio duro no
+    ("precio\tcurso\nalturas", ["precio", "curso", "alturas"]),
+    ("sg sst norma", ["sg sst", "norma"]),
+    ("   ", []),
+]
+
+# Filas y consultas para comparar el score con columnas precalculadas
+SCORE_ROWS = [
+    {"question": "¿Cuánto cuesta el curso de trabajo en alturas?", "answer": "El curso de ALTURAS cuesta...",
+     "category": "Capacitación", "source": "web", "source_url": "https://example.com/alturas"},
+    {"question": "¿Qué es el SG-SST?", "answer": "Sistema de Gestión de Seguridad y Salud en el Trabajo.",
+     "category": "sg-sst", "source": "web", "source_url": "https://example.com/sg-sst"},
+    {"question": "Recarga de extintores", "answer": "Recargamos extintores ABC, CO2 y de agua.",
+     "category": "Extintores", "source": "web", "source_url": ""},
+]
+SCORE_QUERIES = ["curso alturas", "sg-sst", "extintores", "capacitacion", "¿cuánto cuesta?", "co2 agua"]
+
+
+def _php_array_literal(name: str) -> str:
+    with open(PHP_SOURCE, "r", encoding="utf-8") as f:
+        source = f.read()
+    match = re.search(r"\$" + name + r"\s*=\s*array\((.*?)\);", source, re.DOTALL)
+    assert match, f"No se encontró ${name} en {PHP_SOURCE}"
+    return match.group(1)
+
+
+def php_accent_map() -> dict:
+    return dict(re.findall(r"'([^']+)'\s*=>\s*'([^']*)'", _php_array_literal("unwanted")))
+
+
+def php_stopwords() -> list:
+    return re.findall(r"'([^']*)'", _php_array_literal("stopwords"))
+
+
+def run_php(texts: list) -> list:
+    """
+    [(normalize_text, extract_key_terms)] de la clase real del plugin para cada texto.
+    """
+    script = r"""
+        require $argv[1];
+        $normalize = new ReflectionMethod('RAG_Chatbot_Database', 'normalize_text');
+        $normalize->setAccessible(true);
+        $out = array();
+        foreach (json_decode(stream_get_contents(STDIN), true) as $text) {
+            $out[] = array(
+                $normalize->invoke(null, $text),
+                array_values(RAG_Chatbot_Database::extract_key_terms($text)),
+            );
+        }
+        echo json_encode($out);
+    """
+    result = subprocess.run(
+        ["php", "-r", script, PHP_SOURCE],
+        input=json.dumps(texts), capture_output=True, text=True, check=True,
+    )
+    return [tuple(item) for item in json.loads(result.stdout)]
+
+
+# ==========================
+# TABLAS COPIADAS DEL PLUGIN
+# ==========================
+
+def test_accent_map_matches_php():
+    assert ACCENT_MAP == php_accent_map()
+
+
+def test_stopwords_match_php():
+    stopwords = php_stopwords()
+    assert len(stopwords) > 50
+    assert STOPWORDS == frozenset(stopwords)
+
+
+def test_php_stopwords_are_already_normalized():
+    # in_array() compara con la consulta ya normalizada: una stopword con tilde nunca coincidiría
+    assert all(normalize_text(word) == word for word in php_stopwords())
+
+
+# ==========================
+# CASOS FIJOS
+# ==========================
+
+@pytest.mark.parametrize("text,expected", NORMALIZE_CASES)
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize("query,expected", KEY_TERM_CASES)
+def test_extract_key_terms(query, expected):
+    assert extract_key_terms(query) == expected
+
+
+# ==========================
+# CONTRA PHP (SI ESTÁ INSTALADO)
+# ==========================
+
+@pytest.mark.skipif(shutil.which("php") is None, reason="php no está instalado")
+def test_matches_php_runtime():
+    texts = [text for text, _ in NORMALIZE_CASES] + [query for query, _ in KEY_TERM_CASES]
+    texts += [row[field] for row in SCORE_ROWS for field in ("question", "answer", "category")]
+    texts += SCORE_QUERIES
+    expected = run_php(texts)
+    actual = [(normalize_text(text), extract_key_terms(text)) for text in texts]
+    assert actual == expected
+
+
+# ==========================
+# COLUMNAS PRECALCULADAS
+# ==========================
+
+def test_search_columns_are_normalized_fields():
+    for row in SCORE_ROWS:
+        columns = search_columns(row)
+        assert set(columns) == set(SEARCH_FIELDS)
+        assert columns["search_question"] == normalize_text(row["question"])
+        assert columns["search_category"] == normalize_text(row["category"])
+        assert columns["search_answer"] == normalize_text(row["answer"])
+
+
+def test_search_stems_and_tf():
+    columns = search_columns({"question": "Recarga de extintores", "category": "Extintores",
+                              "answer": "Recargamos el extintor."})
+    assert columns["search_stems"] == "recarg extintor recargam"
+    assert columns["search_tf"] == "extintor:3 recarg:1 recargam:1"
+
+
+@pytest.mark.parametrize("query", SCORE_QUERIES)
+def test_prepared_score_matches_php_score(query):
+    normalized_query = normalize_text(query)
+    for row in SCORE_ROWS:
+        prepared = {**row, **search_columns(row)}
+        assert prepared_relevance_score(normalized_query, prepared) == calculate_relevance_score(normalized_query, row)
+
+
+def test_csv_with_search_columns_keeps_plugin_columns(tmp_path):
+    output_csv = str(tmp_path / "kb.csv")
+    writer = KBStreamWriter(output_csv, search_columns=True)
+    writer.write_rows(SCORE_ROWS)
+    writer.commit()
+
+    with open(output_csv, "r", newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f, delimiter=";"))
+    assert header == KB_FIELDS + SEARCH_FIELDS
+
+    # Mapeo de columnas del importador (class-admin.php): primera cabecera que coincide
+    for index, required in enumerate(KB_FIELDS):
+        found = next(
+            i for i, name in enumerate(header)
+            if name == required or name == required.replace("_", "") or required in name
+        )
+        assert found == index
+
+    assert load_kb_rows(output_csv) == SCORE_ROWS
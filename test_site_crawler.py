@@ -0,0 +1,236 @@
+"""
+Rastreo (site_crawler.py) y poda de process_site.py --crawl contra un servidor HTTP local.
+
+- Un http.server en 127.0.0.1 (puerto 0) sirve una carpeta temporal con robots.txt, sitemap,
+  páginas noindex, un canonical hacia una página ya vista y una URL del sitemap que no existe.
+- STATUS_OVERRIDES fuerza 410/503 en rutas concretas para probar qué errores son pasajeros.
+- process_site.main() se ejecuta varias veces contra el LLM simulado (mock_llm_server.py): las
+  páginas que pasan a 404/410/noindex se eliminan y las que dan 503 conservan sus filas.
+
+Uso: python -m pytest -q test_site_crawler.py
+"""
+
+import contextlib
+import functools
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_fetch import Fetcher
+from kb_io import load_kb_rows
+from kb_manifest import load_manifest, manifest_path_for
+from mock_llm_server import MockLLMServer
+from pipeline_profiler import PipelineProfiler
+from site_crawler import SiteCrawler
+
+LASTMOD = "2025-01-01"
+
+# Ruta -> código HTTP forzado (el resto se sirve desde la carpeta)
+STATUS_OVERRIDES = {}
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        status = STATUS_OVERRIDES.get(self.path)
+        if status:
+            self.send_error(status)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _page(title: str, body: str = "", head: str = "") -> str:
+    return (
+        f"<html><head><title>{title}</title>{head}</head><body><main><h1>{title}</h1>"
+        f"<p>Contenido de la página {title} sobre seguridad y salud en el trabajo, con texto suficiente "
+        f"para que el extractor no la descarte.</p>{body}</main></body></html>"
+    )
+
+
+def write_site(root, base: str) -> None:
+    files = {
+        "robots.txt": f"User-agent: *\nDisallow: /privado/\nSitemap: {base}/sitemap.xml\n",
+        "sitemap.xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"<url><loc>{base}/a.html</loc><lastmod>{LASTMOD}</lastmod></url>"
+            f"<url><loc>{base}/falta.html</loc></url>"
+            "</urlset>"
+        ),
+        "index.html": _page("Inicio", (
+            '<a href="/a.html">a</a> <a href="/b.html?utm_source=x">b</a> <a href="/privado/p.html">p</a> '
+            '<a href="/noindex.html">n</a> <a href="/alias.html">alias</a> <a href="/logo.png">logo</a> '
+            '<a href="/c.html">c</a>'
+        )),
+        "a.html": _page("A"),
+        "b.html": _page("B"),
+        "c.html": _page("C"),
+        "noindex.html": _page("Noindex", head='<meta name="robots" content="noindex">'),
+        "alias.html": _page("Alias", head=f'<link rel="canonical" href="{base}/a.html">'),
+        "privado/p.html": _page("Privado"),
+    }
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=str(root)))
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    write_site(root, base)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    STATUS_OVERRIDES.clear()
+    try:
+        yield root, base
+    finally:
+        STATUS_OVERRIDES.clear()
+        server.shutdown()
+        server.server_close()
+
+
+def crawl(base: str, known_lastmod: dict = None) -> SiteCrawler:
+    fetcher = Fetcher(max_workers=4, per_host=4, min_delay=0, timeout=5, cache_path=None)
+    crawler = SiteCrawler(fetcher, max_pages=50, max_depth=3)
+    crawler.pages = crawler.crawl([base + "/"], known_lastmod=known_lastmod, use_robots_sitemaps=True)
+    return crawler
+
+
+def by_url(pages: list, base: str) -> dict:
+    return {page.url[len(base):]: page for page in pages}
+
+
+# ==========================
+# SiteCrawler
+# ==========================
+
+def test_crawl_local_site(site):
+    _, base = site
+    crawler = crawl(base)
+    pages = by_url(crawler.pages, base)
+
+    # Sitemap primero, luego los enlaces; sin robots Disallow, noindex, alias ni recursos
+    assert [page.url[len(base):] for page in crawler.pages] == ["/a.html", "/falta.html", "/", "/b.html", "/c.html"]
+    assert pages["/a.html"].lastmod == LASTMOD and pages["/a.html"].status == 200
+    assert pages["/b.html"].html and not pages["/b.html"].unchanged
+
+    missing = pages["/falta.html"]
+    assert missing.html == "" and missing.status == 404 and not missing.transient
+
+    stats = crawler.stats
+    assert stats["sitemap_urls"] == 2
+    assert stats["fetched"] == 6  # /, a, b, c, noindex, alias
+    assert stats["errors"] == 1
+    assert stats["robots_blocked"] == 1
+    assert stats["noindex"] == 1
+    assert stats["duplicates"] == 1
+    assert stats["excluded"] == 1
+    assert stats["unchanged"] == 0
+
+
+def test_unchanged_lastmod_is_not_downloaded(site):
+    _, base = site
+    crawler = crawl(base, known_lastmod={base + "/a.html": LASTMOD})
+    pages = by_url(crawler.pages, base)
+
+    assert pages["/a.html"].unchanged and pages["/a.html"].html is None
+    assert crawler.stats["unchanged"] == 1
+    assert crawler.stats["fetched"] == 5
+
+
+@pytest.mark.parametrize("status,transient", [(404, False), (410, False), (503, True), (500, True), (429, True)])
+def test_error_status_and_transient(site, status, transient):
+    _, base = site
+    STATUS_OVERRIDES["/b.html"] = status
+    pages = by_url(crawl(base).pages, base)
+
+    assert pages["/b.html"].html == ""
+    assert pages["/b.html"].status == status
+    assert pages["/b.html"].transient is transient
+
+
+# ==========================
+# process_site.py --crawl: poda entre ejecuciones
+# ==========================
+
+@pytest.fixture
+def mock_llm(monkeypatch, tmp_path):
+    server = MockLLMServer(latency="fixed:0").start()
+    # Configuración vacía: que un kb_config.json local no cambie la prueba
+    config_path = tmp_path / "kb_config.json"
+    config_path.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("RAGKB_CONFIG", str(config_path))
+    monkeypatch.setenv("RAGKB_LLM_API_URL", server.url)
+    monkeypatch.setenv("RAGKB_LLM_API_KEY", "mock")
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def run_process_site(base: str, output_csv: str) -> None:
+    import process_site
+
+    process_site.llm_client = None
+    process_site.llm_cache = None
+    process_site.fetcher = None
+    process_site.profiler = PipelineProfiler()
+    process_site.HTTP_MIN_DELAY = 0
+
+    argv = [
+        process_site.__file__, "--crawl", "--start", base + "/", "--output", output_csv,
+        "--no-cache", "--no-http-cache", "--no-batch", "--workers", "2", "--llm-rate", "100",
+    ]
+    saved_argv = sys.argv
+    sys.argv = argv
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            process_site.main()
+    finally:
+        sys.argv = saved_argv
+
+
+def kb_pages(output_csv: str, base: str) -> set:
+    return {row["source_url"][len(base):] for row in load_kb_rows(output_csv)}
+
+
+def test_crawl_prunes_gone_and_noindex_pages(site, mock_llm, tmp_path):
+    root, base = site
+    output_csv = str(tmp_path / "kb.csv")
+
+    run_process_site(base, output_csv)
+    assert kb_pages(output_csv, base) == {"/", "/a.html", "/b.html", "/c.html"}
+
+    # b pasa a noindex; c da 503 (pasajero). a no se descarga: el sitemap trae el mismo lastmod.
+    (root / "b.html").write_text(_page("B", head='<meta name="robots" content="noindex">'), encoding="utf-8")
+    STATUS_OVERRIDES["/c.html"] = 503
+    run_process_site(base, output_csv)
+    assert kb_pages(output_csv, base) == {"/", "/a.html", "/c.html"}
+
+    # c desaparece (410) e index deja de enlazarla: solo la alcanza la semilla del manifiesto
+    STATUS_OVERRIDES["/c.html"] = 410
+    (root / "index.html").write_text(_page("Inicio"), encoding="utf-8")
+    run_process_site(base, output_csv)
+    assert kb_pages(output_csv, base) == {"/", "/a.html"}
+    assert set(load_manifest(manifest_path_for(output_csv))) == {base + "/", base + "/a.html"}
+
+
+def test_crawl_prunes_404_pages(site, mock_llm, tmp_path):
+    root, base = site
+    output_csv = str(tmp_path / "kb.csv")
+
+    run_process_site(base, output_csv)
+    assert "/b.html" in kb_pages(output_csv, base)
+
+    (root / "b.html").unlink()
+    run_process_site(base, output_csv)
+    assert kb_pages(output_csv, base) == {"/", "/a.html", "/c.html"}